@@ -0,0 +1,319 @@
+"""
+Admission control for the routes that call the LLM.
+
+Every gunicorn worker shares one small SQLite file, so the limits hold for
+the whole host rather than per process:
+
+- token buckets cap the rate of LLM requests, globally and per user;
+- leases cap how many LLM requests run at once, globally and per user.
+  A request that finds no free slot waits in a short FIFO queue, and is shed
+  when the queue is full or its wait runs out.
+
+Shed requests raise AdmissionRejected with a Retry-After hint, which the app
+turns into a 429 instead of letting the request tie up a worker until it
+times out. Cheap routes such as /login and /dashboard never pass through here.
+
+acquire_async() and slot_async() are the asyncio versions for asgi.py: the
+SQLite work runs in a thread and the wait between polls does not hold one.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, closing, contextmanager
+
+import metrics
+
+WAITING = "waiting"
+RUNNING = "running"
+
+MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", 8))
+USER_INFLIGHT = int(os.getenv("ADMISSION_USER_INFLIGHT", 2))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 16))
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+RATE_PER_MINUTE = float(os.getenv("ADMISSION_RATE_PER_MIN", 0))
+BURST = float(os.getenv("ADMISSION_BURST", 20))
+USER_RATE_PER_MINUTE = float(os.getenv("ADMISSION_USER_RATE_PER_MIN", 10))
+USER_BURST = float(os.getenv("ADMISSION_USER_BURST", 5))
+# A lease older than this is assumed to belong to a crashed worker
+LEASE_TTL = float(os.getenv("ADMISSION_LEASE_TTL", 300))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; retry_after is in whole seconds."""
+
+    def __init__(self, message, retry_after, reason):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """Host-wide LLM rate and concurrency limits kept in a SQLite file."""
+
+    def __init__(self, path, max_inflight=MAX_INFLIGHT, user_inflight=USER_INFLIGHT, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT, rate_per_minute=RATE_PER_MINUTE, burst=BURST,
+                 user_rate_per_minute=USER_RATE_PER_MINUTE, user_burst=USER_BURST, lease_ttl=LEASE_TTL):
+        self.path = path
+        self.max_inflight = max_inflight
+        self.user_inflight = user_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.user_rate = user_rate_per_minute / 60
+        self.user_burst = user_burst
+        self.lease_ttl = lease_ttl
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self._hold_seconds = 5.0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    id TEXT PRIMARY KEY,
+                    user_id INTEGER,
+                    route TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_leases_state_created ON leases (state, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # --- Token buckets ---
+
+    @staticmethod
+    def _bucket(conn, key, rate, burst, now):
+        """Returns the bucket's refilled token count."""
+        row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return burst
+        return min(burst, row["tokens"] + (now - row["updated_at"]) * rate)
+
+    def check_rate(self, user_id, route):
+        """Takes one token from the global and the user's bucket, or raises AdmissionRejected."""
+        limits = []
+        if self.rate > 0:
+            limits.append(("global", self.rate, self.burst, "rate"))
+        if self.user_rate > 0 and user_id is not None:
+            limits.append((f"user:{user_id}", self.user_rate, self.user_burst, "user_rate"))
+        if not limits:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            levels = [(key, self._bucket(conn, key, rate, burst, now), rate, reason) for key, rate, burst, reason in limits]
+            short = [(math.ceil((1 - tokens) / rate), reason) for _, tokens, rate, reason in levels if tokens < 1]
+            if not short:
+                for key, tokens, _, _ in levels:
+                    conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                                 (key, tokens - 1, now))
+                # Buckets that have refilled completely carry no state
+                conn.execute("DELETE FROM buckets WHERE key LIKE 'user:%' AND updated_at < ?",
+                             (now - self.user_burst / self.user_rate if self.user_rate > 0 else now,))
+        if short:
+            retry_after, reason = max(short)
+            metrics.admission_requests.inc(route=route, outcome=f"rejected_{reason}")
+            message = ("You are sending requests too quickly." if reason == "user_rate"
+                       else "The AI service is handling too many requests.")
+            raise AdmissionRejected(f"{message} Please try again in {retry_after} seconds.", retry_after, reason)
+
+    # --- Concurrency slots ---
+
+    def _purge(self, conn, now):
+        conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+
+    def _purge_dead(self, conn):
+        """Drops leases held by worker processes that no longer exist."""
+        for row in conn.execute("SELECT DISTINCT pid FROM leases").fetchall():
+            try:
+                os.kill(row["pid"], 0)
+            except ProcessLookupError:
+                conn.execute("DELETE FROM leases WHERE pid = ?", (row["pid"],))
+            except PermissionError:
+                pass
+
+    def _promote(self, conn, lease_id, user_id, now):
+        """Turns a waiting lease into a running one if a slot is free for it. Returns True on success."""
+        running = conn.execute("SELECT COUNT(*) FROM leases WHERE state = ?", (RUNNING,)).fetchone()[0]
+        if running >= self.max_inflight:
+            return False
+        if self.user_inflight and user_id is not None:
+            user_running = conn.execute("SELECT COUNT(*) FROM leases WHERE state = ? AND user_id = ?",
+                                        (RUNNING, user_id)).fetchone()[0]
+            if user_running >= self.user_inflight:
+                return False
+        # First come, first served: older waiters get the free slots first
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM leases WHERE state = ? AND created_at < (SELECT created_at FROM leases WHERE id = ?)",
+            (WAITING, lease_id)
+        ).fetchone()[0]
+        if ahead >= self.max_inflight - running:
+            return False
+        conn.execute("UPDATE leases SET state = ?, expires_at = ? WHERE id = ?", (RUNNING, now + self.lease_ttl, lease_id))
+        return True
+
+    def _retry_after(self, waiting):
+        return max(1, math.ceil(self._hold_seconds * (waiting + 1) / max(1, self.max_inflight)))
+
+    def _enter(self, lease_id, user_id, route, timeout):
+        """Adds a waiting lease and tries to run it. Returns True if admitted; raises if the queue is full."""
+        with self._transaction() as conn:
+            now = time.time()
+            self._purge(conn, now)
+            waiting = conn.execute("SELECT COUNT(*) FROM leases WHERE state = ?", (WAITING,)).fetchone()[0]
+            conn.execute(
+                "INSERT INTO leases (id, user_id, route, state, pid, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (lease_id, user_id, route, WAITING, os.getpid(), now, now + timeout + 30)
+            )
+            admitted = self._promote(conn, lease_id, user_id, now)
+            if not admitted and waiting >= self.max_queue:
+                conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+        if admitted:
+            metrics.admission_requests.inc(route=route, outcome="admitted")
+            return True
+        if waiting >= self.max_queue:
+            metrics.admission_requests.inc(route=route, outcome="rejected_queue_full")
+            raise AdmissionRejected(f"The AI service is busy. Please try again in {self._retry_after(waiting)} seconds.",
+                                    self._retry_after(waiting), "queue_full")
+        return False
+
+    def _poll(self, lease_id, user_id, route, started, purge_dead):
+        """One retry of a waiting lease. Returns True once it is running."""
+        with self._transaction() as conn:
+            if purge_dead:
+                self._purge_dead(conn)
+            admitted = self._promote(conn, lease_id, user_id, time.time())
+        if admitted:
+            metrics.admission_wait.observe(time.monotonic() - started, route=route)
+            metrics.admission_requests.inc(route=route, outcome="queued")
+        return admitted
+
+    def _give_up(self, lease_id, route, started):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+            waiting = conn.execute("SELECT COUNT(*) FROM leases WHERE state = ?", (WAITING,)).fetchone()[0]
+        metrics.admission_wait.observe(time.monotonic() - started, route=route)
+        metrics.admission_requests.inc(route=route, outcome="rejected_timeout")
+        retry_after = self._retry_after(waiting)
+        raise AdmissionRejected(f"The AI service is busy. Please try again in {retry_after} seconds.", retry_after, "timeout")
+
+    def acquire(self, user_id, route, timeout=None):
+        """
+        Waits up to `timeout` seconds (default: the queue timeout) for a slot.
+        Returns a lease to pass to release(), or raises AdmissionRejected.
+        """
+        if self.max_inflight <= 0:
+            return None
+        timeout = self.queue_timeout if timeout is None else timeout
+        lease_id = uuid.uuid4().hex
+        started = time.monotonic()
+        if self._enter(lease_id, user_id, route, timeout):
+            return (lease_id, route, time.monotonic())
+
+        delay = 0.05
+        polls = 0
+        while time.monotonic() - started < timeout:
+            time.sleep(max(0.0, min(delay, timeout - (time.monotonic() - started))))
+            delay = min(delay * 2, 0.5)
+            if self._poll(lease_id, user_id, route, started, purge_dead=polls == 0):
+                return (lease_id, route, time.monotonic())
+            polls += 1
+        self._give_up(lease_id, route, started)
+
+    async def acquire_async(self, user_id, route, timeout=None):
+        """acquire() for the event loop."""
+        import asyncio
+
+        if self.max_inflight <= 0:
+            return None
+        timeout = self.queue_timeout if timeout is None else timeout
+        lease_id = uuid.uuid4().hex
+        started = time.monotonic()
+        if await asyncio.to_thread(self._enter, lease_id, user_id, route, timeout):
+            return (lease_id, route, time.monotonic())
+
+        delay = 0.05
+        polls = 0
+        try:
+            while time.monotonic() - started < timeout:
+                await asyncio.sleep(max(0.0, min(delay, timeout - (time.monotonic() - started))))
+                delay = min(delay * 2, 0.5)
+                if await asyncio.to_thread(self._poll, lease_id, user_id, route, started, polls == 0):
+                    return (lease_id, route, time.monotonic())
+                polls += 1
+        except asyncio.CancelledError:
+            # The client went away while queued
+            await asyncio.to_thread(self._delete, lease_id)
+            raise
+        await asyncio.to_thread(self._give_up, lease_id, route, started)
+
+    def _delete(self, lease_id):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    def release(self, lease):
+        if lease is None:
+            return
+        lease_id, _, acquired = lease
+        self._delete(lease_id)
+        with self._lock:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.monotonic() - acquired)
+
+    @contextmanager
+    def slot(self, user_id, route, timeout=None):
+        """Holds a concurrency slot for the duration of the block."""
+        lease = self.acquire(user_id, route, timeout=timeout)
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+    @asynccontextmanager
+    async def slot_async(self, user_id, route, timeout=None):
+        """slot() for the event loop."""
+        import asyncio
+
+        lease = await self.acquire_async(user_id, route, timeout=timeout)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.release, lease)
+
+    def depth(self):
+        """Returns {(route, state): count} of current leases, for the admission_requests gauge."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT route, state, COUNT(*) AS n FROM leases WHERE expires_at >= ? GROUP BY route, state",
+                                (time.time(),)).fetchall()
+        return {(row["route"], row["state"]): row["n"] for row in rows}
@@ -1,29 +1,50 @@
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-import json
-import re
-
-load_dotenv()
-
-def initialize_genai():
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        print("ERROR: GOOGLE_API_KEY environment variable is not set.")
-        return None
-    try:
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel('gemini-1.5-flash')
-    except Exception as e:
-        print(f"Error initializing Google Generative AI: {e}")
-        return None
+import threading
+from contextlib import closing
 
-model = initialize_genai()
+from llm_client import client, LLMError
+from resume_json import JSONRepairParser, validate_resume
 
-def generate_ai_resume(user_input):
-    if not model:
-        raise Exception("AI model is not initialized. Please check the API key.")
+# Rounds of re-asking only for fields that are still missing after repair
+FIELD_RETRIES = int(os.getenv("AI_RESUME_FIELD_RETRIES", 1))
+
+# JSON shape shown to the model for each generated field
+FIELD_SHAPES = {
+    "summary": '"summary": "..."',
+    "skills": '"skills": { "Technical": [...], "Soft Skills": [...], "Tools": [...] }',
+    "experience": '"experience": [ { "title": "...", "company": "...", "dates": "...", "achievements": [...] } ]',
+    "education": '"education": [ { "degree": "...", "institution": "...", "year": "..." } ]',
+}
+
+_metrics = {
+    "generations": 0, "clean": 0, "syntax_repaired": 0, "coerced": 0,
+    "field_requests": 0, "fields_requested": 0, "fallbacks": 0, "repairs": {},
+}
+_metrics_lock = threading.Lock()
 
+def _record(repairs=(), **counts):
+    with _metrics_lock:
+        for key, value in counts.items():
+            _metrics[key] += value
+        for repair in repairs:
+            _metrics["repairs"][repair] = _metrics["repairs"].get(repair, 0) + 1
+
+def _tally(outcome, repairs=(), **counts):
+    """Adds to one generation's counters; the driver records them once it is done."""
+    for key, value in counts.items():
+        outcome[key] = outcome.get(key, 0) + value
+    outcome["repairs"] = [*outcome.get("repairs", ()), *repairs]
+
+def repair_stats():
+    """Counters for /cache-stats; repair_rate is the share of generations that needed any fix."""
+    with _metrics_lock:
+        stats = {**_metrics, "repairs": dict(_metrics["repairs"])}
+    fixed = stats["generations"] - stats["clean"] - stats["fallbacks"]
+    stats["repair_rate"] = round(fixed / stats["generations"], 4) if stats["generations"] else 0.0
+    return stats
+
+def describe_user_input(user_input):
+    """Formats the user's details for the resume prompts."""
     # Data ko prompt ke liye prepare karein
     experience_str = ""
     if isinstance(user_input.get('experience'), list):
@@ -40,18 +61,22 @@ def generate_ai_resume(user_input):
     else:
         education_str = user_input.get('education', 'N/A')
 
-    prompt = f"""
-    You are an expert career coach and professional resume writer. Based on the user's provided information, generate a complete, professional, and ATS-friendly resume.
-    The final output MUST be a single, valid JSON object. Do not include any text, notes, or markdown formatting outside of the JSON object.
-
-    **User's Information:**
+    return f"""**User's Information:**
     - Name: {user_input.get('name', 'N/A')}
     - Email: {user_input.get('email', 'N/A')}
     - Phone: {user_input.get('phone', 'N/A')}
     - Target Job Role: {user_input.get('job_role', 'N/A')}
     - Provided Skills: {user_input.get('skills', 'N/A')}
     - Provided Experience: {experience_str.strip()}
-    - Provided Education: {education_str.strip()}
+    - Provided Education: {education_str.strip()}"""
+
+def build_resume_prompt(user_input):
+    """Prompt for a complete resume as one JSON object."""
+    return f"""
+    You are an expert career coach and professional resume writer. Based on the user's provided information, generate a complete, professional, and ATS-friendly resume.
+    The final output MUST be a single, valid JSON object. Do not include any text, notes, or markdown formatting outside of the JSON object.
+
+    {describe_user_input(user_input)}
 
     **Your Task:**
     1.  **Professional Summary:** Write a compelling 3-4 sentence summary tailored to the target job role.
@@ -71,19 +96,135 @@ def generate_ai_resume(user_input):
       "education": [ {{ "degree": "...", "institution": "...", "year": "..." }} ]
     }}
     """
-    
+
+def build_fields_prompt(user_input, fields):
+    """Prompt that asks again for only the given resume fields."""
+    shapes = ",\n      ".join(FIELD_SHAPES[field] for field in fields)
+    return f"""
+    You are an expert career coach and professional resume writer. An earlier draft of this user's resume was missing some sections.
+    Write only the sections listed below. The final output MUST be a single, valid JSON object containing only these keys. Do not include any text outside of the JSON object.
+
+    {describe_user_input(user_input)}
+
+    **JSON Output Structure:**
+    {{
+      {shapes}
+    }}
+    """
+
+def request_json(prompt):
+    """
+    Streams a completion into the repairing parser. Reading stops as soon as
+    the object is complete, and output cut off by an error is still parsed.
+    Returns (object or None, repairs, field cut off by truncation or None).
+    """
+    parser = JSONRepairParser()
+    try:
+        with closing(client.stream(prompt)) as chunks:
+            for chunk in chunks:
+                if parser.feed(chunk):
+                    break
+    except LLMError as e:
+        print(f"Error generating AI resume: {e}")
+    return parser.close(), parser.repairs, parser.truncated_field
+
+async def request_json_async(prompt):
+    """request_json() on the event loop."""
+    parser = JSONRepairParser()
+    chunks = client.astream(prompt)
+    try:
+        try:
+            async for chunk in chunks:
+                if parser.feed(chunk):
+                    break
+        finally:
+            # contextlib.aclosing needs Python 3.10
+            await chunks.aclose()
+    except LLMError as e:
+        print(f"Error generating AI resume: {e}")
+    return parser.close(), parser.repairs, parser.truncated_field
+
+def fallback_resume(user_input):
+    return {
+        'name': user_input.get('name'), 'email': user_input.get('email'), 'phone': user_input.get('phone'),
+        'job_role': user_input.get('job_role'), 'summary': "Sorry, the AI could not generate a resume at this time. Please try again.",
+        'skills': {"Error": ["Could not generate skills."]}, 'experience': [], 'education': []
+    }
+
+def resume_steps(user_input, outcome):
+    """
+    The generation logic without the model calls: a generator that yields
+    each prompt and is sent back request_json's result for it, and returns
+    the resume. generate_ai_resume and generate_ai_resume_async drive it and
+    record the repair counters it adds to `outcome`.
+    """
+    data, repairs, truncated = yield build_resume_prompt(user_input)
+    if data is None:
+        print("Error parsing AI resume: no JSON object in the response")
+        _tally(outcome, fallbacks=1)
+        return fallback_resume(user_input)
+
+    resume, coerced, missing = validate_resume(data)
+    if truncated in FIELD_SHAPES and truncated not in missing:
+        missing.append(truncated)
+    _tally(outcome, repairs, syntax_repaired=int(bool(repairs)), coerced=int(bool(coerced)),
+            clean=int(not (repairs or coerced or missing)))
+
+    # Sirf missing fields dobara maangein, poora resume nahi
+    for _ in range(FIELD_RETRIES):
+        if not missing:
+            break
+        _tally(outcome, field_requests=1, fields_requested=len(missing))
+        extra, extra_repairs, truncated = yield build_fields_prompt(user_input, missing)
+        _tally(outcome, extra_repairs)
+        if extra:
+            replaced = {field: extra[field] for field in missing if field in extra and field != truncated}
+            resume, _, missing = validate_resume({**resume, **replaced})
+
+    # Contact details user ke input se hi lete hain
+    for field in ("name", "email", "phone", "job_role"):
+        resume[field] = user_input.get(field) or resume[field]
+    if "skills" in missing and isinstance(user_input.get('skills'), str):
+        resume["skills"] = {"Technical": [skill.strip() for skill in user_input['skills'].split(',') if skill.strip()]}
+    return resume
+
+def generate_ai_resume(user_input):
+    if not client.backend.configured:
+        raise Exception("AI model is not initialized. Please check the API key.")
+
+    outcome = {}
+    steps = resume_steps(user_input, outcome)
     try:
-        response = model.generate_content(prompt)
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response.text)
-        json_str = json_match.group(1) if json_match else response.text
-        resume_data = json.loads(json_str)
-        return resume_data
+        prompt = next(steps)
+        while True:
+            prompt = steps.send(request_json(prompt))
+    except StopIteration as done:
+        return done.value
     except Exception as e:
         print(f"Error generating or parsing AI resume: {e}")
         # Graceful fallback
-        return {
-            'name': user_input.get('name'), 'email': user_input.get('email'), 'phone': user_input.get('phone'),
-            'job_role': user_input.get('job_role'), 'summary': "Sorry, the AI could not generate a resume at this time. Please try again.",
-            'skills': {{"Error": ["Could not generate skills."]}}, 'experience': [], 'education': []
-        }
+        outcome.update(clean=0, fallbacks=1)
+        return fallback_resume(user_input)
+    finally:
+        # Exactly one generation, however it ended
+        _record(generations=1, **outcome)
 
+async def generate_ai_resume_async(user_input):
+    """generate_ai_resume() for asgi.py: awaits the model instead of blocking a thread."""
+    if not client.backend.configured:
+        raise Exception("AI model is not initialized. Please check the API key.")
+
+    outcome = {}
+    steps = resume_steps(user_input, outcome)
+    try:
+        prompt = next(steps)
+        while True:
+            prompt = steps.send(await request_json_async(prompt))
+    except StopIteration as done:
+        return done.value
+    except Exception as e:
+        print(f"Error generating or parsing AI resume: {e}")
+        outcome.update(clean=0, fallbacks=1)
+        return fallback_resume(user_input)
+    finally:
+        _record(generations=1, **outcome)
@@ -1,34 +1,55 @@
-import google.generativeai as genai
 import os
+import re
 from dotenv import load_dotenv
+from analysis_cache import cache
+from skill_matcher import score_resume, format_local_analysis
+from llm_client import client, LLMError, LLMUnavailable
+import prompt_compactor
+import revisions
 
 # Load environment variables
 load_dotenv()
 
-def initialize_genai():
-    """Initializes the Google Generative AI model."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        print("GOOGLE_API_KEY environment variable is not set.")
-        return None
-    try:
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel('gemini-1.5-flash')
-    except Exception as e:
-        print(f"Error initializing Google Generative AI: {e}")
-        return None
+# Bump this whenever the prompt below changes so cached results are not reused
+PROMPT_VERSION = "v2"
 
-# Initialize the model once when the application starts
-model = initialize_genai()
+# Resumes whose local keyword score is below this skip the LLM call (0 disables the gate)
+LLM_GATE_MIN_SCORE = int(os.getenv("LLM_GATE_MIN_SCORE", 0))
 
-def analyze_resume(resume_text, job_role):
+# Job roles one /analyze upload can be compared against in a single prompt
+MAX_COMPARE_ROLES = int(os.getenv("MAX_COMPARE_ROLES", 4))
+
+# "### Role: Backend Developer" opens each role's review in a multi-role response
+ROLE_HEADING_RE = re.compile(r"^[#*\s]*Role:\s*(.+?)[*\s]*$", re.IGNORECASE | re.MULTILINE)
+
+UNAVAILABLE_NOTE = "AI review is unavailable right now, so this score is based on keyword matching only."
+ANALYSIS_ERROR = "An error occurred during AI analysis"
+
+def local_analysis(resume_text, job_role, llm_available):
     """
-    Analyzes a resume against a job role using the Gemini AI.
+    Returns a keyword-based analysis when the LLM is unavailable or the
+    resume fails the pre-screen gate, otherwise None.
     """
-    if not model:
-        return "Error: AI model is not initialized. Please check your API key."
+    local = score_resume(resume_text, job_role)
+    if local is None:
+        return None
+    if not llm_available:
+        return format_local_analysis(local, note=UNAVAILABLE_NOTE)
+    if local["score"] < LLM_GATE_MIN_SCORE:
+        return format_local_analysis(local, note=f"This resume covers too few key skills for {local['role']} to qualify for a full AI review. Add the missing skills above and analyze it again.")
+    return None
+
+def compact_for_prompt(resume_text):
+    """Strips page furniture and fits the resume to PROMPT_TOKEN_BUDGET."""
+    result = prompt_compactor.compact_resume(resume_text)
+    prompt_compactor.record(result)
+    return result["text"]
 
-    prompt = f"""
+def build_analysis_prompt(resume_text, job_role, compact=True):
+    """Builds the HR-review prompt for a resume and job role."""
+    if compact:
+        resume_text = compact_for_prompt(resume_text)
+    return f"""
     As a senior HR reviewer and career coach at a top technology firm, please provide a professional analysis of the following resume for the job role of "{job_role}".
 
     Your response should be structured as a real HR professional would provide feedback to a candidate.
@@ -51,9 +72,186 @@ def analyze_resume(resume_text, job_role):
     Please provide a comprehensive and supportive analysis.
     """
 
+def build_multi_role_prompt(resume_text, job_roles, compact=True):
+    """Builds one HR-review prompt covering several job roles, so the resume is sent once."""
+    if compact:
+        resume_text = compact_for_prompt(resume_text)
+    roles = "\n".join(f"    {index}. {role}" for index, role in enumerate(job_roles, 1))
+    return f"""
+    As a senior HR reviewer and career coach at a top technology firm, please provide a professional analysis of the following resume for each of these job roles:
+{roles}
+
+    Review the resume separately for every role, as a real HR professional would provide feedback to a candidate. Start each role's review with a line "### Role: <role name>", using the role name exactly as listed above, followed by these sections:
+
+    **Resume Score:**
+    Provide a score out of 100 for this role, based on relevance, skills, structure, and overall presentation.
+
+    **Strengths:**
+    Identify 2-3 key strengths of the resume that align with this role.
+
+    **Areas for Improvement:**
+    List specific, actionable suggestions for what the candidate can do to improve their resume for this role.
+
+    **Missing Skills/Keywords:**
+    List any critical skills or keywords for this role that are missing from the resume.
+
+    **Resume Text to Analyze:**
+    {resume_text}
+
+    Please provide a comprehensive and supportive analysis for every role.
+    """
+
+def split_role_reviews(response, job_roles):
+    """Splits a multi-role response on its "### Role:" lines. Returns {role: review} for the roles found."""
+    wanted = {role.casefold(): role for role in job_roles}
+    headings = [(match, wanted.get(match.group(1).strip().strip('"').casefold()))
+                for match in ROLE_HEADING_RE.finditer(response or "")]
+    headings = [(match, role) for match, role in headings if role]
+    reviews = {}
+    for index, (match, role) in enumerate(headings):
+        end = headings[index + 1][0].start() if index + 1 < len(headings) else len(response)
+        review = response[match.end():end].strip()
+        if review and role not in reviews:
+            reviews[role] = review
+    return reviews
+
+def early_result(resume_text, job_role):
+    """The result when the cache, the keyword gate or a missing API key decides it without the model, else None."""
+    cached = cache.get(resume_text, job_role, PROMPT_VERSION)
+    if cached is not None:
+        return cached
+
+    local = local_analysis(resume_text, job_role, client.available)
+    if local:
+        return local
+
+    if not client.backend.configured:
+        return "Error: AI model is not initialized. Please check your API key."
+    return None
+
+def prepare_analysis(resume_text, job_role, revision=None):
+    """
+    The part of analyze_resume before the model call. Returns (result, None)
+    when the cache, the keyword gate or a missing API key already decides
+    the result, otherwise (None, prompt). With a revisions.Revision of an
+    earlier upload, the prompt covers only the changed sections, and an
+    unchanged resume reuses the earlier result.
+    """
+    result = early_result(resume_text, job_role)
+    if result is not None:
+        return result, None
+
+    if revision is not None:
+        revisions.record(revision)
+        if revision.outcome == "unchanged":
+            return revision.previous.result, None
+        if revision.outcome == "delta":
+            return None, revision.build_prompt(job_role)
+    return None, build_analysis_prompt(resume_text, job_role)
+
+def complete_analysis(resume_text, job_role, response=None, error=None):
+    """The part after the model call: caches the response, or falls back after an LLMError."""
+    if error is not None:
+        print(f"Error generating content from AI: {error}")
+        # Breaker open or retries exhausted: keyword score beats an error page
+        return fallback_analysis(resume_text, job_role) or f"{ANALYSIS_ERROR}: {error}"
+    cache.set(resume_text, job_role, PROMPT_VERSION, response)
+    return response
+
+def prepare_multi_analysis(resume_text, job_roles):
+    """
+    prepare_analysis for several roles of one resume. Returns ({role: result}
+    for the roles decided without the model, prompt or None). The prompt
+    covers all the other roles at once.
+    """
+    results = {}
+    for role in job_roles:
+        result = early_result(resume_text, role)
+        if result is not None:
+            results[role] = result
+    pending = [role for role in job_roles if role not in results]
+    if not pending:
+        return results, None
+    if len(pending) == 1:
+        return results, build_analysis_prompt(resume_text, pending[0])
+    return results, build_multi_role_prompt(resume_text, pending)
+
+def complete_multi_analysis(resume_text, job_roles, results, response=None, error=None):
+    """
+    complete_analysis for prepare_multi_analysis. Returns ({role: result} in
+    the order of job_roles, set of roles the model reviewed). Roles missing
+    from the response fall back as if the call had failed.
+    """
+    results = dict(results)
+    pending = [role for role in job_roles if role not in results]
+    if len(pending) == 1:
+        reviews = {pending[0]: response} if error is None else {}
+    else:
+        reviews = split_role_reviews(response, pending) if error is None else {}
+    for role in pending:
+        if role in reviews:
+            results[role] = complete_analysis(resume_text, role, reviews[role])
+        else:
+            results[role] = complete_analysis(resume_text, role, error=error or LLMError(f"the response had no review for {role}"))
+    return {role: results[role] for role in job_roles}, set(reviews)
+
+def analyze_resume(resume_text, job_role):
+    """
+    Analyzes a resume against a job role using the Gemini AI.
+    Results are served from the analysis cache when the same resume was
+    already analyzed for the same role.
+    """
+    result, prompt = prepare_analysis(resume_text, job_role)
+    if prompt is None:
+        return result
+    try:
+        response = client.generate(prompt)
+    except LLMError as e:
+        return complete_analysis(resume_text, job_role, error=e)
+    return complete_analysis(resume_text, job_role, response)
+
+def fallback_analysis(resume_text, job_role):
+    """Keyword-only analysis used when the LLM call fails, or None for unknown roles."""
+    local = score_resume(resume_text, job_role)
+    return format_local_analysis(local, note=UNAVAILABLE_NOTE) if local else None
+
+def stream_failed(chunks):
+    """True when stream_analyze_resume ended with an error instead of an analysis."""
+    return not chunks or chunks[-1].lstrip().startswith((ANALYSIS_ERROR, "Error:"))
+
+def stream_analyze_resume(resume_text, job_role, llm=None):
+    """
+    Streaming variant of analyze_resume. Yields text chunks as Gemini
+    generates them; a cached result is yielded as a single chunk. When the
+    stream fails, the last chunk is an error message (see stream_failed).
+    `llm` overrides the shared LLMClient, e.g. with one on a fake backend.
+    """
+    cached = cache.get(resume_text, job_role, PROMPT_VERSION)
+    if cached is not None:
+        yield cached
+        return
+
+    llm = llm or client
+    local = local_analysis(resume_text, job_role, llm.available)
+    if local:
+        yield local
+        return
+
+    if not llm.backend.configured:
+        yield "Error: AI model is not initialized. Please check your API key."
+        return
+
+    chunks = []
     try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        print(f"Error generating content from AI: {e}")
-        return f"An error occurred during AI analysis: {e}"
\ No newline at end of file
+        for chunk in llm.stream(build_analysis_prompt(resume_text, job_role)):
+            chunks.append(chunk)
+            yield chunk
+    except LLMUnavailable as e:
+        print(f"Error streaming content from AI: {e}")
+        yield fallback_analysis(resume_text, job_role) or f"{ANALYSIS_ERROR}: {e}"
+        return
+    except LLMError as e:
+        print(f"Error streaming content from AI: {e}")
+        yield f"\n{ANALYSIS_ERROR}: {e}"
+        return
+    cache.set(resume_text, job_role, PROMPT_VERSION, "".join(chunks))
@@ -0,0 +1,175 @@
+"""
+Content-addressed cache for resume analysis results.
+
+Entries are keyed on a hash of the normalized resume text, the job role and
+the prompt version, so re-uploading the same resume for the same role never
+pays for a second Gemini call.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import metrics
+
+
+def normalize_text(text):
+    """Collapses whitespace so trivially different extractions share a key."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_key(resume_text, job_role, prompt_version):
+    """Builds the cache key for a resume/role/prompt combination."""
+    digest = hashlib.sha256()
+    digest.update(prompt_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(job_role).casefold().encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(resume_text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with a per-entry TTL."""
+    name = "memory"
+
+    def __init__(self, max_entries=512, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, **meta):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self):
+        return len(self._entries)
+
+
+class SQLCacheBackend:
+    """Stores entries in the analysis_cache table next to ResumeAnalysis."""
+    name = "sql"
+
+    def __init__(self, ttl=86400):
+        self.ttl = ttl
+
+    def get(self, key):
+        from models import db, AnalysisCacheEntry
+        try:
+            entry = db.session.get(AnalysisCacheEntry, key)
+            if entry is None:
+                return None
+            if entry.expires_at and entry.expires_at < datetime.utcnow():
+                db.session.delete(entry)
+                db.session.commit()
+                return None
+            return entry.result
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error reading analysis cache: {e}")
+            return None
+
+    def set(self, key, value, job_role=None, prompt_version=None):
+        from models import db, AnalysisCacheEntry
+        try:
+            db.session.merge(AnalysisCacheEntry(
+                key=key,
+                job_role=job_role,
+                prompt_version=prompt_version,
+                result=value,
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl)
+            ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error writing analysis cache: {e}")
+
+    def size(self):
+        from models import AnalysisCacheEntry
+        try:
+            return AnalysisCacheEntry.query.count()
+        except Exception:
+            return None
+
+
+class AnalysisCache:
+    """Wraps a backend and keeps hit/miss counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, resume_text, job_role, prompt_version):
+        value = self.backend.get(make_key(resume_text, job_role, prompt_version))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.cache_requests.inc(cache="analysis", result="miss" if value is None else "hit")
+        return value
+
+    def set(self, resume_text, job_role, prompt_version, result):
+        key = make_key(resume_text, job_role, prompt_version)
+        self.backend.set(key, result, job_role=job_role, prompt_version=prompt_version)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": self.backend.size(),
+        }
+
+
+class NullCacheBackend:
+    """Disables caching while keeping the same interface."""
+    name = "none"
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, **meta):
+        pass
+
+    def size(self):
+        return 0
+
+
+def build_cache():
+    """Builds the cache from ANALYSIS_CACHE_* environment variables."""
+    backend_name = os.getenv("ANALYSIS_CACHE_BACKEND", "memory").lower()
+    ttl = int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 86400))
+    if backend_name == "sql":
+        backend = SQLCacheBackend(ttl=ttl)
+    elif backend_name == "none":
+        backend = NullCacheBackend()
+    else:
+        backend = MemoryCacheBackend(max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", 512)), ttl=ttl)
+    return AnalysisCache(backend)
+
+
+cache = build_cache()
@@ -1,15 +1,40 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, jsonify, Response, stream_with_context
+from werkzeug.datastructures import FileStorage
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
 import os
 import io
+import json
+import time
+import hashlib
+import functools
+import hmac
+import zipfile
 
 # Local Imports
-from models import db, User, ResumeAnalysis
-from utils import generate_pdf, send_email, format_for_web, extract_analysis_data
-from resume_parser import extract_text
-from analysis import analyze_resume
-from ai_resume_generator import generate_ai_resume
+from models import db, User, ResumeAnalysis, EmailOutbox, GeneratedResume
+from utils import generate_pdf, extract_analysis_data, analysis_fields, SectionStreamer
+from migrations import migrate
+from pdf_cache import PDFCache, analysis_key
+from resume_parser import extract_text, UploadTooLarge
+from analysis import (stream_analyze_resume, stream_failed, prepare_analysis, complete_analysis,
+                      prepare_multi_analysis, complete_multi_analysis, MAX_COMPARE_ROLES)
+from llm_client import client as llm_client, LLMError
+import prompt_compactor
+import revisions
+import history_search
+from analysis_cache import cache as analysis_cache
+from skill_matcher import score_resume
+from ai_resume_generator import generate_ai_resume, generate_ai_resume_async, repair_stats
+from job_queue import SQLiteJobQueue, WorkerPool, JobFailed, DONE, FAILED
+from bulk_screen import collect_resumes, screen_resumes, ReportWriter, save_upload, check_archive, ArchiveRejected
+from mailer import enqueue_email, sender as email_sender
+from server_session import ServerSideSessionInterface, SessionStore, rotate_session
+import metrics
+from metrics import span
+from admission import AdmissionController, AdmissionRejected
 
 # App and Config
 app = Flask(__name__, 
@@ -30,6 +55,140 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Initialize extensions
 db.init_app(app)
 
+# Sessions are kept server-side so the cookie only carries an opaque id. The
+# Vercel database is in-memory per instance, so it keeps cookie sessions.
+if os.getenv("SESSION_BACKEND", "cookie" if os.getenv("VERCEL") else "server") == "server":
+    app.session_interface = ServerSideSessionInterface(SessionStore(
+        max_entries=int(os.getenv("SESSION_CACHE_SIZE", 1024)),
+        ttl=int(os.getenv("SESSION_TTL", 7 * 86400))
+    ))
+
+# Background job queue for /analyze. Serverless deployments cannot keep worker
+# threads alive between requests, so they stay on the synchronous path.
+ASYNC_ANALYZE = os.getenv("ASYNC_ANALYZE", "0" if os.getenv("VERCEL") else "1") == "1"
+JOB_DATA_DIR = os.getenv("JOB_DATA_DIR", "/tmp/resume-jobs" if os.getenv("VERCEL") else os.path.join(app.instance_path, "jobs"))
+job_queue = SQLiteJobQueue(os.path.join(JOB_DATA_DIR, "jobs.db"))
+job_workers = WorkerPool(job_queue, app, size=int(os.getenv("JOB_WORKERS", 2)))
+# Seconds one /jobs/<id>/stream response holds a worker before the browser reconnects
+JOB_STREAM_SECONDS = float(os.getenv("JOB_STREAM_SECONDS", 15))
+
+# Host-wide limits on LLM-backed requests, shared by all workers through SQLite.
+# Queued analysis jobs are already off the request path, so they may wait longer for a slot.
+admission = AdmissionController(os.getenv("ADMISSION_DB", os.path.join(JOB_DATA_DIR, "admission.db")))
+ADMISSION_JOB_WAIT = float(os.getenv("ADMISSION_JOB_WAIT", 600))
+metrics.admission_depth.set_function(admission.depth)
+metrics.job_queue_depth.set_function(lambda: {(status,): n for status, n in job_queue.counts().items()})
+
+# Emails go through the outbox table; a background thread delivers them
+email_sender.init_app(app)
+
+# Rendered report PDFs, keyed by analysis id
+pdf_cache = PDFCache(
+    os.getenv("PDF_CACHE_DIR", "/tmp/resume-pdf-cache" if os.getenv("VERCEL") else os.path.join(app.instance_path, "pdf_cache")),
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_MB", 100)) * 1024 * 1024
+)
+
+# Each gunicorn worker writes its metrics here so /metrics can add them up
+metrics.registry.configure(os.getenv("METRICS_DIR", "" if os.getenv("VERCEL") else os.path.join(app.instance_path, "metrics")))
+
+@app.before_request
+def start_job_workers():
+    # Jobs left queued by a restart run without waiting for the next submit()
+    if not os.getenv("VERCEL"):
+        job_workers.start()
+
+@app.before_request
+def start_request_trace():
+    metrics.start_trace()
+    if request.mimetype == "multipart/form-data" and request.content_length:
+        metrics.upload_bytes.observe(request.content_length, endpoint=request.endpoint or "unmatched")
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed, stages = metrics.finish_trace()
+    endpoint = request.endpoint or "unmatched"
+    metrics.http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    metrics.http_duration.observe(elapsed, endpoint=endpoint)
+    metrics.log_if_slow(f"{request.method} {request.path} -> {response.status_code}", elapsed, stages)
+    return response
+
+# Bearer token for the operator endpoints; without one they are not served at all
+OPS_TOKEN = os.getenv("OPS_TOKEN", "")
+
+# Pages to show a shed request on, with the reason flashed
+ADMISSION_PAGES = {"analyze": "index.html", "ai_resume_builder": "ai_resume_builder.html",
+                   "ai_generate_detailed": "ai_resume_builder.html"}
+
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    """Sheds an LLM request with 429 and Retry-After instead of letting it wait on the model."""
+    headers = {"Retry-After": str(e.retry_after)}
+    if request.endpoint not in ADMISSION_PAGES or request.accept_mimetypes.best == "application/json":
+        return jsonify({"error": str(e), "retry_after": e.retry_after}), 429, headers
+    flash(str(e), "warning")
+    return render_template(ADMISSION_PAGES[request.endpoint]), 429, headers
+
+class LLMStep:
+    """
+    The model call in the middle of a view. The view does its parsing and
+    checks, then returns one of these instead of a response. Under Flask the
+    step runs straight away in the worker thread; asgi.py awaits
+    `call_async` on its event loop instead, so a request waiting on the model
+    holds no thread. `then` builds the response from the call's result and
+    `on_error` from any exception except AdmissionRejected; both run in a
+    request context.
+    """
+
+    def __init__(self, call, call_async, then, on_error, user_id, route):
+        self.call = call
+        self.call_async = call_async
+        self.then = then
+        self.on_error = on_error
+        self.user_id = user_id
+        self.route = route
+
+    def run(self):
+        try:
+            with span(self.route), admission.slot(self.user_id, self.route):
+                result = self.call()
+        except Exception as e:
+            return self.finish(error=e)
+        return self.finish(result)
+
+    async def run_async(self):
+        with span(self.route):
+            async with admission.slot_async(self.user_id, self.route):
+                return await self.call_async()
+
+    def finish(self, result=None, error=None):
+        try:
+            if error is not None:
+                raise error
+            return self.then(result)
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            return self.on_error(e)
+
+def llm_view(view):
+    """Marks a view that may return an LLMStep; asgi.py calls `view.prepare` directly."""
+    @functools.wraps(view)
+    def run(*args, **kwargs):
+        rv = view(*args, **kwargs)
+        return rv.run() if isinstance(rv, LLMStep) else rv
+    run.prepare = view
+    return run
+
+def ops_view(view):
+    """Serves a view only to requests carrying `Authorization: Bearer <OPS_TOKEN>`; 404 for anyone else."""
+    @functools.wraps(view)
+    def run(*args, **kwargs):
+        supplied = request.headers.get("Authorization", "")
+        if not OPS_TOKEN or not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {OPS_TOKEN}".encode("utf-8")):
+            return jsonify({"error": "Not found."}), 404
+        return view(*args, **kwargs)
+    return run
+
 # --- Routes ---
 
 @app.route("/")
@@ -74,6 +233,9 @@ def login():
         user = User.query.filter_by(email=email).first()
 
         if user and check_password_hash(user.password, password):
+            # A fresh session id, so one planted before login never gets the user's identity
+            session.clear()
+            rotate_session(session)
             session["user_id"] = user.id
             session["user_name"] = user.name
             session["user_email"] = user.email
@@ -87,6 +249,7 @@ def login():
 @app.route("/logout")
 def logout():
     session.clear()
+    rotate_session(session)
     flash("You have been logged out.", "info")
     return redirect(url_for("index"))
 
@@ -96,13 +259,252 @@ def analyze_page():
         return redirect(url_for('login'))
     return render_template("index.html")
 
-def save_history(user_id, job_role, result):
-    """Saves the analysis result to the database."""
-    new_analysis = ResumeAnalysis(user_id=user_id, job_role=job_role, result=result)
+def save_history(user_id, job_role, result, revision=None):
+    """
+    Saves the analysis result to the database. Pass the upload's Revision
+    when the model wrote the result, so a later revision can build on it.
+    """
+    new_analysis = ResumeAnalysis(user_id=user_id, job_role=job_role, result=result, **analysis_fields(result))
+    if revision is not None:
+        new_analysis.section_hashes = revision.fingerprints
+        new_analysis.revision_of_id = revision.base_id
     db.session.add(new_analysis)
-    db.session.commit()
+    with span("db_commit"):
+        db.session.commit()
+    return new_analysis
+
+def analysis_pdf(analysis):
+    """Returns the report PDF for an analysis, rendering it only on a cache miss."""
+    def render():
+        with span("pdf_render"):
+            html = render_template("report.html", result=analysis.html, job_role=analysis.job_role, now=analysis.created_at or datetime.now())
+            return generate_pdf(html)
+    key = analysis_key(analysis.id, analysis.created_at, str(analysis.user_id), analysis.job_role, analysis.result)
+    return pdf_cache.get_or_render(key, render)
+
+def process_analysis(file, job_role, user_id, recipient_email=None, set_stage=None, slot_timeout=None):
+    """
+    Runs the extract -> analyze -> save -> PDF -> email stages for one upload.
+    Used directly by /analyze and by the background job worker. The analyze
+    stage waits up to slot_timeout seconds for an LLM slot.
+    """
+    set_stage = set_stage or (lambda stage: None)
+
+    set_stage("extract")
+    with span("extract"):
+        resume_text = extract_text(file)
+    if "Error" in resume_text:
+        return {"error": resume_text}
+
+    set_stage("analyze")
+    with span("analyze"):
+        revision = revisions.compare(resume_text, user_id, job_role)
+        result, prompt = prepare_analysis(resume_text, job_role, revision)
+        if prompt is None:
+            revision = None
+        else:
+            with admission.slot(user_id, "analyze", timeout=slot_timeout):
+                try:
+                    result = complete_analysis(resume_text, job_role, llm_client.generate(prompt))
+                except LLMError as e:
+                    result, revision = complete_analysis(resume_text, job_role, error=e), None
+
+    return finish_analysis(result, job_role, user_id, recipient_email, set_stage, revision)
+
+def finish_analysis(result, job_role, user_id, recipient_email=None, set_stage=None, revision=None):
+    """The save -> PDF -> email stages of process_analysis."""
+    set_stage = set_stage or (lambda stage: None)
+
+    set_stage("save")
+    with span("save"):
+        analysis = save_history(user_id, job_role, result, revision)
+
+    email_status = None
+    if recipient_email:
+        set_stage("pdf")
+        with span("pdf"):
+            pdf = analysis_pdf(analysis)
+        if pdf:
+            set_stage("email")
+            with span("email"):
+                enqueue_email(recipient_email, f"Resume Report for {job_role}", "Your analysis result is attached.",
+                              attachment=pdf, user_id=user_id, analysis_id=analysis.id)
+            email_status = "queued"
+        else:
+            email_status = "pdf_failed"
+
+    return {"analysis_id": analysis.id, "job_role": job_role, "result": result, "email_status": email_status}
+
+def process_multi_analysis(file, job_roles, user_id, recipient_email=None, set_stage=None, slot_timeout=None):
+    """
+    process_analysis for several job roles: the resume is extracted once and
+    reviewed for all roles in one model call, then saved as one analysis per role.
+    """
+    set_stage = set_stage or (lambda stage: None)
+
+    set_stage("extract")
+    with span("extract"):
+        resume_text = extract_text(file)
+    if "Error" in resume_text:
+        return {"error": resume_text}
+
+    set_stage("analyze")
+    with span("analyze"):
+        results, prompt = prepare_multi_analysis(resume_text, job_roles)
+        response = error = None
+        if prompt is not None:
+            with admission.slot(user_id, "analyze", timeout=slot_timeout):
+                try:
+                    response = llm_client.generate(prompt)
+                except LLMError as e:
+                    error = e
+        results, reviewed = complete_multi_analysis(resume_text, job_roles, results, response, error)
+
+    return finish_multi_analysis(results, reviewed, resume_text, user_id, recipient_email, set_stage)
+
+def finish_multi_analysis(results, reviewed, resume_text, user_id, recipient_email=None, set_stage=None):
+    """
+    Runs finish_analysis for each role's result, in order. Results the model
+    wrote (the roles in `reviewed`) are saved with section fingerprints, so
+    a later single-role revision can build on them.
+    """
+    revision = revisions.Revision(resume_text) if reviewed else None
+    outcomes = [finish_analysis(result, role, user_id, recipient_email, set_stage, revision if role in reviewed else None)
+                for role, result in results.items()]
+    statuses = [outcome["email_status"] for outcome in outcomes]
+    return {
+        "analysis_ids": [outcome["analysis_id"] for outcome in outcomes],
+        "job_roles": list(results),
+        # One report email per role; surface the first problem, if any
+        "email_status": next((status for status in statuses if status != "queued"), statuses[0]),
+    }
+
+def role_comparison(analysis_ids):
+    """Renders the logged-in user's analyses of one resume for several roles side by side."""
+    rows = ResumeAnalysis.query.filter(ResumeAnalysis.id.in_(analysis_ids),
+                                       ResumeAnalysis.user_id == session.get("user_id")).all()
+    by_id = {analysis.id: analysis for analysis in rows}
+    analyses = [by_id[analysis_id] for analysis_id in analysis_ids if analysis_id in by_id]
+    if not analyses:
+        return None
+    best = max(analyses, key=lambda analysis: analysis.score if analysis.score is not None else -1)
+    return render_template("role_comparison.html", analyses=analyses, best_id=best.id)
+
+EMAIL_STATUS_MESSAGES = {
+    "queued": ("Your analysis report is on its way to your email!", "success"),
+    "sent": ("Analysis report has been sent to your email!", "success"),
+    "failed": ("Could not send email. Please try again later.", "danger"),
+    "pdf_failed": ("Could not generate PDF for email.", "danger"),
+}
+
+def run_analysis_job(job, set_stage):
+    """Job handler for queued /analyze uploads."""
+    payload = job["payload"]
+    try:
+        with open(payload["upload_path"], "rb") as stream:
+            upload = FileStorage(stream=stream, filename=payload["filename"])
+            if payload.get("job_roles"):
+                outcome = process_multi_analysis(upload, payload["job_roles"], job["user_id"],
+                                                 recipient_email=payload.get("recipient_email"),
+                                                 set_stage=set_stage, slot_timeout=ADMISSION_JOB_WAIT)
+            else:
+                outcome = process_analysis(
+                    upload,
+                    payload["job_role"],
+                    job["user_id"],
+                    recipient_email=payload.get("recipient_email"),
+                    set_stage=set_stage,
+                    slot_timeout=ADMISSION_JOB_WAIT
+                )
+    except AdmissionRejected as e:
+        raise JobFailed(str(e))
+    finally:
+        try:
+            os.remove(payload["upload_path"])
+        except OSError:
+            pass
+    if "error" in outcome:
+        raise JobFailed(outcome["error"])
+    return outcome
+
+job_workers.register("analyze", run_analysis_job)
+
+def enqueue_analysis(file, job_role, recipient_email, job_roles=None):
+    """Spools the upload to disk and queues it for the worker pool. Pass job_roles to compare several roles."""
+    upload_dir = os.path.join(JOB_DATA_DIR, "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    upload_path = os.path.join(upload_dir, f"{os.urandom(16).hex()}{os.path.splitext(file.filename)[1]}")
+    file.save(upload_path)
+    return job_workers.submit("analyze", {
+        "upload_path": upload_path,
+        "filename": file.filename,
+        "job_role": job_role,
+        "job_roles": job_roles if job_roles and len(job_roles) > 1 else None,
+        "recipient_email": recipient_email,
+    }, user_id=session["user_id"])
+
+def run_bulk_screen_job(job, set_stage):
+    """Job handler that screens every resume in an uploaded ZIP."""
+    payload = job["payload"]
+    try:
+        resumes = collect_resumes(payload["upload_path"])
+    except (ArchiveRejected, zipfile.BadZipFile) as e:
+        raise JobFailed(str(e))
+    finally:
+        os.remove(payload["upload_path"])
+    if not resumes:
+        raise JobFailed("No PDF or DOCX resumes found in the ZIP file.")
+
+    report = ReportWriter(payload["report_path"])
+
+    def on_result(row):
+        report.write(row)
+        if row["status"] == "ok":
+            save_history(job["user_id"], payload["job_role"], row["result"])
+
+    try:
+        progress = screen_resumes(
+            resumes, payload["job_role"],
+            on_result=on_result,
+            on_progress=lambda p: set_stage(str(p)),
+            llm_workers=int(os.getenv("BULK_LLM_WORKERS", 4)),
+            rate_per_minute=float(os.getenv("BULK_LLM_RATE", 60)),
+            # Each model call counts against the host-wide and per-user in-flight caps
+            slot=lambda: admission.slot(job["user_id"], "bulk", timeout=ADMISSION_JOB_WAIT),
+            # Analysis threads read the analysis cache, which may be the sql backend
+            context=app.app_context,
+        )
+    finally:
+        report.close()
+    return {
+        "job_role": payload["job_role"],
+        "total": progress.total,
+        "failed": progress.failed,
+        "resumes_per_minute": round(progress.per_minute, 1),
+    }
+
+job_workers.register("bulk_screen", run_bulk_screen_job)
+
+def job_status(job):
+    """Public view of a job for the status endpoints."""
+    status = {"id": job["id"], "kind": job["kind"], "status": job["status"], "stage": job["stage"], "error": job["error"]}
+    if job["status"] == DONE and job["result"]:
+        status.update({key: value for key, value in job["result"].items() if key != "result"})
+        if job["kind"] == "bulk_screen":
+            status["report_url"] = url_for("bulk_screen_report", job_id=job["id"])
+    return status
+
+def requested_roles(job_role, compare_roles=None):
+    """The target role followed by the comma-separated roles to compare it with, without duplicates."""
+    roles = {}
+    for role in [job_role] + (compare_roles or "").split(","):
+        role = " ".join(role.split())
+        if role:
+            roles.setdefault(role.casefold(), role)
+    return list(roles.values())
 
 @app.route("/analyze", methods=["GET", "POST"])
+@llm_view
 def analyze():
     if request.method == 'GET':
         return redirect(url_for('analyze_page'))
@@ -116,6 +518,11 @@ def analyze():
         flash("Job role is required.", "warning")
         return redirect(url_for("analyze_page"))
 
+    job_roles = requested_roles(job_role, request.form.get("compare_roles"))
+    if len(job_roles) > MAX_COMPARE_ROLES:
+        flash(f"You can compare up to {MAX_COMPARE_ROLES} job roles at a time.", "warning")
+        return redirect(url_for("analyze_page"))
+
     recipient_email = request.form.get("email")
 
     if "resume" not in request.files:
@@ -127,54 +534,434 @@ def analyze():
         flash("Resume file not selected.", "danger")
         return redirect(url_for("analyze_page"))
 
-    try:
-        resume_text = extract_text(file)
-        if "Error" in resume_text:
-             flash(resume_text, "danger")
-             return redirect(url_for("analyze_page"))
-
-        result = analyze_resume(resume_text, job_role)
-        save_history(session["user_id"], job_role, result)
-
-        session["latest_result"] = result
-        session["latest_role"] = job_role
-
-        if recipient_email:
-            html = render_template("report.html", result=format_for_web(result), job_role=job_role, now=datetime.now())
-            pdf = generate_pdf(html)
-            if pdf:
-                email_sent = send_email(recipient_email, f"Resume Report for {job_role}", "Your analysis result is attached.", attachment=pdf)
-                if email_sent:
-                    flash("Analysis report has been sent to your email!", "success")
-                else:
-                    flash("Could not send email. Please try again later.", "danger")
-            else:
-                flash("Could not generate PDF for email.", "danger")
+    user_id = session["user_id"]
+    admission.check_rate(user_id, "analyze")
+
+    def failed(e):
+        flash(f"An unexpected error occurred: {str(e)}", "danger")
+        return redirect(url_for("analyze_page"))
+
+    def show_result(result, revision=None):
+        outcome = finish_analysis(result, job_role, user_id, recipient_email=recipient_email, revision=revision)
+        analysis = db.session.get(ResumeAnalysis, outcome["analysis_id"])
+        session["latest_analysis_id"] = analysis.id
+
+        if outcome["email_status"]:
+            flash(*EMAIL_STATUS_MESSAGES[outcome["email_status"]])
 
         flash("Resume analysis completed successfully!", "success")
         # Here you would pass the analysis data to the template for graphing
         # For now, we'll just render the index.html as before.
         # In a real implementation, you'd pass `result` or `extract_analysis_data(result)`
-        return render_template("index.html", result=format_for_web(result), job_role=job_role)
+        return render_template("index.html", result=analysis.html, job_role=job_role)
+
+    def show_comparison(results, reviewed):
+        outcome = finish_multi_analysis(results, reviewed, resume_text, user_id, recipient_email=recipient_email)
+        session["latest_analysis_id"] = outcome["analysis_ids"][0]
+
+        if outcome["email_status"]:
+            flash(*EMAIL_STATUS_MESSAGES[outcome["email_status"]])
+
+        flash(f"Resume analyzed for {len(job_roles)} job roles!", "success")
+        return render_template("index.html", comparison=role_comparison(outcome["analysis_ids"]), job_role=", ".join(job_roles))
+
+    try:
+        if ASYNC_ANALYZE:
+            job_id = enqueue_analysis(file, job_role, recipient_email, job_roles)
+            if request.accept_mimetypes.best == "application/json":
+                return jsonify({
+                    "job_id": job_id,
+                    "status_url": url_for("job_detail", job_id=job_id),
+                    "stream_url": url_for("job_stream", job_id=job_id),
+                }), 202
+            return render_template("index.html", job_id=job_id, job_role=", ".join(job_roles))
+
+        with span("extract"):
+            resume_text = extract_text(file)
+        if "Error" in resume_text:
+            flash(resume_text, "danger")
+            return redirect(url_for("analyze_page"))
+        if len(job_roles) > 1:
+            # Saare roles ek hi prompt me, resume sirf ek baar jaata hai
+            results, prompt = prepare_multi_analysis(resume_text, job_roles)
+            if prompt is None:
+                return show_comparison(results, set())
+        else:
+            revision = revisions.compare(resume_text, user_id, job_role)
+            result, prompt = prepare_analysis(resume_text, job_role, revision)
+            if prompt is None:
+                return show_result(result)
     except Exception as e:
-        flash(f"An unexpected error occurred: {str(e)}", "danger")
-        return redirect(url_for("analyze_page"))
+        return failed(e)
+
+    def model_done(response=None, error=None):
+        if len(job_roles) > 1:
+            return show_comparison(*complete_multi_analysis(resume_text, job_roles, results, response, error))
+        if error is not None:
+            return show_result(complete_analysis(resume_text, job_role, error=error))
+        return show_result(complete_analysis(resume_text, job_role, response), revision)
+
+    def model_failed(e):
+        # LLM ki galti par keyword score dikhate hain, baaki errors par flash
+        if isinstance(e, LLMError):
+            return model_done(error=e)
+        return failed(e)
+
+    return LLMStep(lambda: llm_client.generate(prompt), lambda: llm_client.agenerate(prompt),
+                   then=model_done, on_error=model_failed, user_id=user_id, route="analyze")
+
+def sse_event(event, data, event_id=None):
+    """Formats one Server-Sent Events message."""
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\n{message}" if event_id is not None else message
+
+@app.route("/analyze/stream", methods=["POST"])
+def analyze_stream():
+    """
+    Streams the analysis to the browser as Server-Sent Events: raw `chunk`
+    events as Gemini generates text, a formatted `section` event for each
+    completed section, and `done` once the result has been saved. A stream
+    that fails partway ends with `error` and is not saved to the history.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in first."}), 401
+
+    job_role = request.form.get("job_role")
+    file = request.files.get("resume")
+    if not job_role or not file or file.filename == "":
+        return jsonify({"error": "Job role and resume file are required."}), 400
+
+    user_id = session["user_id"]
+    admission.check_rate(user_id, "analyze_stream")
+    resume_text = extract_text(file)
+    if "Error" in resume_text:
+        return jsonify({"error": resume_text}), 400
+
+    def events():
+        # Taken on the first read and held until the stream ends, since the model is
+        # generating the whole time. A response that is never read never takes a slot.
+        try:
+            lease = admission.acquire(user_id, "analyze_stream")
+        except AdmissionRejected as e:
+            yield sse_event("error", {"error": str(e), "retry_after": e.retry_after})
+            return
+        streamer = SectionStreamer()
+        chunks = []
+        try:
+            for chunk in stream_analyze_resume(resume_text, job_role):
+                chunks.append(chunk)
+                yield sse_event("chunk", {"text": chunk})
+                for html in streamer.feed(chunk):
+                    yield sse_event("section", {"html": html})
+        finally:
+            admission.release(lease)
+        for html in streamer.finish():
+            yield sse_event("section", {"html": html})
+
+        if stream_failed(chunks):
+            yield sse_event("error", {"error": "The analysis did not finish, so it was not saved. Please try again."})
+            return
+        result = "".join(chunks)
+        try:
+            analysis = save_history(user_id, job_role, result)
+            yield sse_event("done", {"analysis_id": analysis.id, "job_role": job_role})
+        except Exception as e:
+            db.session.rollback()
+            yield sse_event("error", {"error": f"Could not save analysis: {e}"})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def user_analysis(analysis_id):
+    """Returns the analysis if it belongs to the logged-in user."""
+    analysis = db.session.get(ResumeAnalysis, analysis_id) if analysis_id else None
+    if not analysis or analysis.user_id != session.get("user_id"):
+        return None
+    return analysis
+
+def load_user_job(job_id):
+    """Returns the job if it belongs to the logged-in user."""
+    job = job_queue.get(job_id)
+    if not job or job["user_id"] != session.get("user_id"):
+        return None
+    return job
+
+@app.route("/jobs/<job_id>")
+def job_detail(job_id):
+    """Polling endpoint for a queued analysis."""
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in first."}), 401
+    job = load_user_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found."}), 404
+
+    status = job_status(job)
+    if job["kind"] == "analyze" and job["status"] == DONE and job["result"] and "analysis_ids" in job["result"]:
+        status["result_html"] = role_comparison(job["result"]["analysis_ids"])
+        session["latest_analysis_id"] = job["result"]["analysis_ids"][0]
+    elif job["kind"] == "analyze" and job["status"] == DONE and job["result"]:
+        analysis = user_analysis(job["result"]["analysis_id"])
+        if analysis:
+            status["result_html"] = analysis.html
+            # Make the finished analysis available to /download_pdf and /email-result
+            session["latest_analysis_id"] = analysis.id
+    return jsonify(status)
+
+@app.route("/jobs/<job_id>/stream")
+def job_stream(job_id):
+    """
+    Server-Sent Events stream of status changes for a queued analysis. Each
+    response ends after JOB_STREAM_SECONDS so it does not hold a sync worker
+    for the whole job; the browser reconnects with Last-Event-ID and only
+    gets the status again if it changed.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in first."}), 401
+    if not load_user_job(job_id):
+        return jsonify({"error": "Job not found."}), 404
+    last_seen = request.headers.get("Last-Event-ID")
+
+    def events():
+        yield "retry: 1000\n\n"
+        deadline = time.monotonic() + JOB_STREAM_SECONDS
+        last = last_seen
+        while True:
+            job = job_queue.get(job_id)
+            status = job_status(job)
+            version = hashlib.sha256(json.dumps(status, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+            if version != last:
+                yield sse_event("status", status, event_id=version)
+                last = version
+            if job["status"] in (DONE, FAILED) or time.monotonic() >= deadline:
+                return
+            time.sleep(0.5)
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/bulk-screen", methods=["POST"])
+def bulk_screen():
+    """Queues a ZIP of resumes to be screened against one job role."""
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in first."}), 401
+
+    job_role = request.form.get("job_role")
+    file = request.files.get("resumes")
+    if not job_role or not file or not file.filename.lower().endswith(".zip"):
+        return jsonify({"error": "A job role and a ZIP file of resumes are required."}), 400
+
+    os.makedirs(os.path.join(JOB_DATA_DIR, "uploads"), exist_ok=True)
+    os.makedirs(os.path.join(JOB_DATA_DIR, "reports"), exist_ok=True)
+    token = os.urandom(16).hex()
+    upload_path = os.path.join(JOB_DATA_DIR, "uploads", f"{token}.zip")
+    try:
+        save_upload(file, upload_path)
+        check_archive(upload_path)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except (ArchiveRejected, zipfile.BadZipFile) as e:
+        os.remove(upload_path)
+        return jsonify({"error": f"Invalid ZIP file: {e}" if isinstance(e, zipfile.BadZipFile) else str(e)}), 400
+    report_format = "jsonl" if request.form.get("format") == "jsonl" else "csv"
+    job_id = job_workers.submit("bulk_screen", {
+        "upload_path": upload_path,
+        "report_path": os.path.join(JOB_DATA_DIR, "reports", f"{token}.{report_format}"),
+        "job_role": job_role,
+    }, user_id=session["user_id"])
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for("job_detail", job_id=job_id),
+        "stream_url": url_for("job_stream", job_id=job_id),
+    }), 202
+
+@app.route("/bulk-screen/<job_id>/report")
+def bulk_screen_report(job_id):
+    """Downloads the CSV/JSONL report of a bulk screening job."""
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    job = load_user_job(job_id)
+    if not job or job["kind"] != "bulk_screen" or not os.path.exists(job["payload"]["report_path"]):
+        flash("Screening report not found.", "danger")
+        return redirect(url_for("dashboard"))
+    report_path = job["payload"]["report_path"]
+    return send_file(report_path, as_attachment=True,
+                     download_name=f"screening_report{os.path.splitext(report_path)[1]}")
 
 @app.route("/dashboard")
 def dashboard():
     if "user_id" not in session:
         return redirect(url_for("login"))
-    history = ResumeAnalysis.query.filter_by(user_id=session["user_id"]).order_by(ResumeAnalysis.created_at.desc()).all()
-    return render_template("dashboard.html", name=session.get("user_name"), history=history)
+    sort = "score" if request.args.get("sort") == "score" else "recent"
+    min_score = request.args.get("min_score", type=int)
+    history, next_cursor = dashboard_page(session["user_id"], sort, request.args.get("after"), min_score)
+    return render_template("dashboard.html", name=session.get("user_name"), history=history,
+                           sort=sort, min_score=min_score, next_cursor=next_cursor,
+                           email_statuses=latest_email_statuses(session["user_id"], [a.id for a in history]))
+
+DASHBOARD_PAGE_SIZE = 20
+
+def dashboard_page(user_id, sort, cursor=None, min_score=None, page_size=DASHBOARD_PAGE_SIZE):
+    """
+    Returns one page of a user's history plus the cursor for the next page.
+    Keyset pagination on (created_at, id) or (score, id) keeps every page an
+    index range scan, and only the summary columns are loaded.
+    """
+    sort_column = ResumeAnalysis.score if sort == "score" else ResumeAnalysis.created_at
+    query = (ResumeAnalysis.query
+             .options(load_only(ResumeAnalysis.id, ResumeAnalysis.job_role, ResumeAnalysis.created_at, ResumeAnalysis.score))
+             .filter(ResumeAnalysis.user_id == user_id))
+    if sort == "score":
+        query = query.filter(ResumeAnalysis.score.isnot(None))
+    if min_score is not None:
+        query = query.filter(ResumeAnalysis.score >= min_score)
+
+    if cursor:
+        try:
+            value, last_id = cursor.rsplit("_", 1)
+            value = int(value) if sort == "score" else datetime.fromisoformat(value)
+            last_id = int(last_id)
+        except ValueError:
+            value = None
+        if value is not None:
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, ResumeAnalysis.id < last_id)))
+
+    rows = query.order_by(sort_column.desc(), ResumeAnalysis.id.desc()).limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        value = last.score if sort == "score" else last.created_at.isoformat()
+        next_cursor = f"{value}_{last.id}"
+    return rows, next_cursor
+
+def latest_email_statuses(user_id, analysis_ids):
+    """Maps analysis id -> status of the most recent email queued for it."""
+    if not analysis_ids:
+        return {}
+    rows = (EmailOutbox.query
+            .with_entities(EmailOutbox.analysis_id, EmailOutbox.status)
+            .filter(EmailOutbox.user_id == user_id, EmailOutbox.analysis_id.in_(analysis_ids))
+            .order_by(EmailOutbox.id)
+            .all())
+    return {analysis_id: status for analysis_id, status in rows}
+
+@app.route("/analysis/<int:analysis_id>.json")
+def analysis_detail(analysis_id):
+    """Full result of one analysis, loaded lazily by the dashboard."""
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in first."}), 401
+    analysis = user_analysis(analysis_id)
+    if not analysis:
+        return jsonify({"error": "Analysis not found."}), 404
+    return jsonify({
+        "id": analysis.id,
+        "job_role": analysis.job_role,
+        "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
+        "score": analysis.score,
+        "strengths": analysis.strengths,
+        "improvements": analysis.improvements,
+        "missing_skills": analysis.missing_skills,
+        "category_scores": analysis.category_scores,
+        "html": analysis.html,
+    })
+
+@app.route("/search")
+def search_history():
+    """
+    Full-text search over the user's analyses: ?q=, repeatable ?role=,
+    ?from= and ?to= dates (YYYY-MM-DD, inclusive), ?page= and ?page_size=.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in first."}), 401
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "A search query (q) is required."}), 400
+    try:
+        date_from, date_to = (datetime.strptime(request.args[name], "%Y-%m-%d") if request.args.get(name) else None
+                              for name in ("from", "to"))
+    except ValueError:
+        return jsonify({"error": "Dates must be in YYYY-MM-DD format."}), 400
+    with span("search"):
+        results = history_search.search(session["user_id"], query, roles=request.args.getlist("role"),
+                                        date_from=date_from, date_to=date_to,
+                                        page=request.args.get("page", 1, type=int),
+                                        page_size=request.args.get("page_size", history_search.PAGE_SIZE, type=int))
+    return jsonify(results)
+
+@app.route("/preview-score", methods=["POST"])
+def preview_score():
+    """Instant keyword-based score for a resume, without calling the LLM."""
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in first."}), 401
+
+    job_role = request.form.get("job_role")
+    resume_text = request.form.get("resume_text")
+    file = request.files.get("resume")
+    if not resume_text and file and file.filename:
+        resume_text = extract_text(file)
+        if "Error" in resume_text:
+            return jsonify({"error": resume_text}), 400
+    if not job_role or not resume_text:
+        return jsonify({"error": "Job role and resume are required."}), 400
+
+    local = score_resume(resume_text, job_role)
+    if local is None:
+        return jsonify({"error": f"No skill list is available for '{job_role}'."}), 404
+    return jsonify(local)
+
+@app.route("/match-roles", methods=["GET", "POST"])
+def match_roles():
+    """Ranks every known job role for each uploaded resume."""
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    if request.method == "GET":
+        return render_template("match_roles.html")
+
+    # NumPy is only needed here, so keep it off the import path of other routes
+    from role_matcher import role_matrix
+
+    top_k = min(max(request.form.get("top_k", 3, type=int), 1), len(role_matrix.roles))
+    matches, texts = [], []
+    for file in request.files.getlist("resumes"):
+        if not file or not file.filename:
+            continue
+        resume_text = extract_text(file)
+        if "Error" in resume_text:
+            matches.append({"filename": file.filename, "error": resume_text})
+        else:
+            matches.append({"filename": file.filename})
+            texts.append(resume_text)
+
+    ranked = iter(role_matrix.top_k(texts, k=top_k)) if texts else iter(())
+    for match in matches:
+        if "error" not in match:
+            match["roles"] = next(ranked)
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(matches)
+    return render_template("match_roles.html", matches=matches, top_k=top_k)
+
+@app.route("/cache-stats")
+@ops_view
+def cache_stats():
+    """Returns hit/miss counters for the analysis and PDF caches, plus LLM call, prompt and JSON repair stats."""
+    return jsonify({**analysis_cache.stats(), "pdf": pdf_cache.stats(), "llm": llm_client.stats(),
+                    "prompt": prompt_compactor.stats(), "revisions": revisions.stats(), "ai_resume": repair_stats()})
+
+@app.route("/metrics")
+@ops_view
+def prometheus_metrics():
+    """Request, stage, LLM, SMTP, upload and cache metrics in Prometheus text format."""
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/download_pdf")
 def download_pdf():
-    if "user_id" not in session or "latest_result" not in session:
+    # Streamed analyses cannot update the session cookie, so they link by id
+    analysis = user_analysis(request.args.get("analysis_id", type=int) or session.get("latest_analysis_id"))
+    if not analysis:
         flash("No analysis result available to download.", "warning")
         return redirect(url_for("dashboard"))
 
-    html = render_template("report.html", result=format_for_web(session["latest_result"]), job_role=session["latest_role"], now=datetime.now())
-    pdf = generate_pdf(html)
+    pdf = analysis_pdf(analysis)
     if pdf:
         return send_file(pdf, as_attachment=True, download_name="Resume_Analysis.pdf", mimetype="application/pdf")
     else:
@@ -184,17 +971,19 @@ def download_pdf():
 @app.route("/email-result")
 def email_result():
     """Emails the most recent analysis result from the session."""
-    if "user_id" not in session or "latest_result" not in session:
+    analysis = user_analysis(session.get("latest_analysis_id"))
+    if not analysis:
         flash("No recent analysis available to email.", "warning")
         return redirect(url_for("dashboard"))
 
     try:
-        html = render_template("report.html", result=format_for_web(session["latest_result"]), job_role=session["latest_role"], now=datetime.now())
-        pdf = generate_pdf(html)
-        if pdf and send_email(session["user_email"], f"Resume Report for {session['latest_role']}", "Find your analysis attached.", attachment=pdf):
-            flash("Analysis report sent to your email!", "success")
+        pdf = analysis_pdf(analysis)
+        if pdf:
+            enqueue_email(session["user_email"], f"Resume Report for {analysis.job_role}", "Find your analysis attached.",
+                          attachment=pdf, user_id=session["user_id"], analysis_id=analysis.id)
+            flash(*EMAIL_STATUS_MESSAGES["queued"])
         else:
-            flash("Failed to send email.", "danger")
+            flash(*EMAIL_STATUS_MESSAGES["pdf_failed"])
     except Exception as e:
         flash(f"Error sending email: {str(e)}", "danger")
 
@@ -207,30 +996,54 @@ def email_analysis(analysis_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
 
-    analysis = db.session.get(ResumeAnalysis, analysis_id)
-    if not analysis or analysis.user_id != session["user_id"]:
+    analysis = user_analysis(analysis_id)
+    if not analysis:
         flash("Analysis not found or you don't have permission.", "danger")
         return redirect(url_for("dashboard"))
 
     try:
-        html = render_template("report.html", result=format_for_web(analysis.result), job_role=analysis.job_role, now=datetime.now())
-        pdf = generate_pdf(html)
-        if pdf and send_email(session["user_email"], f"Resume Report for {analysis.job_role}", "Find your analysis attached.", attachment=pdf):
-            flash("Analysis report sent to your email!", "success")
+        pdf = analysis_pdf(analysis)
+        if pdf:
+            enqueue_email(session["user_email"], f"Resume Report for {analysis.job_role}", "Find your analysis attached.",
+                          attachment=pdf, user_id=session["user_id"], analysis_id=analysis.id)
+            flash(*EMAIL_STATUS_MESSAGES["queued"])
         else:
-            flash("Failed to send email.", "danger")
+            flash(*EMAIL_STATUS_MESSAGES["pdf_failed"])
     except Exception as e:
         flash(f"Error sending email: {str(e)}", "danger")
 
     return redirect(url_for("dashboard"))
 
+def ai_resume_step(user_input, route, success_message, error_message):
+    """Generates an AI resume under admission control and shows it; shared by both AI builder routes."""
+    def show(ai_resume):
+        resume = save_generated_resume(ai_resume, ai_generated=True)
+        flash(success_message, "success")
+        return render_template("resume_result.html", resume_data=ai_resume, ai_generated=True, resume_id=resume.id)
+
+    def failed(e):
+        flash(f"{error_message}: {str(e)}", "danger")
+        return redirect(url_for("ai_resume_builder"))
+
+    admission.check_rate(session["user_id"], route)
+    return LLMStep(lambda: generate_ai_resume(user_input), lambda: generate_ai_resume_async(user_input),
+                   then=show, on_error=failed, user_id=session["user_id"], route=route)
+
+def save_generated_resume(resume_data, ai_generated=False):
+    """Stores a built resume and remembers its id in the session for the PDF download."""
+    resume = GeneratedResume(user_id=session["user_id"], data=resume_data, ai_generated=ai_generated)
+    db.session.add(resume)
+    db.session.commit()
+    session["generated_resume_id"] = resume.id
+    return resume
+
 @app.route("/build-resume", methods=["GET", "POST"])
 def build_resume():
     if "user_id" not in session:
         return redirect(url_for("login"))
 
     if request.method == "POST":
-        session['generated_resume'] = {
+        resume_data = {
             'name': request.form.get('name'),
             'email': request.form.get('email'),
             'phone': request.form.get('phone'),
@@ -241,11 +1054,13 @@ def build_resume():
             'certifications': request.form.get('certifications'),
             'achievements': request.form.get('achievements')
         }
-        return render_template("resume_result.html", resume_data=session['generated_resume'])
+        resume = save_generated_resume(resume_data)
+        return render_template("resume_result.html", resume_data=resume_data, resume_id=resume.id)
 
     return render_template("build_resume.html")
 
 @app.route("/ai-resume-builder", methods=["GET", "POST"])
+@llm_view
 def ai_resume_builder():
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -261,18 +1076,13 @@ def ai_resume_builder():
             return render_template("ai_builder_details.html", user_input=user_input)
 
         # Agar details sufficient hain, to direct resume generate karein
-        try:
-            ai_resume = generate_ai_resume(user_input)
-            session['generated_resume'] = ai_resume
-            flash("Your professional resume has been generated by AI!", "success")
-            return render_template("resume_result.html", resume_data=ai_resume, ai_generated=True)
-        except Exception as e:
-            flash(f"Error generating AI resume: {str(e)}", "danger")
-            return redirect(url_for("ai_resume_builder"))
+        return ai_resume_step(user_input, "ai_resume", "Your professional resume has been generated by AI!",
+                              "Error generating AI resume")
 
     return render_template("ai_resume_builder.html")
 
 @app.route("/ai-generate-detailed", methods=["POST"])
+@llm_view
 def ai_generate_detailed():
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -311,28 +1121,29 @@ def ai_generate_detailed():
         edu_index += 1
 
     # Ab is structured data se resume generate karein
-    try:
-        ai_resume = generate_ai_resume(user_input)
-        session['generated_resume'] = ai_resume
-        flash("Your professional resume has been generated by AI with your detailed input!", "success")
-        return render_template("resume_result.html", resume_data=ai_resume, ai_generated=True)
-    except Exception as e:
-        flash(f"Error generating detailed AI resume: {str(e)}", "danger")
-        return redirect(url_for("ai_resume_builder"))
+    return ai_resume_step(user_input, "ai_generate",
+                          "Your professional resume has been generated by AI with your detailed input!",
+                          "Error generating detailed AI resume")
 
 @app.route("/download-resume-pdf")
 def download_resume_pdf():
-    if "user_id" not in session or "generated_resume" not in session:
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    resume_id = request.args.get("resume_id", type=int) or session.get("generated_resume_id")
+    resume = GeneratedResume.query.filter_by(id=resume_id, user_id=session["user_id"]).first() if resume_id else None
+    if not resume:
         flash("No resume data available to download.", "warning")
         return redirect(url_for("build_resume"))
 
-    resume_data = session.get("generated_resume")
+    resume_data = resume.data
     try:
-        # HTML template render karein
-        html_string = render_template("resume_pdf.html", resume_data=resume_data)
+        # ReportLab yahin import hota hai taaki cold start halka rahe
+        from resume_pdf import generate_resume_pdf
 
-        # Hamare universal generate_pdf function ka istemal karein
-        pdf_file = generate_pdf(html_string)
+        # Resume dict se seedha ReportLab flowables banate hain, HTML ki zaroorat nahi
+        with span("pdf_render"):
+            pdf_file = generate_resume_pdf(resume_data)
 
         if pdf_file:
             return send_file(
@@ -358,7 +1169,7 @@ if __name__ == "__main__":
             pass # Folder already exists
 
     with app.app_context():
-        db.create_all()
+        migrate()
 
     # Use PORT environment variable for production, default to 5000 for local
     port = int(os.environ.get("PORT", 5000))
@@ -366,8 +1177,15 @@ if __name__ == "__main__":
     debug_mode = os.environ.get("FLASK_ENV") == "development"
     app.run(host="0.0.0.0", port=port, debug=debug_mode)
 
-@app.route('/init-db')
+@app.route('/init-db', methods=["POST"])
+@ops_view
 def init_db():
-    with app.app_context():
-        db.create_all()
-    return "Database initialized!"
\ No newline at end of file
+    """Runs the migrations (schema upgrade, backfill, search index) for deployments without a shell."""
+    migrate()
+    return "Database initialized!"
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Brings the database up to date: `flask --app app migrate`."""
+    migrate()
+    print("Database is up to date.")
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+ASGI entry point: serves the app from one asyncio event loop under uvicorn.
+
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT
+
+Under gunicorn's sync workers a request that waits on Gemini holds a whole
+worker, so concurrency stops at the worker count. Here the views marked with
+@llm_view (/analyze, /ai-resume-builder, /ai-generate-detailed) are split
+around the model call:
+
+1. the Flask part before it (form parsing, text extraction, cache lookup)
+   runs in a thread;
+2. the model call is awaited on the event loop;
+3. the Flask part after it (saving, PDF rendering, the response) runs in a
+   thread again.
+
+A request waiting on the model is a coroutine, not a thread, so one process
+can hold hundreds of them. Every other route runs the plain Flask app in a
+thread. Admission control still applies, so raise ADMISSION_MAX_INFLIGHT and
+LLM_ASYNC_MAX_CONCURRENCY to let more calls wait at once. /analyze runs in the
+request here unless ASYNC_ANALYZE=1 is set, since waiting no longer ties up
+a worker.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("ASYNC_ANALYZE", "0")
+
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+import metrics
+from app import app, LLMStep
+from resume_parser import SPOOL_MEMORY_BYTES
+
+# Threads for the Flask parts of requests; none of them waits on the model
+THREADS = int(os.getenv("ASGI_THREADS", 32))
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope; `body` is the spooled request body."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+async def read_body(receive):
+    """Spools the request body like spool_upload does. Returns None if the client went away."""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None
+        body.write(message.get("body", b""))
+        if not message.get("more_body"):
+            body.seek(0)
+            return body
+
+
+def llm_view_for(environ):
+    """The @llm_view view the request is routed to, or None."""
+    try:
+        endpoint, _ = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    return endpoint if hasattr(app.view_functions.get(endpoint), "prepare") else None
+
+
+def run_in_request(environ, part):
+    """
+    Runs one part of a request in a Flask request context, the way
+    Flask.full_dispatch_request runs a view. Returns the LLMStep the view
+    stopped at, or the finished response as (status, headers, body).
+    """
+    with app.request_context(environ):
+        try:
+            try:
+                rv = part()
+                if isinstance(rv, LLMStep):
+                    return rv
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            response = app.finalize_request(rv)
+        except Exception as e:
+            response = app.handle_exception(e)
+        return response.status_code, response.headers.to_wsgi_list(), b"".join(response.iter_encoded())
+
+
+def prepare_view():
+    rv = app.preprocess_request()
+    if rv is None:
+        rv = app.view_functions[request.endpoint].prepare(**request.view_args)
+    return rv
+
+
+def start_message(status, headers):
+    return {"type": "http.response.start", "status": status,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]}
+
+
+async def serve_llm_view(environ, send):
+    # One trace for the whole request, so its stages add up across the threads
+    metrics.start_trace(shared=True)
+    outcome = await asyncio.to_thread(run_in_request, environ, prepare_view)
+    if isinstance(outcome, LLMStep):
+        step = outcome
+        try:
+            result, error = await step.run_async(), None
+        except Exception as e:
+            result, error = None, e
+        environ["wsgi.input"].seek(0)
+        outcome = await asyncio.to_thread(run_in_request, environ, lambda: step.finish(result, error))
+    status, headers, body = outcome
+    await send(start_message(status, headers))
+    await send({"type": "http.response.body", "body": body})
+
+
+async def serve_wsgi(environ, receive, send):
+    """Runs the Flask app in a thread, passing streamed responses (SSE) on as they are produced."""
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    def put(message):
+        loop.call_soon_threadsafe(messages.put_nowait, message)
+
+    def start_response(status, headers, exc_info=None):
+        put(start_message(int(status.split(" ", 1)[0]), headers))
+
+    def produce():
+        try:
+            result = app(environ, start_response)
+            try:
+                for chunk in result:
+                    if disconnected.is_set():
+                        break
+                    if chunk:
+                        put({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            put({"type": "http.response.body", "body": b""})
+        finally:
+            put(None)
+
+    async def watch():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch())
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))
+    try:
+        while (message := await messages.get()) is not None:
+            if not disconnected.is_set():
+                await send(message)
+        await producer
+    finally:
+        # Stops a long stream if the client went away or send() failed
+        disconnected.set()
+        watcher.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(THREADS, thread_name_prefix="asgi"))
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    body = await read_body(receive)
+    if body is None:
+        return
+    with body:
+        environ = build_environ(scope, body)
+        if llm_view_for(environ):
+            await serve_llm_view(environ, send)
+        else:
+            await serve_wsgi(environ, receive, send)
@@ -0,0 +1,89 @@
+"""
+Compares the sync deployment (gunicorn sync workers) with the ASGI one
+(uvicorn asgi:application, one process) on the LLM-bound route
+/ai-generate-detailed, with the fake model sleeping --llm-latency-ms per call.
+
+Admission and LLM concurrency limits are lifted for both servers so only the
+serving model limits how many requests wait on the model at once. All
+virtual users share one login, so signup hashing does not dominate setup.
+
+Usage:
+    python benchmarks/bench_asgi.py [--concurrency 16,64,256] [--duration 15] [--llm-latency-ms 1000] [--workers 4]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import loadtest
+
+UNLIMITED = {
+    "ADMISSION_MAX_INFLIGHT": "100000",
+    "ADMISSION_MAX_QUEUE": "100000",
+    "ADMISSION_USER_INFLIGHT": "0",
+    "ADMISSION_USER_RATE_PER_MIN": "0",
+    "LLM_MAX_CONCURRENCY": "100000",
+    "LLM_ASYNC_MAX_CONCURRENCY": "100000",
+    "SESSION_BACKEND": "cookie",
+}
+
+
+def run_server(server, args, concurrency_steps):
+    options = argparse.Namespace(server=server, workers=args.workers, threads=1, llm_latency_ms=args.llm_latency_ms,
+                                 database_url=None, async_analyze=False)
+    workdir = tempfile.mkdtemp(prefix="resume-bench-asgi-")
+    sink = loadtest.SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    process, port = loadtest.start_server(options, workdir, sink.port)
+    rows = []
+    try:
+        owner = loadtest.VirtualUser(port, "bench@example.com", b"", 0, random.Random(0))
+        owner.signup()
+        owner.login()
+        users = []
+        for index in range(max(concurrency_steps)):
+            user = loadtest.VirtualUser(port, owner.email, b"", 0, random.Random(index))
+            user.cookies = dict(owner.cookies)
+            users.append(user)
+        for concurrency in concurrency_steps:
+            sampler = loadtest.MemorySampler(process.pid)
+            sampler.start()
+            latencies, errors, shed, elapsed = loadtest.run_step(port, users[:concurrency], {"ai_generate": 1}, args.duration)
+            rss = sampler.stop()
+            values = latencies.get("ai_generate", [])
+            rows.append(dict(loadtest.summarize(values), concurrency=concurrency, rps=len(values) / elapsed,
+                             errors=sum(errors.values()) + sum(shed.values()), rss_mb=sum(rss)))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        sink.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", default="16,64,256")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--llm-latency-ms", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn sync workers for the baseline")
+    args = parser.parse_args()
+    os.environ.update(UNLIMITED)
+    steps = [int(c) for c in args.concurrency.split(",")]
+
+    results = [(f"gunicorn sync x{args.workers}", run_server("gunicorn", args, steps)), ("uvicorn asgi x1", run_server("uvicorn", args, steps))]
+    print(f"\nfake model latency {args.llm_latency_ms} ms, /ai-generate-detailed only")
+    print(f"{'server':<20} {'users':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MB':>7}")
+    for name, rows in results:
+        for row in rows:
+            print(f"{name:<20} {row['concurrency']:>6} {row['rps']:>8.1f} {row['p50_ms']:>9.0f} {row['p95_ms']:>9.0f} "
+                  f"{row['p99_ms']:>9.0f} {row['errors']:>7} {row['rss_mb']:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
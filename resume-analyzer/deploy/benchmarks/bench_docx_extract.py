@@ -0,0 +1,110 @@
+"""
+Benchmarks DOCX extraction: python-docx (the previous path, which built the
+whole object model and read only body paragraphs) against the streaming
+extractor in resume_parser. The documents mix paragraphs with two-column
+tables, the way many resume templates lay out skills and experience.
+
+Each measurement runs in a fresh interpreter so peak RSS is per extractor.
+
+Usage:
+    python benchmarks/bench_docx_extract.py [--repeat 5]
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DEPLOY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DEPLOY_DIR)
+
+LINE = "Built Python, SQL and Kubernetes services for payments, search and analytics teams."
+
+
+def make_docx(sections):
+    """A resume-like DOCX with `sections` blocks of paragraphs and a table each."""
+    import docx
+
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Asha Verma | asha@example.com | +91 98765 43210"
+    for section in range(sections):
+        document.add_heading(f"Role {section}", level=2)
+        for line in range(4):
+            document.add_paragraph(f"{section}.{line} {LINE}", style="List Bullet")
+        table = document.add_table(rows=3, cols=2)
+        for row in range(3):
+            table.cell(row, 0).text = f"Skill group {row}"
+            table.cell(row, 1).text = f"{section}.{row} {LINE}"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def previous_extract(data):
+    import docx
+
+    document = docx.Document(io.BytesIO(data))
+    return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def streaming_extract(data):
+    import resume_parser
+
+    return resume_parser.extract_docx_text(io.BytesIO(data))
+
+
+EXTRACTORS = {"python-docx": previous_extract, "streaming": streaming_extract}
+
+
+def child(name, path, repeat):
+    """Runs one extractor on one file and prints its timing and peak RSS growth."""
+    with open(path, "rb") as f:
+        data = f.read()
+    extract = EXTRACTORS[name]
+    extract(make_docx(1))  # pay for imports before the baseline
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = extract(data)
+        timings.append(time.perf_counter() - started)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"ms": min(timings) * 1000, "rss_kb": peak - baseline, "chars": len(text)}))
+
+
+def measure(name, path, repeat):
+    output = subprocess.run([sys.executable, __file__, "--child", name, path, "--repeat", str(repeat)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", nargs=2, metavar=("EXTRACTOR", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child, args.repeat)
+        return
+
+    print(f"{'sections':>8} {'KB':>6} | {'python-docx ms':>14} {'RSS MB':>7} {'chars':>8} | "
+          f"{'streaming ms':>12} {'RSS MB':>7} {'chars':>8} | {'speedup':>7}")
+    for sections in (10, 200, 2000):
+        with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as f:
+            f.write(make_docx(sections))
+        try:
+            old = measure("python-docx", f.name, args.repeat)
+            new = measure("streaming", f.name, args.repeat)
+            size_kb = os.path.getsize(f.name) / 1024
+        finally:
+            os.remove(f.name)
+        print(f"{sections:>8} {size_kb:>6.0f} | {old['ms']:>14.1f} {old['rss_kb'] / 1024:>7.1f} {old['chars']:>8} | "
+              f"{new['ms']:>12.1f} {new['rss_kb'] / 1024:>7.1f} {new['chars']:>8} | {old['ms'] / new['ms']:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
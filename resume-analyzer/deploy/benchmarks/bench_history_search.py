@@ -0,0 +1,150 @@
+"""
+Benchmarks /search over a synthetic analysis history in a throwaway SQLite
+database: --rows analyses spread over --users users, 20 job roles and two
+years, with result text in the usual **Section:** layout. One more user
+holds --heavy-rows analyses, like a recruiter whose bulk screening saves
+every resume to their history.
+
+Reports how long building the FTS5 index takes, the insert cost of its sync
+triggers, and p50/p95 latency of history_search.search() for common and rare
+terms, a phrase, a prefix, a role facet filter, a date range and a later page,
+against the LIKE fallback on the same data.
+
+Usage:
+    python benchmarks/bench_history_search.py [--rows 300000] [--users 3000] [--heavy-rows 50000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROLES = ["Backend Developer", "Frontend Developer", "Full Stack Developer", "Data Scientist", "Data Analyst",
+         "DevOps Engineer", "Machine Learning Engineer", "Software Engineer", "Cloud Architect", "QA Engineer",
+         "Mobile Developer", "Product Manager", "Security Engineer", "Data Engineer", "UI/UX Designer",
+         "Site Reliability Engineer", "Business Analyst", "Embedded Engineer", "Game Developer", "Technical Writer"]
+SKILLS = ["Python", "Java", "SQL", "Docker", "Kubernetes", "AWS", "Azure", "React", "TypeScript", "Django",
+          "Flask", "Spring Boot", "Terraform", "Kafka", "Redis", "PostgreSQL", "MongoDB", "GraphQL", "Go", "Rust",
+          "Airflow", "Spark", "pandas", "TensorFlow", "PyTorch", "Figma", "Selenium", "Jenkins", "Linux"]
+PHRASES = ["machine learning pipelines", "quantify achievements with numbers", "tailor the summary to the role",
+           "clear description of recent projects", "add a link to your portfolio", "system design experience",
+           "continuous integration and delivery", "stakeholder communication"]
+
+QUERIES = [
+    ("common term", {"query": "python"}),
+    ("rare term", {"query": "haskell"}),
+    ("two terms", {"query": "docker kubernetes"}),
+    ("phrase", {"query": '"machine learning pipelines"'}),
+    ("prefix", {"query": "kube*"}),
+    ("role facet", {"query": "python", "roles": ["Backend Developer", "Data Scientist"]}),
+    ("date range", {"query": "python", "date_from": datetime(2025, 3, 1), "date_to": datetime(2025, 5, 31)}),
+    ("page 3", {"query": "sql", "page": 3, "page_size": 10}),
+]
+
+
+def make_result(rng):
+    skills = rng.sample(SKILLS, 8)
+    if rng.random() < 0.01:
+        skills[6] = "Haskell"
+    return "\n".join([
+        f"**Resume Score:** {rng.randint(35, 95)}/100",
+        "",
+        "**Strengths:**",
+        f"- Solid hands-on experience with {skills[0]}, {skills[1]} and {skills[2]}.",
+        f"- {rng.choice(PHRASES).capitalize()} shows up throughout the resume.",
+        "",
+        "**Areas for Improvement:**",
+        f"- {rng.choice(PHRASES).capitalize()}.",
+        f"- Show more depth in {skills[3]} with concrete project outcomes.",
+        "",
+        "**Missing Skills/Keywords:**",
+        f"- {skills[4]}",
+        f"- {skills[5]}",
+        f"- {skills[6]}",
+    ])
+
+
+def seed(db, ResumeAnalysis, rows, users, rng, batch=5000):
+    """Inserts `rows` analyses for random users in 1..users, or all for one user if `users` is a tuple."""
+    start = datetime(2024, 7, 1)
+    low, high = users if isinstance(users, tuple) else (1, users)
+    for offset in range(0, rows, batch):
+        db.session.execute(ResumeAnalysis.__table__.insert(), [{
+            "user_id": rng.randint(low, high),
+            "job_role": rng.choice(ROLES),
+            "result": make_result(rng),
+            "created_at": start + timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+            "score": rng.randint(35, 95),
+        } for _ in range(min(batch, rows - offset))])
+        db.session.commit()
+
+
+def timed(fn, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure history search latency at scale.")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--heavy-rows", type=int, default=50000, help="Analyses of the one heavy user")
+    parser.add_argument("--queries", type=int, default=200, help="Users sampled per query type")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="resume-bench-search-")
+    os.environ.update({"DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'history.db')}", "LLM_BACKEND": "fake",
+                       "JOB_DATA_DIR": workdir, "METRICS_DIR": "", "ASYNC_ANALYZE": "0"})
+    from app import app
+    from models import db, ResumeAnalysis
+    import history_search
+
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        print(f"seeding {args.rows} analyses for {args.users} users...")
+        heavy_user = args.users + 1
+        seeded = timed(lambda: (seed(db, ResumeAnalysis, args.rows, args.users, rng),
+                                seed(db, ResumeAnalysis, args.heavy_rows, (heavy_user, heavy_user), rng)))
+        print(f"seeded in {seeded:.1f} s")
+        built = timed(lambda: history_search.install(db.engine))
+        print(f"FTS5 index built over {args.rows + args.heavy_rows} rows in {built:.1f} s")
+
+        # Insert cost of the sync triggers, on 5,000 more rows
+        with_index = timed(lambda: seed(db, ResumeAnalysis, 5000, args.users, rng))
+        with db.engine.begin() as conn:
+            for name in ("insert", "delete", "update"):
+                conn.exec_driver_sql(f"DROP TRIGGER {history_search.FTS_TABLE}_{name}")
+        without_index = timed(lambda: seed(db, ResumeAnalysis, 5000, args.users, rng))
+        print(f"inserting 5,000 rows: {with_index * 1000:.0f} ms with the index, {without_index * 1000:.0f} ms without")
+
+        typical = [rng.randint(1, args.users) for _ in range(args.queries)]
+        for title, users in ((f"typical user (~{args.rows // args.users} analyses)", typical),
+                             (f"heavy user ({args.heavy_rows} analyses)", [heavy_user] * max(args.queries // 10, 5))):
+            print(f"\n{title}")
+            print(f"{'query':<14} {'engine':<6} {'p50 ms':>8} {'p95 ms':>8} {'avg hits':>9}")
+            for label, params in QUERIES:
+                for engine in ("fts5", "like"):
+                    history_search._engines[db.engine] = engine
+                    latencies, hits = [], []
+                    for user_id in users:
+                        started = time.perf_counter()
+                        response = history_search.search(user_id, **params)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        hits.append(response["total"])
+                    latencies.sort()
+                    print(f"{label:<14} {engine:<6} {statistics.median(latencies):>8.2f} "
+                          f"{latencies[max(int(len(latencies) * 0.95) - 1, 0)]:>8.2f} {statistics.mean(hits):>9.1f}")
+        db.session.remove()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
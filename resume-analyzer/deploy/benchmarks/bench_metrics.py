@@ -0,0 +1,66 @@
+"""
+Measures the cost of the instrumentation in metrics.py: a counter increment,
+a histogram observation, a traced span, and a full request through the
+Flask hooks compared with the same request with the hooks removed.
+
+Usage:
+    python benchmarks/bench_metrics.py [--ops 200000] [--requests 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+
+
+def per_op(label, fn, ops):
+    started = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed / ops * 1e6:8.2f} us")
+
+
+def traced_span():
+    with metrics.span("bench"):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure metrics instrumentation overhead.")
+    parser.add_argument("--ops", type=int, default=200000, help="Operations per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests for the end-to-end comparison")
+    args = parser.parse_args(argv)
+
+    per_op("counter.inc", lambda: metrics.http_requests.inc(method="GET", endpoint="index", status=200), args.ops)
+    per_op("histogram.observe", lambda: metrics.http_duration.observe(0.042, endpoint="index"), args.ops)
+    metrics.start_trace()
+    per_op("span (traced)", traced_span, args.ops // 10)
+    metrics.finish_trace()
+    per_op("span (untraced)", traced_span, args.ops)
+    started = time.perf_counter()
+    metrics.registry.render()
+    print(f"{'render /metrics':<28} {(time.perf_counter() - started) * 1000:8.2f} ms")
+
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    from app import app
+    client = app.test_client()
+    hooks = {"start_request_trace", "record_request_metrics"}
+    for _ in range(100):
+        client.get("/login")
+    for label in ("with hooks", "without hooks"):
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            client.get("/login")
+        elapsed = time.perf_counter() - started
+        print(f"GET /login {label:<17} {elapsed / args.requests * 1e6:8.1f} us")
+        for funcs in (app.before_request_funcs, app.after_request_funcs):
+            funcs[None] = [f for f in funcs[None] if f.__name__ not in hooks]
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Benchmarks comparing one resume against 2-4 job roles: N separate /analyze
+uploads (N extractions, N single-role prompts) against one upload that
+extracts once and sends one multi-role prompt.
+
+Prompt tokens are counted on the real prompts for 1-, 2- and 4-page CVs
+from bench_prompt_compaction, written to DOCX and extracted the way an
+upload is. Model latency is estimated as a fixed per-call overhead plus
+input and output rates; output is assumed to be --out-tokens-per-role for
+each role either way. With --live (and GOOGLE_API_KEY set) it also times
+real Gemini calls for the 3-role case.
+
+Usage:
+    python benchmarks/bench_multi_role.py [--call-overhead-ms 400] [--ms-per-1k-tokens 60] [--ms-per-out-token 8] [--live]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import docx
+from werkzeug.datastructures import FileStorage
+
+from bench_prompt_compaction import make_cv
+from analysis import build_analysis_prompt, build_multi_role_prompt
+from prompt_compactor import estimate_tokens
+from resume_parser import extract_text
+
+ROLES = ["Backend Developer", "Software Engineer", "DevOps Engineer", "Data Engineer"]
+
+
+def docx_upload(text):
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def extract_ms(data):
+    started = time.perf_counter()
+    extract_text(FileStorage(io.BytesIO(data), filename="resume.docx"))
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure savings from analyzing several roles in one prompt.")
+    parser.add_argument("--call-overhead-ms", type=float, default=400.0, help="Assumed fixed latency of one model call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=60.0, help="Assumed input processing time per 1k prompt tokens")
+    parser.add_argument("--ms-per-out-token", type=float, default=8.0, help="Assumed generation time per output token")
+    parser.add_argument("--out-tokens-per-role", type=int, default=450, help="Assumed length of one role's review")
+    parser.add_argument("--live", action="store_true", help="Also time real LLM calls (needs GOOGLE_API_KEY)")
+    args = parser.parse_args(argv)
+
+    def model_ms(prompt_tokens, roles):
+        return (args.call_overhead_ms + prompt_tokens / 1000 * args.ms_per_1k_tokens
+                + roles * args.out_tokens_per_role * args.ms_per_out_token)
+
+    print(f"{'pages':>5} {'roles':>5} {'separate tok':>12} {'combined tok':>12} {'saved':>6} "
+          f"{'separate ms':>11} {'combined ms':>11} {'saved':>6}")
+    for pages in (1, 2, 4):
+        data = docx_upload(make_cv(pages, pages))
+        text = extract_text(FileStorage(io.BytesIO(data), filename="resume.docx"))
+        extraction = min(extract_ms(data) for _ in range(5))
+        for count in (2, 3, 4):
+            roles = ROLES[:count]
+            separate_tokens = [estimate_tokens(build_analysis_prompt(text, role)) for role in roles]
+            combined_tokens = estimate_tokens(build_multi_role_prompt(text, roles))
+            separate_ms = sum(extraction + model_ms(tokens, 1) for tokens in separate_tokens)
+            combined_ms = extraction + model_ms(combined_tokens, count)
+            print(f"{pages:>5} {count:>5} {sum(separate_tokens):>12} {combined_tokens:>12} "
+                  f"{1 - combined_tokens / sum(separate_tokens):>6.0%} {separate_ms:>11.0f} {combined_ms:>11.0f} "
+                  f"{1 - combined_ms / separate_ms:>6.0%}")
+
+    if args.live:
+        from llm_client import client
+        text = make_cv(2, 2)
+        roles = ROLES[:3]
+        started = time.perf_counter()
+        for role in roles:
+            client.generate(build_analysis_prompt(text, role))
+        separate = time.perf_counter() - started
+        started = time.perf_counter()
+        client.generate(build_multi_role_prompt(text, roles))
+        print(f"live, 3 roles: separate {separate:.2f} s, combined {time.perf_counter() - started:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
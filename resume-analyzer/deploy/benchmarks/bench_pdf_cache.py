@@ -0,0 +1,84 @@
+"""
+Benchmarks report PDF generation: renders per second for the previous
+per-call stylesheet path, the shared-stylesheet path, and cache hits.
+
+Usage:
+    python benchmarks/bench_pdf_cache.py [--seconds 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import Environment, FileSystemLoader
+from reportlab.lib.styles import getSampleStyleSheet
+
+import utils
+from pdf_cache import PDFCache
+
+SAMPLE_RESULT = """**Resume Score:** 82/100
+
+**Strengths:**
+- Strong Python and SQL background with measurable impact.
+- Clear, well-structured experience section.
+
+**Areas for Improvement:**
+- Quantify achievements in the most recent role.
+- Move certifications closer to the top.
+- Tighten the summary to three sentences.
+
+**Missing Skills/Keywords:**
+- Docker
+- Kubernetes
+- CI/CD
+"""
+
+
+def report_html():
+    env = Environment(loader=FileSystemLoader(os.path.join(os.path.dirname(utils.__file__), "templates")))
+    return env.get_template("report.html").render(
+        result=utils.format_for_web(SAMPLE_RESULT), job_role="Backend Developer", now=datetime.now())
+
+
+def rate(fn, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        count += 1
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    html = report_html()
+
+    def uncached_styles():
+        # What every call paid before: a fresh stylesheet per PDF
+        utils._styles = getSampleStyleSheet()
+        utils.generate_pdf(html)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PDFCache(directory)
+        cache.get_or_render(1, lambda: utils.generate_pdf(html))
+
+        results = [
+            ("stylesheet per call", rate(uncached_styles, args.seconds)),
+            ("shared stylesheet", rate(lambda: utils.generate_pdf(html), args.seconds)),
+            ("PDF cache hit", rate(lambda: cache.get_or_render(1, lambda: utils.generate_pdf(html)), args.seconds)),
+        ]
+
+    baseline = results[0][1]
+    for name, per_second in results:
+        print(f"{name:<20} {per_second:>9.1f} PDFs/s  ({per_second / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmarks resume_parser PDF extraction against the previous
+read-everything / `text +=` implementation on 1, 10 and 100 page PDFs.
+
+Usage:
+    python benchmarks/bench_pdf_extract.py [--repeat 5]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from werkzeug.datastructures import FileStorage
+
+import resume_parser
+
+LINE = "Senior engineer building Python, SQL and Kubernetes services for payments, search and analytics."
+
+
+def make_pdf(pages):
+    """Builds a text-heavy PDF with the given number of pages."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        y = 750
+        for line in range(45):
+            pdf.drawString(40, y, f"{page}.{line} {LINE}")
+            y -= 16
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def legacy_extract(data):
+    """The original extract_text PDF path."""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text()
+    return text
+
+
+def current_extract(data):
+    return resume_parser.extract_text(FileStorage(stream=io.BytesIO(data), filename="resume.pdf"))
+
+
+def best_of(fn, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Raise the page cap so the 100-page case is fully extracted
+    resume_parser.MAX_RESUME_PAGES = 1000
+    current_extract(make_pdf(resume_parser.PARALLEL_PAGE_THRESHOLD))  # warm up the worker pool
+
+    print(f"{'pages':>6} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    for pages in (1, 10, 100):
+        data = make_pdf(pages)
+        legacy = best_of(legacy_extract, data, args.repeat)
+        current = best_of(current_extract, data, args.repeat)
+        print(f"{pages:>6} {legacy * 1000:>10.1f} {current * 1000:>11.1f} {legacy / current:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmarks prompt compaction on a synthetic corpus of 1- to 12-page CVs with
+running headers/footers, page numbers, whitespace runs and boilerplate.
+
+Reports estimated prompt tokens before and after compaction, the time the
+compaction itself takes, and the prompt-processing time it saves at a given
+model input rate. With --live (and GOOGLE_API_KEY set) it also times real
+analyze calls on the raw and compacted text.
+
+Usage:
+    python benchmarks/bench_prompt_compaction.py [--budget 3000] [--ms-per-1k-tokens 60] [--live]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_compactor import compact_resume, estimate_tokens
+
+SKILLS = ["Python", "Django", "Flask", "PostgreSQL", "Docker", "Kubernetes", "AWS", "React", "TypeScript",
+          "Redis", "Kafka", "Terraform", "GraphQL", "CI/CD", "Linux", "Spark", "Airflow", "Pandas"]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimized", "Automated", "Reduced", "Launched"]
+
+
+def make_cv(pages, seed):
+    rng = random.Random(seed)
+    name = f"Candidate {seed}"
+    body = [name, f"candidate{seed}@example.com | +91 90000 {seed:05d} | Bengaluru", "",
+            "PROFESSIONAL SUMMARY", "Engineer with experience shipping backend services and data pipelines.", "",
+            "Technical Skills:", ", ".join(rng.sample(SKILLS, 10)), "", "Work Experience"]
+    for job in range(pages * 3):
+        body += [f"Senior Engineer, Company {job}        {2024 - job} – {2025 - job}"]
+        body += [f"•   {rng.choice(VERBS)} {rng.choice(SKILLS)} services handling {rng.randint(1, 90)}k requests/min,"
+                 f"   improving    latency by {rng.randint(5, 60)}%." for _ in range(5)]
+        body.append("")
+    body += ["Projects"] + [f"- Project {i}: {' and '.join(rng.sample(SKILLS, 3))} platform for internal teams." for i in range(pages * 2)]
+    body += ["", "Education", "B.Tech, Computer Science, Some University, 2015", "",
+             "Hobbies and Interests", "Cricket, chess, travel, photography.", "",
+             "References", "References available upon request."]
+
+    # Split into pages and add running header/footer the way PDF extraction returns them
+    per_page = max(1, len(body) // pages)
+    texts = []
+    for page in range(pages):
+        chunk = body[page * per_page:(page + 1) * per_page if page < pages - 1 else None]
+        texts.append("\n".join([f"{name} — Curriculum Vitae", "Confidential", "\t \t"] + chunk
+                                + ["", f"Page {page + 1} of {pages}", "   "]))
+    return "\f".join(texts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure token and latency savings from prompt compaction.")
+    parser.add_argument("--budget", type=int, default=3000, help="Token budget for the resume text")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=60.0,
+                        help="Assumed model input processing time per 1k prompt tokens")
+    parser.add_argument("--live", action="store_true", help="Also time real LLM calls (needs GOOGLE_API_KEY)")
+    args = parser.parse_args(argv)
+
+    corpus = [make_cv(pages, seed) for seed, pages in enumerate([1, 2, 2, 3, 4, 6, 8, 12])]
+    print(f"{'pages':>5} {'raw tok':>8} {'compact tok':>11} {'saved':>6} {'compact ms':>10}  truncated/dropped")
+    raw_total = compact_total = 0
+    compaction_seconds = 0.0
+    for text, pages in zip(corpus, [1, 2, 2, 3, 4, 6, 8, 12]):
+        started = time.perf_counter()
+        result = compact_resume(text, budget=args.budget)
+        elapsed = time.perf_counter() - started
+        compaction_seconds += elapsed
+        raw_total += result["original_tokens"]
+        compact_total += result["compacted_tokens"]
+        cut = ", ".join(filter(None, [result["truncated"]] + result["dropped"])) or "-"
+        print(f"{pages:>5} {result['original_tokens']:>8} {result['compacted_tokens']:>11} "
+              f"{result['reduction']:>6.0%} {elapsed * 1000:>10.2f}  {cut}")
+
+    saved_ms = (raw_total - compact_total) / 1000 * args.ms_per_1k_tokens
+    print(f"\ntotal: {raw_total} -> {compact_total} tokens ({1 - compact_total / raw_total:.0%} smaller)")
+    print(f"compaction cost: {compaction_seconds * 1000:.1f} ms for {len(corpus)} resumes")
+    print(f"estimated prompt processing saved at {args.ms_per_1k_tokens:.0f} ms/1k tokens: {saved_ms:.0f} ms")
+
+    if args.live:
+        from analysis import build_analysis_prompt
+        from llm_client import client
+        for label, text in (("raw", corpus[-1]), ("compacted", compact_resume(corpus[-1], budget=args.budget)["text"])):
+            prompt = build_analysis_prompt(text, "Backend Developer", compact=False)
+            started = time.perf_counter()
+            client.generate(prompt)
+            print(f"live {label} ({estimate_tokens(text)} resume tokens): {time.perf_counter() - started:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
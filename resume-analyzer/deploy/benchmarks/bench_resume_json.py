@@ -0,0 +1,98 @@
+"""
+Benchmarks AI resume parsing on a corpus of typical malformed model outputs:
+how many the previous fence-regex + json.loads path could use, how many the
+repairing parser recovers, and how many fields still need a follow-up call.
+
+Usage:
+    python benchmarks/bench_resume_json.py [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resume_json import JSONRepairParser, validate_resume
+
+RESUME = {
+    "name": "Asha Verma",
+    "email": "asha@example.com",
+    "phone": "+91 98765 43210",
+    "job_role": "Backend Developer",
+    "summary": "Backend developer with four years of experience building Python APIs.",
+    "skills": {"Technical": ["Python", "Django", "PostgreSQL"], "Soft Skills": ["Mentoring"], "Tools": ["Docker", "Git"]},
+    "experience": [{"title": "Software Engineer", "company": "Acme", "dates": "2021 - Present",
+                    "achievements": ["Cut API latency by 40% with query tuning.", "Led the move to Docker."]}],
+    "education": [{"degree": "B.Tech, Computer Science", "institution": "NIT Trichy", "year": "2020"}],
+}
+CLEAN = json.dumps(RESUME, indent=2)
+COMPACT = json.dumps(RESUME)
+
+CORPUS = {
+    "clean": CLEAN,
+    "fenced": f"```json\n{CLEAN}\n```",
+    "prose_around": f"Here is the resume you asked for:\n{CLEAN}\nLet me know if you need changes!",
+    "trailing_commas": COMPACT.replace('"Git"]', '"Git",]').replace('"2020"}', '"2020",}'),
+    "raw_newline": CLEAN.replace("building Python APIs.", "building\nPython APIs."),
+    "python_literals": CLEAN[:-1] + ',\n  "remote": True\n}',
+    "truncated_experience": CLEAN[:CLEAN.index("Led the move")],
+    "truncated_education": CLEAN[:CLEAN.index('"institution"')],
+    "missing_comma": COMPACT.replace('"Mentoring"],', '"Mentoring"]'),
+}
+
+
+def previous_parse(text):
+    """The parsing generate_ai_resume did before the repairing parser."""
+    json_match = re.search(r'```json\s*([\s\S]*?)\s*```', text)
+    json_str = json_match.group(1) if json_match else text
+    try:
+        return json.loads(json_str)
+    except ValueError:
+        return None
+
+
+def repaired_parse(text, chunk_size=40):
+    parser = JSONRepairParser()
+    for start in range(0, len(text), chunk_size):
+        if parser.feed(text[start:start + chunk_size]):
+            break
+    data = parser.close()
+    resume, _, missing = validate_resume(data)
+    if parser.truncated_field and parser.truncated_field not in missing:
+        missing.append(parser.truncated_field)
+    return data, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000, help="Parses per case for the timing")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<22} {'previous':>10} {'repaired':>10}  fields to re-request")
+    previous_ok = repaired_ok = follow_up_fields = 0
+    for name, text in CORPUS.items():
+        old = previous_parse(text) is not None
+        data, missing = repaired_parse(text)
+        previous_ok += old
+        repaired_ok += data is not None
+        follow_up_fields += len(missing)
+        print(f"{name:<22} {'ok' if old else 'FAILED':>10} {'ok' if data is not None else 'FAILED':>10}  {', '.join(missing) or '-'}")
+
+    total = len(CORPUS)
+    print(f"\nusable without a new call: previous {previous_ok}/{total}, repaired {repaired_ok}/{total}")
+    print(f"previous path regenerates {total - previous_ok} full resumes; repaired path re-requests {follow_up_fields} fields")
+
+    for label, parse in (("previous", previous_parse), ("repaired", repaired_parse)):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            parse(CORPUS["clean"])
+        elapsed = time.perf_counter() - started
+        print(f"{label} parse of a clean {len(CLEAN)}-byte resume: {elapsed / args.repeat * 1e6:.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
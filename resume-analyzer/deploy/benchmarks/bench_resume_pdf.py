@@ -0,0 +1,81 @@
+"""
+Benchmarks builder resume PDFs: the previous path (render resume_pdf.html,
+strip the tags, one Paragraph per line) against the native ReportLab
+renderer in resume_pdf.py, for a manual builder resume and short and long
+AI builder resumes.
+
+Usage:
+    python benchmarks/bench_resume_pdf.py [--seconds 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import Environment, FileSystemLoader
+
+import utils
+from resume_pdf import generate_resume_pdf
+
+MANUAL = {
+    "name": "Ravi Kumar", "email": "ravi@example.com", "phone": "+91 90000 12345", "job_role": "Data Analyst",
+    "skills": ["SQL", "Python", "Excel", "Tableau", "Statistics"],
+    "experience": "Data Analyst, Acme Retail (2021 - Present)\n- Built weekly sales dashboards in Tableau\n- Automated reporting with Python",
+    "education": "B.Com, Delhi University, 2020",
+    "certifications": "Google Data Analytics Certificate",
+    "achievements": "Employee of the quarter, Q3 2023",
+}
+
+
+def ai_resume(jobs, bullets):
+    return {
+        "name": "Asha Verma", "email": "asha@example.com", "phone": "+91 98765 43210", "job_role": "Backend Developer",
+        "summary": "Backend developer with six years of experience building Python APIs, data pipelines and "
+                   "internal platforms used by hundreds of engineers.",
+        "skills": {"Technical": ["Python", "Django", "Flask", "PostgreSQL", "Redis", "Kafka"],
+                   "Soft Skills": ["Mentoring", "Technical writing"], "Tools": ["Docker", "Kubernetes", "Git", "Terraform"]},
+        "experience": [{"title": "Senior Software Engineer", "company": f"Company {i}", "dates": f"{2024 - i} - {2025 - i}",
+                        "achievements": [f"Cut p95 latency of service {b} by {10 + b * 5}% by rewriting hot queries & adding caching."
+                                         for b in range(bullets)]}
+                       for i in range(jobs)],
+        "education": [{"degree": "B.Tech, Computer Science", "institution": "NIT Trichy", "year": "2018"}],
+    }
+
+
+def previous_path(env):
+    template = env.get_template("resume_pdf.html")
+    return lambda resume: utils.generate_pdf(template.render(resume_data=resume))
+
+
+def rate(fn, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        count += 1
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    env = Environment(loader=FileSystemLoader(os.path.join(os.path.dirname(utils.__file__), "templates")), autoescape=True)
+    env.globals["url_for"] = lambda endpoint, **values: f"/static/{values.get('filename', '')}"
+    previous = previous_path(env)
+
+    samples = [("manual builder", MANUAL), ("AI, 3 jobs", ai_resume(3, 4)), ("AI, 10 jobs", ai_resume(10, 6))]
+    print(f"{'resume':<16} {'previous':>12} {'native':>12} {'speedup':>8}  {'previous KB':>11} {'native KB':>9}")
+    for name, resume in samples:
+        old = rate(lambda: previous(resume), args.seconds)
+        new = rate(lambda: generate_resume_pdf(resume), args.seconds)
+        old_kb = len(previous(resume).getvalue()) / 1024
+        new_kb = len(generate_resume_pdf(resume).getvalue()) / 1024
+        print(f"{name:<16} {old:>8.1f} /s {new:>8.1f} /s {new / old:>7.1f}x  {old_kb:>11.1f} {new_kb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
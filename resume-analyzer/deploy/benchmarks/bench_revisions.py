@@ -0,0 +1,85 @@
+"""
+Benchmarks incremental re-analysis on typical resume revisions: a new skill,
+a rewritten summary, an added project, one edited experience bullet and an
+unchanged re-upload, for 1-, 2- and 4-page CVs from bench_prompt_compaction.
+
+For each revision it reports the estimated prompt tokens of a full analysis
+and of the update prompt revisions.Revision sends (previous analysis plus
+changed sections), the share of resume text reused, and the prompt
+processing time saved at a given model input rate.
+
+Usage:
+    python benchmarks/bench_revisions.py [--ms-per-1k-tokens 60]
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+from bench_prompt_compaction import make_cv
+from analysis import build_analysis_prompt
+from llm_client import client
+from prompt_compactor import estimate_tokens
+from revisions import Revision
+
+ROLE = "Backend Developer"
+
+
+def revise(text, kind):
+    lines = text.split("\n")
+    if kind == "new skill":
+        index = lines.index("Technical Skills:") + 1
+        lines[index] += ", Rust"
+    elif kind == "summary":
+        index = lines.index("PROFESSIONAL SUMMARY") + 1
+        lines[index] = "Backend engineer who ships reliable Python services and mentors junior developers."
+    elif kind == "new project":
+        index = lines.index("Projects") + 1
+        lines.insert(index, "- Project X: open-source rate limiter used by 40 teams.")
+    elif kind == "one bullet":
+        index = next(i for i, line in enumerate(lines) if line.startswith("•"))
+        lines[index] = "•   Cut checkout latency by 45% by caching pricing rules in Redis."
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure prompt savings from incremental re-analysis.")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=60.0,
+                        help="Assumed model input processing time per 1k prompt tokens")
+    args = parser.parse_args(argv)
+
+    print(f"{'pages':>5} {'revision':<12} {'outcome':<9} {'reused':>6} {'full tok':>8} {'update tok':>10} {'saved':>6} {'diff ms':>7}")
+    full_total = sent_total = 0
+    for pages in (1, 2, 4):
+        original = make_cv(pages, pages)
+        previous = SimpleNamespace(id=1, result=client.generate(build_analysis_prompt(original, ROLE)),
+                                   section_hashes=Revision(original).fingerprints)
+        for kind in ("new skill", "summary", "new project", "one bullet", "unchanged"):
+            text = revise(original, kind)
+            started = time.perf_counter()
+            revision = Revision(text, previous)
+            elapsed = time.perf_counter() - started
+            full = estimate_tokens(build_analysis_prompt(text, ROLE))
+            if revision.outcome == "delta":
+                sent = estimate_tokens(revision.build_prompt(ROLE))
+            else:
+                sent = 0 if revision.outcome == "unchanged" else full
+            full_total += full
+            sent_total += sent
+            print(f"{pages:>5} {kind:<12} {revision.outcome:<9} {revision.reused_chars / revision.total_chars:>6.0%} "
+                  f"{full:>8} {sent:>10} {1 - sent / full:>6.0%} {elapsed * 1000:>7.2f}")
+
+    saved_ms = (full_total - sent_total) / 1000 * args.ms_per_1k_tokens
+    print(f"\ntotal: {full_total} -> {sent_total} prompt tokens ({1 - sent_total / full_total:.0%} smaller)")
+    print(f"estimated prompt processing saved at {args.ms_per_1k_tokens:.0f} ms/1k tokens: {saved_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Benchmarks role_matcher on synthetic resumes: N resumes x every role in
+job_roles_skills.json, split into tokenization and matrix scoring time.
+
+Usage:
+    python benchmarks/bench_role_matrix.py [--resumes 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from role_matcher import role_matrix
+
+FILLER = ("Led a team that shipped features on schedule, improved reliability and mentored "
+          "junior engineers while working closely with product and design. ").split()
+
+
+def synthetic_resume(rng):
+    """About 2 KB of filler text with a random sample of skills mixed in."""
+    words = [rng.choice(FILLER) for _ in range(300)]
+    for skill in rng.sample(role_matrix.vocabulary, rng.randint(5, 25)):
+        words.insert(rng.randrange(len(words)), skill)
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resumes", type=int, default=10000)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    texts = [synthetic_resume(rng) for _ in range(args.resumes)]
+
+    started = time.perf_counter()
+    counts = role_matrix.term_matrix(texts)
+    tokenized = time.perf_counter()
+    coverage = role_matrix.coverage(counts)
+    similarity = role_matrix.tfidf_similarity(counts)
+    scored = time.perf_counter()
+    role_matrix.top_k(texts[:1000], k=args.top_k)
+    ranked = time.perf_counter()
+
+    print(f"{len(texts)} resumes x {len(role_matrix.roles)} roles, vocabulary {len(role_matrix.vocabulary)}")
+    print(f"tokenize:        {tokenized - started:7.2f} s ({len(texts) / (tokenized - started):,.0f} resumes/s)")
+    print(f"coverage+tfidf:  {(scored - tokenized) * 1000:7.1f} ms for {coverage.shape} and {similarity.shape} matrices")
+    print(f"top_k (1000):    {(ranked - scored) * 1000:7.1f} ms end to end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cold-start check: imports app in a fresh interpreter with `python -X importtime`,
+prints the slowest imports, and fails when the import takes longer than the
+budget or pulls in a dependency that should only load on first use.
+
+The import runs against a throwaway SQLite database and job directory, so
+the DATABASE_URL in .env (e.g. a Postgres URL whose driver is not installed)
+does not matter. The fastest of --runs imports is compared with the budget,
+which keeps one slow run on a busy machine from failing the check.
+tests/test_import_time.py runs the same check.
+
+Usage:
+    python benchmarks/check_import_time.py [--budget-ms 800] [--vercel] [--runs 3] [--top 15]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+DEPLOY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded by the routes that need them, never by `import app`
+DEFERRED_MODULES = ("google.generativeai", "reportlab", "PyPDF2", "docx", "smtplib", "numpy")
+
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_import(module="app", vercel=False):
+    """Returns ([(module, self_us, cumulative_us, depth)], loaded module names) for a cold import of module."""
+    probe = f"import sys, {module}; print(','.join(sorted(sys.modules)))"
+    with tempfile.TemporaryDirectory(prefix="resume-import-") as workdir:
+        env = dict(os.environ, PYTHONWARNINGS="ignore", DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'app.db')}",
+                   JOB_DATA_DIR=workdir, PDF_CACHE_DIR=os.path.join(workdir, "pdf_cache"), METRICS_DIR="")
+        if vercel:
+            env["VERCEL"] = "1"
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                                   cwd=DEPLOY_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2)), (len(match.group(3)) - 1) // 2))
+    loaded = set(completed.stdout.strip().splitlines()[-1].split(","))
+    return rows, loaded
+
+
+def import_ms(rows, module="app"):
+    return next(cumulative for name, _, cumulative, depth in rows if name == module and depth == 0) / 1000
+
+
+def fastest_import(runs=3, vercel=False):
+    """Profiles `runs` cold imports of app and returns (import ms, rows, loaded modules) of the fastest."""
+    profiles = [profile_import(vercel=vercel) for _ in range(max(runs, 1))]
+    rows, loaded = min(profiles, key=lambda profile: import_ms(profile[0]))
+    return import_ms(rows), rows, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile and check the cold import time of app.py.")
+    parser.add_argument("--budget-ms", type=float, default=800, help="Maximum cumulative import time of app")
+    parser.add_argument("--vercel", action="store_true", help="Import with VERCEL=1 set")
+    parser.add_argument("--runs", type=int, default=3, help="Cold imports to time; the fastest is checked")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    total_ms, rows, loaded = fastest_import(args.runs, vercel=args.vercel)
+
+    print(f"{'module':<45} {'self ms':>9} {'cumul ms':>9}")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{'  ' * depth + name:<45} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+
+    failures = []
+    early = [module for module in DEFERRED_MODULES if module in loaded]
+    if early:
+        failures.append(f"imported at startup: {', '.join(early)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import app took {total_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+
+    print(f"\nimport app: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
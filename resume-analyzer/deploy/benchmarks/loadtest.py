@@ -0,0 +1,483 @@
+"""
+Offline load test: boots the app under gunicorn against stand-ins and drives
+a realistic mix of requests at increasing concurrency.
+
+Stand-ins: the fake LLM backend (LLM_BACKEND=fake) with --llm-latency-ms of
+delay per call, an in-process SMTP sink that accepts and counts every email,
+and a throwaway SQLite database (or --database-url for Postgres). Each
+virtual user keeps its own session and loops over a weighted mix of /login,
+/analyze uploads, /dashboard, /download_pdf and /ai-generate-detailed.
+
+For every concurrency step it reports throughput, p50/p95/p99 latency per
+route, errors and shed (429) requests, and the peak RSS of each gunicorn worker. --save writes the
+results as JSON; --compare checks them against a saved baseline and exits
+non-zero on a regression beyond --tolerance. --server uvicorn runs the
+ASGI entry point (asgi.py) in a single process instead of gunicorn.
+
+Usage:
+    python benchmarks/loadtest.py [--concurrency 1,4,16] [--duration 20] [--workers 2] [--threads 4] [--server uvicorn]
+                                  [--llm-latency-ms 800] [--database-url postgresql://...]
+                                  [--save benchmarks/baselines/default.json] [--compare benchmarks/baselines/default.json]
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+DEPLOY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "login=5,analyze=20,dashboard=35,download_pdf=20,ai_generate=20"
+PASSWORD = "loadtest-password"
+# Lets the harness call the operator endpoints of the server it starts
+OPS_TOKEN = uuid.uuid4().hex
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server that accepts every message and only counts it."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.received = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 loadtest sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 loadtest")
+            elif command == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                # MAIL, RCPT, RSET and NOOP
+                self.reply("250 ok")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def sample_resume(variant):
+    """
+    A two-page DOCX resume. Each variant has different text, so users do not
+    share analysis cache entries; a user re-uploading the same file does.
+    """
+    import docx
+    document = docx.Document()
+    document.add_paragraph(f"Candidate {variant} | candidate{variant}@example.com | +91 98765 43210")
+    document.add_paragraph("Professional Summary")
+    document.add_paragraph("Backend developer with four years of experience building Python APIs and data pipelines.")
+    document.add_paragraph("Experience")
+    for job in range(6):
+        document.add_paragraph(f"Software Engineer, Company {job}, {2024 - job} - {2025 - job}")
+        for bullet in range(4):
+            document.add_paragraph(f"Built Flask and PostgreSQL services handling {job + bullet + 1}k requests per minute with Docker and Redis.")
+    document.add_paragraph("Skills")
+    document.add_paragraph("Python, Flask, Django, SQL, PostgreSQL, Docker, Kubernetes, AWS, Redis, Git, REST APIs")
+    document.add_paragraph("Education")
+    document.add_paragraph("B.Tech, Computer Science, NIT Trichy, 2020")
+    stream = io.BytesIO()
+    document.save(stream)
+    return stream.getvalue()
+
+
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n'.encode())
+        body.write(content)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def encode_form(fields):
+    from urllib.parse import urlencode
+    return urlencode(fields).encode(), "application/x-www-form-urlencoded"
+
+
+class VirtualUser:
+    """One simulated browser: a keep-alive connection plus its cookies."""
+
+    def __init__(self, port, email, resume, email_ratio, rng):
+        self.port = port
+        self.email = email
+        self.resume = resume
+        self.email_ratio = email_ratio
+        self.rng = rng
+        self.cookies = {}
+        self.conn = None
+        self.has_analysis = False
+
+    def request(self, method, path, body=None, content_type=None):
+        """Returns (status, seconds); reconnects once if the server closed the connection."""
+        headers = {"Cookie": "; ".join(f"{k}={v}" for k, v in self.cookies.items())}
+        if content_type:
+            headers["Content-Type"] = content_type
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            started = time.perf_counter()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+                continue
+            elapsed = time.perf_counter() - started
+            for cookie in response.msg.get_all("Set-Cookie") or []:
+                name, _, value = cookie.split(";", 1)[0].partition("=")
+                self.cookies[name.strip()] = value
+            return response.status, elapsed
+
+    def signup(self):
+        self.request("POST", "/signup", *encode_form({"name": "Load Test", "email": self.email, "password": PASSWORD}))
+
+    def login(self):
+        return self.request("POST", "/login", *encode_form({"email": self.email, "password": PASSWORD}))
+
+    def analyze(self):
+        fields = {"job_role": "Backend Developer"}
+        if self.rng.random() < self.email_ratio:
+            fields["email"] = self.email
+        result = self.request("POST", "/analyze", *encode_multipart(fields, {"resume": ("resume.docx", self.resume)}))
+        self.has_analysis = self.has_analysis or result[0] == 200
+        return result
+
+    def dashboard(self):
+        return self.request("GET", "/dashboard")
+
+    def download_pdf(self):
+        return self.request("GET", "/download_pdf")
+
+    def ai_generate(self):
+        return self.request("POST", "/ai-generate-detailed", *encode_form({
+            "name": "Asha Verma", "email": self.email, "phone": "+91 98765 43210",
+            "job_role": "Backend Developer", "skills": "Python, Flask, SQL, Docker",
+            "exp-title-0": "Software Engineer", "exp-company-0": "Acme", "exp-dates-0": "2021 - Present",
+            "exp-achievements-0": "Cut API latency by 40%\nLed the move to Docker",
+            "edu-degree-0": "B.Tech", "edu-institution-0": "NIT Trichy", "edu-year-0": "2020",
+        }))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+    }
+
+
+def worker_pids(master_pid):
+    """PIDs whose parent is the gunicorn master, read from /proc (Linux only)."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, so split after its closing parenthesis
+        if int(stat.rsplit(")", 1)[1].split()[1]) == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Records the peak RSS of each gunicorn worker while a step runs."""
+
+    def __init__(self, master_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peaks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        while not self.stopped.is_set():
+            # uvicorn serves from the process itself
+            for pid in worker_pids(self.master_pid) or [self.master_pid]:
+                rss = rss_mb(pid)
+                if rss is not None:
+                    self.peaks[pid] = max(self.peaks.get(pid, 0.0), rss)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return [round(rss, 1) for _, rss in sorted(self.peaks.items())]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("login", "analyze", "dashboard", "download_pdf", "ai_generate"):
+            raise SystemExit(f"Unknown route in --mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_step(port, users, mix, duration):
+    """Runs every user against the mix for `duration` seconds; returns per-route latencies, errors and 429s."""
+    names, weights = list(mix), list(mix.values())
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    shed = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def loop(user):
+        while time.monotonic() < deadline:
+            route = user.rng.choices(names, weights)[0]
+            # Nothing to download until this user has an analysis
+            if route == "download_pdf" and not user.has_analysis:
+                route = "analyze" if "analyze" in mix else "dashboard"
+            try:
+                status, elapsed = getattr(user, route)()
+                failed = status >= 500
+            except (OSError, http.client.HTTPException):
+                elapsed, failed = None, True
+            with lock:
+                if failed:
+                    errors[route] = errors.get(route, 0) + 1
+                elif status == 429:
+                    shed[route] = shed.get(route, 0) + 1
+                elif elapsed is not None:
+                    latencies.setdefault(route, []).append(elapsed)
+
+    threads = [threading.Thread(target=loop, args=(user,), daemon=True) for user in users]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, shed, time.monotonic() - started
+
+
+def start_server(args, workdir, smtp_port):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "LLM_BACKEND": "fake",
+        "LLM_FAKE_LATENCY_MS": str(args.llm_latency_ms),
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_SECURITY": "none",
+        "SENDER_EMAIL": "reports@loadtest.local",
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "ASYNC_ANALYZE": "1" if args.async_analyze else "0",
+        "JOB_DATA_DIR": os.path.join(workdir, "jobs"),
+        "PDF_CACHE_DIR": os.path.join(workdir, "pdf_cache"),
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "SLOW_REQUEST_MS": "0",
+        "OPS_TOKEN": OPS_TOKEN,
+    })
+    env.pop("VERCEL", None)
+    if args.server == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "asgi:application", "--host", "127.0.0.1", "--port", str(port),
+                   "--log-level", "warning", "--no-access-log"]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "app:app", "--bind", f"127.0.0.1:{port}",
+                   "--workers", str(args.workers), "--threads", str(args.threads), "--timeout", "120",
+                   "--log-level", "warning"]
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(command, cwd=DEPLOY_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{args.server} exited with {process.returncode}; see {log.name}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("POST", "/init-db", headers={"Authorization": f"Bearer {OPS_TOKEN}"})
+            if conn.getresponse().status == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"{args.server} did not become ready within 60 s")
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regressions of `results` against `baseline`."""
+    regressions = []
+    previous = {step["concurrency"]: step for step in baseline["steps"]}
+    for step in results["steps"]:
+        old = previous.get(step["concurrency"])
+        if not old:
+            continue
+        label = f"c={step['concurrency']}"
+        if step["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label} throughput {old['throughput_rps']} -> {step['throughput_rps']} req/s")
+        for route, stats in step["routes"].items():
+            old_stats = old["routes"].get(route)
+            if old_stats and stats["p95_ms"] > old_stats["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{label} {route} p95 {old_stats['p95_ms']} -> {stats['p95_ms']} ms")
+        if step["errors"] > old["errors"]:
+            regressions.append(f"{label} errors {old['errors']} -> {step['errors']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app under gunicorn with an offline LLM and SMTP sink.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated virtual user counts, one step each")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per concurrency step")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default="gunicorn",
+                        help="uvicorn serves asgi.py from one process; --workers and --threads are ignored")
+    parser.add_argument("--llm-latency-ms", type=int, default=800, help="Delay of each fake LLM call")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Route weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--email-ratio", type=float, default=0.2, help="Share of /analyze uploads that also email the report")
+    parser.add_argument("--database-url", help="Use this database (e.g. Postgres) instead of a throwaway SQLite file")
+    parser.add_argument("--async-analyze", action="store_true", help="Queue /analyze uploads instead of processing them in the request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="Write the results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop / p95 rise before a step counts as a regression")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    steps = [int(c) for c in args.concurrency.split(",")]
+    workdir = tempfile.mkdtemp(prefix="resume-loadtest-")
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    process, port = start_server(args, workdir, sink.port)
+    serving = "asgi.py, 1 process" if args.server == "uvicorn" else f"{args.workers} workers x {args.threads} threads"
+    print(f"{args.server} pid {process.pid} on port {port}: {serving}, "
+          f"fake LLM {args.llm_latency_ms} ms, database {'custom' if args.database_url else 'sqlite'}")
+
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+    results = {"config": {key: value for key, value in vars(args).items() if key not in ("save", "compare", "database_url")},
+               "database": "custom" if args.database_url else "sqlite", "steps": []}
+    try:
+        for concurrency in steps:
+            while len(users) < concurrency:
+                resume = sample_resume(f"{run_id}-{len(users)}")
+                user = VirtualUser(port, f"load-{run_id}-{len(users)}@example.com", resume, args.email_ratio,
+                                   random.Random(args.seed + len(users)))
+                user.signup()
+                user.login()
+                users.append(user)
+
+            sampler = MemorySampler(process.pid)
+            sampler.start()
+            latencies, errors, shed, elapsed = run_step(port, users[:concurrency], mix, args.duration)
+            worker_rss = sampler.stop()
+
+            total = sum(len(values) for values in latencies.values())
+            step = {
+                "concurrency": concurrency,
+                "requests": total,
+                "errors": sum(errors.values()),
+                "shed": sum(shed.values()),
+                "throughput_rps": round(total / elapsed, 2),
+                "latency": summarize([v for values in latencies.values() for v in values]),
+                "routes": {route: dict(summarize(values), errors=errors.get(route, 0), shed=shed.get(route, 0))
+                           for route, values in latencies.items()},
+                "worker_rss_mb": worker_rss,
+            }
+            results["steps"].append(step)
+
+            print(f"\nconcurrency {concurrency}: {step['throughput_rps']} req/s, {total} requests, {step['errors']} errors, {step['shed']} shed, "
+                  f"worker RSS {', '.join(f'{mb:.0f}' for mb in worker_rss) or 'n/a'} MB")
+            print(f"  {'route':<14} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6} {'shed':>6}")
+            for route, stats in sorted(step["routes"].items()) + [("all", dict(step["latency"], errors=step["errors"], shed=step["shed"]))]:
+                print(f"  {route:<14} {stats['count']:>6} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} "
+                      f"{stats['errors']:>6} {stats['shed']:>6}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        sink.shutdown()
+        results["emails_delivered"] = sink.received
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\nemails delivered to the SMTP sink: {sink.received}")
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nregressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nno regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Bulk resume screening: scores a ZIP or directory of resumes against one job role.
+
+Text extraction runs in a process pool started from a forkserver (see
+resume_parser.process_context), and the analyses run in a bounded
+thread pool behind a rate limiter (the shared LLMClient retries transient
+errors). A resume whose model call fails is reported with status "fallback"
+and its keyword score. Rows are handed to an on_result callback (and a
+CSV/JSONL report) as soon as each resume finishes.
+
+Usage:
+    python bulk_screen.py resumes.zip --role "Backend Developer" --out report.csv
+    python bulk_screen.py ./resumes/ --role "Data Scientist" --out report.jsonl --user-email hr@example.com
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from resume_parser import extract_file_bytes, process_context, MAX_RESUME_BYTES, COPY_CHUNK_BYTES, UploadTooLarge
+from analysis import prepare_analysis, complete_analysis, UNAVAILABLE_NOTE
+from analysis_cache import cache as analysis_cache
+from llm_client import client, LLMError
+from utils import extract_analysis_data
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+REPORT_FIELDS = ["filename", "job_role", "status", "score", "missing_skills", "error"]
+
+# Limits on one batch, so a ZIP bomb or a huge archive cannot exhaust memory
+MAX_UPLOAD_BYTES = int(os.getenv("BULK_MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+MAX_FILES = int(os.getenv("BULK_MAX_FILES", 500))
+MAX_TOTAL_BYTES = int(os.getenv("BULK_MAX_TOTAL_BYTES", 200 * 1024 * 1024))
+
+
+class ArchiveRejected(ValueError):
+    """Raised when a batch has too many resumes or is too large once uncompressed."""
+
+
+def save_upload(file, path, max_bytes=None):
+    """Copies an uploaded archive to path in chunks, raising UploadTooLarge past max_bytes."""
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    stream = getattr(file, "stream", file)
+    copied = 0
+    try:
+        with open(path, "wb") as out:
+            while True:
+                chunk = stream.read(COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                copied += len(chunk)
+                if copied > max_bytes:
+                    raise UploadTooLarge(f"ZIP file is larger than {max_bytes // (1024 * 1024)} MB.")
+                out.write(chunk)
+    except UploadTooLarge:
+        os.remove(path)
+        raise
+
+
+def _check_batch(sizes):
+    """Raises ArchiveRejected when the (filename, size) pairs exceed the batch limits."""
+    if len(sizes) > MAX_FILES:
+        raise ArchiveRejected(f"Too many resumes: {len(sizes)}, the limit is {MAX_FILES}.")
+    # Oversized files are reported, not read, so they do not count towards the total
+    total = sum(size for _, size in sizes if size <= MAX_RESUME_BYTES)
+    if total > MAX_TOTAL_BYTES:
+        raise ArchiveRejected(f"Resumes add up to more than {MAX_TOTAL_BYTES // (1024 * 1024)} MB uncompressed.")
+
+
+def _zip_members(archive):
+    """Supported (filename, ZipInfo) members, checked against the limits by their declared sizes."""
+    members = []
+    for info in archive.infolist():
+        name = os.path.basename(info.filename)
+        if info.is_dir() or name.startswith(".") or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+            continue
+        members.append((name, info))
+    # zipfile never decompresses more than file_size, so the declared sizes can be trusted
+    _check_batch([(name, info.file_size) for name, info in members])
+    return members
+
+
+def check_archive(path):
+    """Validates an uploaded ZIP from its central directory without reading any member."""
+    with zipfile.ZipFile(path) as archive:
+        return len(_zip_members(archive))
+
+
+def collect_resumes(source):
+    """
+    Returns (filename, bytes) pairs for every PDF/DOCX in a directory, a ZIP
+    path or an open ZIP file object. Files over MAX_RESUME_BYTES are not
+    read and come back with None instead of bytes. Raises ArchiveRejected
+    when the batch is over MAX_FILES or MAX_TOTAL_BYTES.
+    """
+    resumes = []
+    if isinstance(source, str) and os.path.isdir(source):
+        paths = [(name, os.path.join(root, name)) for root, _, files in os.walk(source)
+                 for name in sorted(files) if name.lower().endswith(SUPPORTED_EXTENSIONS)]
+        sizes = [(name, os.path.getsize(path)) for name, path in paths]
+        _check_batch(sizes)
+        for (name, path), (_, size) in zip(paths, sizes):
+            if size > MAX_RESUME_BYTES:
+                resumes.append((name, None))
+                continue
+            with open(path, "rb") as f:
+                resumes.append((name, f.read()))
+        return resumes
+
+    with zipfile.ZipFile(source) as archive:
+        for name, info in _zip_members(archive):
+            resumes.append((name, archive.read(info) if info.file_size <= MAX_RESUME_BYTES else None))
+    return resumes
+
+
+class RateLimiter:
+    """Token bucket shared by the LLM threads."""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(self.rate * 5))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+def analyze_one(resume_text, job_role, limiter, slot=nullcontext, context=nullcontext):
+    """
+    Analyzes one resume inside context() (e.g. an app context, which the sql
+    analysis cache needs), waiting on the rate limiter and then holding
+    slot() (e.g. an admission slot) around the model call. Returns (status,
+    result, error): "ok", "fallback" with the keyword analysis when the
+    model was unavailable or its call failed, or "analysis_error".
+    """
+    with context():
+        return _analyze(resume_text, job_role, limiter, slot)
+
+
+def _analyze(resume_text, job_role, limiter, slot):
+    result, prompt = prepare_analysis(resume_text, job_role)
+    if prompt is None:
+        if result.startswith("Error"):
+            return "analysis_error", None, result
+        if UNAVAILABLE_NOTE in result:
+            return "fallback", result, "AI service is temporarily unavailable."
+        return "ok", result, None
+
+    limiter.acquire()
+    with slot():
+        try:
+            response = client.generate(prompt)
+        except LLMError as e:
+            response, error = None, e
+    if response is None:
+        result = complete_analysis(resume_text, job_role, error=error)
+        if result.startswith("An error occurred"):
+            return "analysis_error", None, result
+        return "fallback", result, str(error)
+    return "ok", complete_analysis(resume_text, job_role, response), None
+
+
+class Progress:
+    """Tracks completed resumes and throughput."""
+
+    def __init__(self, total, report=None):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.report = report or (lambda progress: None)
+
+    @property
+    def per_minute(self):
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed * 60 if elapsed > 0 else 0.0
+
+    def record(self, ok):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        self.report(self)
+
+    def __str__(self):
+        return f"{self.done}/{self.total} resumes ({self.failed} failed), {self.per_minute:.1f} resumes/min"
+
+
+def screen_resumes(resumes, job_role, on_result=None, on_progress=None,
+                   extract_workers=None, llm_workers=4, rate_per_minute=60, slot=nullcontext, context=nullcontext):
+    """
+    Screens (filename, bytes) pairs against job_role. on_result(row) is called
+    from the calling thread for each finished resume; only "ok" rows carry a
+    model analysis. slot() is entered around every model call and context()
+    around every analysis thread task. Returns the Progress.
+    """
+    on_result = on_result or (lambda row: None)
+    progress = Progress(len(resumes), on_progress)
+    limiter = RateLimiter(rate_per_minute)
+
+    def finish(row):
+        on_result(row)
+        progress.record(row["status"] == "ok")
+
+    with ProcessPoolExecutor(max_workers=extract_workers, mp_context=process_context()) as extractors, \
+            ThreadPoolExecutor(max_workers=llm_workers) as analyzers:
+        pending = {}
+        for filename, data in resumes:
+            if data is None:
+                finish({"filename": filename, "job_role": job_role, "status": "extract_error",
+                        "error": f"File is larger than {MAX_RESUME_BYTES // (1024 * 1024)} MB."})
+                continue
+            pending[extractors.submit(extract_file_bytes, (filename, data))] = ("extract", filename)
+        while pending:
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                stage, filename = pending.pop(future)
+                if stage == "extract":
+                    try:
+                        _, resume_text = future.result()
+                    except Exception as e:
+                        resume_text = f"Error processing file: {e}"
+                    if resume_text.startswith("Error"):
+                        finish({"filename": filename, "job_role": job_role, "status": "extract_error", "error": resume_text})
+                        continue
+                    future = analyzers.submit(analyze_one, resume_text, job_role, limiter, slot, context)
+                    pending[future] = ("analyze", filename)
+                    continue
+
+                try:
+                    status, result, error = future.result()
+                except Exception as e:
+                    status, result, error = "analysis_error", None, f"An error occurred during AI analysis: {e}"
+                if result is None:
+                    finish({"filename": filename, "job_role": job_role, "status": status, "error": error})
+                    continue
+                data = extract_analysis_data(result)
+                finish({
+                    "filename": filename,
+                    "job_role": job_role,
+                    "status": status,
+                    "score": data["score"],
+                    "missing_skills": data["missing_skills"],
+                    "error": error,
+                    "result": result,
+                })
+    return progress
+
+
+class ReportWriter:
+    """Writes screening rows to a CSV or JSONL report as they arrive."""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.lower().endswith((".jsonl", ".json"))
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        if not self.jsonl:
+            self._writer = csv.DictWriter(self._file, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+            self._writer.writeheader()
+
+    def write(self, row):
+        if self.jsonl:
+            self._file.write(json.dumps(row) + "\n")
+        else:
+            self._writer.writerow({**row, "missing_skills": "; ".join(row.get("missing_skills") or [])})
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a ZIP or directory of resumes against one job role.")
+    parser.add_argument("source", help="Directory or .zip file of PDF/DOCX resumes")
+    parser.add_argument("--role", required=True, help="Target job role")
+    parser.add_argument("--out", default="screening_report.csv", help="Report path (.csv or .jsonl)")
+    parser.add_argument("--user-email", help="Also save each analysis to this user's history")
+    parser.add_argument("--extract-workers", type=int, default=None, help="Text extraction processes (default: CPU count)")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Concurrent Gemini calls")
+    parser.add_argument("--rate", type=float, default=60, help="Maximum Gemini calls per minute")
+    args = parser.parse_args(argv)
+
+    try:
+        resumes = collect_resumes(args.source)
+    except (ArchiveRejected, zipfile.BadZipFile) as e:
+        print(f"Cannot screen {args.source}: {e}")
+        return 1
+    if not resumes:
+        print("No PDF or DOCX resumes found.")
+        return 1
+
+    save_row = None
+    context = None
+    app_context = nullcontext
+    # Saving history and the sql analysis cache both need the app's database
+    if args.user_email or analysis_cache.backend.name == "sql":
+        from app import app, save_history
+        from models import User
+        app_context = app.app_context
+        context = app_context()
+        context.push()
+    if args.user_email:
+        user = User.query.filter_by(email=args.user_email).first()
+        if not user:
+            print(f"No user with email {args.user_email}.")
+            context.pop()
+            return 1
+
+        def save_row(row):
+            if row["status"] == "ok":
+                save_history(user.id, args.role, row["result"])
+
+    report = ReportWriter(args.out)
+
+    def on_result(row):
+        report.write(row)
+        if save_row:
+            save_row(row)
+
+    print(f"Screening {len(resumes)} resumes for '{args.role}'...")
+    try:
+        progress = screen_resumes(
+            resumes, args.role,
+            on_result=on_result,
+            on_progress=lambda p: print(f"\r{p}", end="", file=sys.stderr, flush=True),
+            extract_workers=args.extract_workers,
+            llm_workers=args.llm_workers,
+            rate_per_minute=args.rate,
+            context=app_context,
+        )
+    finally:
+        report.close()
+        if context:
+            context.pop()
+    print(f"\nDone: {progress}. Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+Full-text search over a user's analysis history, with role facets, date
+ranges and pagination.
+
+On SQLite an FTS5 table, analysis_search, indexes the job role and result of
+every analysis. It is an external-content table over a view of
+analysis_history, so the text is not stored twice, and triggers keep it in
+step with inserts, updates and deletes. The view adds an "owner" column
+("u<user_id>"), so a query only walks the postings of the user's own rows
+instead of every match in the table. On Postgres a generated tsvector column
+with a GIN index does the same job. install() creates either one and is run
+by migrations.py.
+
+When the index is missing (a database created with db.create_all() only, or
+SQLite built without FTS5) search() falls back to LIKE over the user's rows.
+"""
+import html
+import re
+from datetime import timedelta
+
+from sqlalchemy import and_, func, inspect, literal_column, or_, select, table, column, text
+
+from models import db, ResumeAnalysis
+
+FTS_TABLE = "analysis_search"
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+FACET_LIMIT = 20
+
+# snippet()/ts_headline() mark matches with these, so the text can be escaped before <mark> goes in
+_START, _END = "\x02", "\x03"
+
+SQLITE_DDL = [
+    f"""CREATE VIEW IF NOT EXISTS {FTS_TABLE}_source AS
+        SELECT id, 'u' || user_id AS owner, job_role, result FROM analysis_history""",
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        owner, job_role, result, content='{FTS_TABLE}_source', content_rowid='id', tokenize='porter unicode61')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON analysis_history BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, owner, job_role, result)
+        VALUES (new.id, 'u' || new.user_id, new.job_role, new.result);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON analysis_history BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, job_role, result)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.job_role, old.result);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF user_id, job_role, result ON analysis_history BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, job_role, result)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.job_role, old.result);
+        INSERT INTO {FTS_TABLE}(rowid, owner, job_role, result)
+        VALUES (new.id, 'u' || new.user_id, new.job_role, new.result);
+    END""",
+    # Indexes the rows saved before the table existed
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_DDL = [
+    """ALTER TABLE analysis_history ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(job_role, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(result, '')), 'B')) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_analysis_search ON analysis_history USING GIN (search_vector)",
+]
+
+_engines = {}
+
+
+def search_engine(engine=None):
+    """Which search the database supports: "fts5", "tsvector" or "like"."""
+    engine = engine or db.engine
+    if engine not in _engines:
+        name = "like"
+        if engine.dialect.name == "sqlite" and inspect(engine).has_table(FTS_TABLE):
+            name = "fts5"
+        elif engine.dialect.name == "postgresql":
+            if any(c["name"] == "search_vector" for c in inspect(engine).get_columns("analysis_history")):
+                name = "tsvector"
+        _engines[engine] = name
+    return _engines[engine]
+
+
+def install(engine=None):
+    """Creates the search index and its sync triggers if they are missing. Returns the search engine name."""
+    engine = engine or db.engine
+    _engines.pop(engine, None)
+    if search_engine(engine) != "like":
+        return _engines[engine]
+    if engine.dialect.name == "sqlite":
+        statements = SQLITE_DDL
+    elif engine.dialect.name == "postgresql":
+        statements = POSTGRES_DDL
+    else:
+        return "like"
+    try:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    except Exception as e:
+        # e.g. an SQLite build without FTS5; search keeps working through LIKE
+        print(f"Could not create the history search index: {e}")
+        return "like"
+    _engines.pop(engine, None)
+    print(f"Created the history search index ({search_engine(engine)})")
+    return _engines[engine]
+
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def parse_terms(query):
+    """Splits a query into [(terms, prefix)]: quoted phrases stay whole, a trailing * asks for a prefix match."""
+    terms = []
+    for phrase, word in _TERM_RE.findall(query or ""):
+        value = phrase or word
+        prefix = bool(word) and word.endswith("*")
+        value = value.rstrip("*") if prefix else value
+        if re.search(r"\w", value):
+            terms.append((value, prefix))
+    return terms
+
+
+def fts5_match(user_id, terms):
+    """FTS5 query for the terms within one user's rows. Every term is quoted, so user input is never FTS syntax."""
+    quoted = [('"' + value.replace('"', '""') + '"') + ("*" if prefix else "") for value, prefix in terms]
+    return f'owner:"u{int(user_id)}" AND {{job_role result}}: ({" AND ".join(quoted)})'
+
+
+def format_snippet(value):
+    """Escapes a marked-up snippet and turns the match markers into <mark> tags."""
+    value = html.escape(" ".join((value or "").split()))
+    return value.replace(_START, "<mark>").replace(_END, "</mark>")
+
+
+def search(user_id, query, roles=None, date_from=None, date_to=None, page=1, page_size=PAGE_SIZE):
+    """
+    Ranked search over one user's analyses. `roles` filters the results but
+    not the role facets; date_from and date_to are inclusive dates. Returns
+    a dict with the page of results (with highlighted snippets), the total,
+    and the role facets for the query and date range.
+    """
+    terms = parse_terms(query)
+    page = max(page or 1, 1)
+    page_size = min(max(page_size or PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    response = {"query": query, "page": page, "page_size": page_size, "total": 0, "results": [],
+                "facets": {"job_role": []}, "engine": search_engine()}
+    if not terms:
+        return response
+
+    engine = response["engine"]
+    if engine == "fts5":
+        # The owner term already limits the match to the user's rows. A user_id
+        # filter on analysis_history would let SQLite drive the join from
+        # ix_analysis_user_created and re-run the MATCH once per row.
+        fts = table(FTS_TABLE, column("rowid"))
+        match = literal_column(FTS_TABLE).op("MATCH")(fts5_match(user_id, terms))
+        matched = select(ResumeAnalysis.id).select_from(fts).join(ResumeAnalysis, ResumeAnalysis.id == fts.c.rowid).where(match)
+        # bm25 is lower for better matches; a hit in the role counts five times one in the result text
+        rank = func.bm25(literal_column(FTS_TABLE), 0.0, 5.0, 1.0)
+        order = [rank, ResumeAnalysis.id.desc()]
+    elif engine == "tsvector":
+        tsquery = func.websearch_to_tsquery("english", query)
+        vector = literal_column("analysis_history.search_vector")
+        matched = select(ResumeAnalysis.id).where(vector.op("@@")(tsquery))
+        rank = func.ts_rank_cd(vector, tsquery)
+        order = [rank.desc(), ResumeAnalysis.id.desc()]
+    else:
+        conditions = []
+        for value, _ in terms:
+            pattern = f"%{value}%"
+            conditions.append(or_(ResumeAnalysis.job_role.ilike(pattern), ResumeAnalysis.result.ilike(pattern)))
+        matched = select(ResumeAnalysis.id).where(and_(*conditions))
+        rank = literal_column("0")
+        order = [ResumeAnalysis.created_at.desc(), ResumeAnalysis.id.desc()]
+
+    if engine != "fts5":
+        matched = matched.where(ResumeAnalysis.user_id == user_id)
+    if date_from:
+        matched = matched.where(ResumeAnalysis.created_at >= date_from)
+    if date_to:
+        matched = matched.where(ResumeAnalysis.created_at < date_to + timedelta(days=1))
+
+    facet_rows = db.session.execute(
+        matched.with_only_columns(ResumeAnalysis.job_role, func.count())
+        .group_by(ResumeAnalysis.job_role)
+        .order_by(func.count().desc(), ResumeAnalysis.job_role)
+    ).all()
+    response["facets"]["job_role"] = [{"value": role, "count": count} for role, count in facet_rows[:FACET_LIMIT]]
+    wanted = set(roles or [])
+    response["total"] = sum(count for role, count in facet_rows if not wanted or role in wanted)
+
+    if wanted:
+        matched = matched.where(ResumeAnalysis.job_role.in_(wanted))
+    rows = db.session.execute(
+        matched.with_only_columns(ResumeAnalysis.id, ResumeAnalysis.job_role, ResumeAnalysis.created_at,
+                                  ResumeAnalysis.score, rank.label("rank"))
+        .order_by(*order)
+        .limit(page_size)
+        .offset((page - 1) * page_size)
+    ).all()
+    snippets = page_snippets(engine, user_id, query, terms, [row.id for row in rows])
+    response["results"] = [{
+        "id": row.id,
+        "job_role": row.job_role,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "score": row.score,
+        "rank": round(float(row.rank), 4),
+        "snippet": snippets.get(row.id, ""),
+    } for row in rows]
+    return response
+
+
+def page_snippets(engine, user_id, query, terms, ids):
+    """Highlighted excerpts of the result text, built only for the rows on the page."""
+    if not ids:
+        return {}
+    if engine == "fts5":
+        fts = table(FTS_TABLE, column("rowid"))
+        # Unary + keeps the id list away from FTS5, which would otherwise look up
+        # each id separately instead of walking the user's matches once
+        rows = db.session.execute(
+            select(fts.c.rowid, func.snippet(literal_column(FTS_TABLE), 2, _START, _END, "…", 24))
+            .where(literal_column(FTS_TABLE).op("MATCH")(fts5_match(user_id, terms)),
+                   literal_column(f"+{FTS_TABLE}.rowid").in_(ids))
+        ).all()
+    elif engine == "tsvector":
+        options = f"StartSel={_START}, StopSel={_END}, MaxFragments=1, MaxWords=24, MinWords=10"
+        rows = db.session.execute(
+            select(ResumeAnalysis.id, func.ts_headline("english", ResumeAnalysis.result,
+                                                       func.websearch_to_tsquery("english", query), options))
+            .where(ResumeAnalysis.id.in_(ids))
+        ).all()
+    else:
+        rows = db.session.execute(select(ResumeAnalysis.id, ResumeAnalysis.result).where(ResumeAnalysis.id.in_(ids))).all()
+        rows = [(analysis_id, like_snippet(result, terms)) for analysis_id, result in rows]
+    return {analysis_id: format_snippet(snippet) for analysis_id, snippet in rows}
+
+
+def like_snippet(result, terms, width=120):
+    """Excerpt around the first term found in the text, marked like snippet() marks it."""
+    result = result or ""
+    lowered = result.lower()
+    for value, _ in terms:
+        at = lowered.find(value.lower())
+        if at >= 0:
+            start = max(at - width // 2, 0)
+            return ("…" if start else "") + result[start:at] + _START + result[at:at + len(value)] + _END + result[at + len(value):at + width // 2] + "…"
+    return result[:width]
@@ -0,0 +1,269 @@
+"""
+SQLite-backed job queue and worker pool.
+
+Long-running work (text extraction, the Gemini call, PDF rendering, email)
+is moved out of the request into background worker threads. The queue lives
+in a local SQLite file, so no Redis or other broker is needed, and multiple
+gunicorn workers on the same host share it safely.
+
+A running job is heartbeated by its worker, so a job that is merely slow
+(e.g. waiting for an admission slot) is never mistaken for one whose worker
+died. Jobs whose worker died are requeued, up to JOB_MAX_ATTEMPTS runs.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing
+
+import metrics
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+HEARTBEAT_SECONDS = 15
+# A running job without a heartbeat for this long lost its worker
+STALE_SECONDS = 120
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail a job with a user-facing message."""
+
+
+class SQLiteJobQueue:
+    """A durable FIFO queue stored in a single SQLite table."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    user_id INTEGER,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    heartbeat_at REAL
+                )
+            """)
+            # Queues created before heartbeats existed
+            if "heartbeat_at" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, kind, payload, user_id=None):
+        """Adds a job and returns its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, user_id, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, user_id, json.dumps(payload), now, now)
+            )
+        return job_id
+
+    def claim(self):
+        """Atomically takes the oldest queued job, or returns None."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, now, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get(row["id"])
+
+    def update(self, job_id, **fields):
+        """Updates status/stage/result/error columns of a job."""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        """Returns a job as a dict, or None if it does not exist."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def heartbeat(self, job_ids):
+        """Marks running jobs as still owned by a live worker."""
+        if not job_ids:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), RUNNING, *job_ids)
+            )
+
+    def requeue_stale(self, older_than=STALE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        """
+        Puts back jobs left 'running' by a worker that died mid-job, judged by
+        their last heartbeat. Jobs that already ran max_attempts times fail
+        instead. Returns the number requeued.
+        """
+        now = time.time()
+        # Rows claimed before heartbeats existed only have updated_at
+        stale = "status = ? AND COALESCE(heartbeat_at, updated_at) < ?"
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"UPDATE jobs SET status = ?, stage = NULL, error = ?, updated_at = ? WHERE {stale} AND attempts >= ?",
+                (FAILED, "The job was interrupted too many times and was stopped.", now, RUNNING, now - older_than,
+                 max_attempts)
+            )
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = ?, stage = NULL, updated_at = ? WHERE {stale}",
+                (QUEUED, now, RUNNING, now - older_than)
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount
+
+    def counts(self):
+        """Returns the number of jobs per status."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class WorkerPool:
+    """
+    Background threads that pull jobs from the queue and run their handlers
+    inside an app context, plus one thread that heartbeats the jobs they are
+    running and requeues jobs whose worker died. Threads are started lazily
+    so that each gunicorn worker gets its own pool after forking.
+    """
+
+    def __init__(self, queue, app, size=2, poll_interval=1.0):
+        self.queue = queue
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._running = set()
+
+    def register(self, kind, handler):
+        """Registers handler(job, set_stage) for jobs of the given kind."""
+        self.handlers[kind] = handler
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            self._pid = os.getpid()
+            self._running = set()
+            self.queue.requeue_stale()
+            self._threads = [threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)]
+            self._threads += [threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                              for i in range(self.size)]
+            for thread in self._threads:
+                thread.start()
+
+    def submit(self, kind, payload, user_id=None):
+        """Enqueues a job, makes sure workers are running and returns the job id."""
+        job_id = self.queue.enqueue(kind, payload, user_id=user_id)
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def _run(self):
+        while True:
+            try:
+                job = self.queue.claim()
+            except Exception as e:
+                print(f"Error claiming job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            with self._lock:
+                self._running.add(job["id"])
+            try:
+                self._execute(job)
+            finally:
+                with self._lock:
+                    self._running.discard(job["id"])
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            try:
+                with self._lock:
+                    running = list(self._running)
+                self.queue.heartbeat(running)
+                if self.queue.requeue_stale():
+                    self._wakeup.set()
+            except Exception as e:
+                print(f"Error heartbeating jobs: {e}")
+
+    def _execute(self, job):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self.queue.update(job["id"], status=FAILED, error=f"No handler for job kind '{job['kind']}'")
+            return
+
+        def set_stage(stage):
+            self.queue.update(job["id"], stage=stage)
+
+        status = FAILED
+        metrics.start_trace()
+        with self.app.app_context():
+            try:
+                result = handler(job, set_stage)
+                self.queue.update(job["id"], status=DONE, stage=None, result=result)
+                status = DONE
+            except JobFailed as e:
+                self.queue.update(job["id"], status=FAILED, error=str(e))
+            except Exception as e:
+                traceback.print_exc()
+                self.queue.update(job["id"], status=FAILED, error=f"An unexpected error occurred: {e}")
+        elapsed, stages = metrics.finish_trace()
+        metrics.job_duration.observe(elapsed, kind=job["kind"], status=status)
+        metrics.log_if_slow(f"{job['kind']} job {job['id']}", elapsed, stages)
@@ -0,0 +1,473 @@
+"""
+Shared LLM client used by analysis.py and ai_resume_generator.py.
+
+Every call goes through one LLMClient, which bounds concurrency with a
+semaphore, gives each call a deadline, retries transient errors with jittered
+backoff, and trips a circuit breaker after repeated failures so callers fall
+back to local scoring instead of waiting on a struggling API. Latency and
+token counts are tracked for /cache-stats and /metrics.
+
+LLM_BACKEND=fake swaps Gemini for a deterministic in-process backend, so the
+whole app can be exercised and load-tested offline.
+
+agenerate() and astream() are the asyncio versions used by asgi.py. They
+share the breaker and statistics with the threaded methods but have their
+own, larger concurrency limit, since a waiting coroutine costs no thread.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+
+class LLMError(Exception):
+    """Raised when a call fails after all retries."""
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling the backend: not configured, circuit open or too busy."""
+
+
+class GeminiBackend:
+    """Google Gemini through google-generativeai; the model is built on first use."""
+    name = "gemini"
+
+    def __init__(self, model_name="gemini-1.5-flash", api_key=None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    @staticmethod
+    def _usage(response):
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return None, None
+        return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+    def generate(self, prompt, timeout):
+        response = self._get_model().generate_content(prompt, request_options={"timeout": timeout})
+        return response.text, self._usage(response)
+
+    def stream(self, prompt, timeout):
+        response = self._get_model().generate_content(prompt, stream=True, request_options={"timeout": timeout})
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    async def agenerate(self, prompt, timeout):
+        response = await self._get_model().generate_content_async(prompt, request_options={"timeout": timeout})
+        return response.text, self._usage(response)
+
+    async def astream(self, prompt, timeout):
+        response = await self._get_model().generate_content_async(prompt, stream=True, request_options={"timeout": timeout})
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend:
+    """
+    Deterministic offline backend. The reply depends only on the prompt, so
+    repeated runs are reproducible; LLM_FAKE_LATENCY_MS adds a fixed delay.
+    """
+    name = "fake"
+    configured = True
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def _reply(self, prompt):
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        if "JSON Output Structure" in prompt:
+            return self._resume_json(prompt)
+        if "### Role: <role name>" in prompt:
+            # Multi-role prompts list the roles as "1. Role" before the instructions
+            roles = re.findall(r"^\s*\d+\. (.+)$", prompt.split("### Role: <role name>")[0], re.MULTILINE)
+            return "\n\n".join(f"### Role: {role}\n{self._analysis(seed + index)}" for index, role in enumerate(roles))
+        return self._analysis(seed)
+
+    @staticmethod
+    def _analysis(seed):
+        score = 55 + seed % 40
+        return "\n".join([
+            f"**Resume Score:** {score}/100",
+            "",
+            "**Strengths:**",
+            "- Clear description of recent projects.",
+            "- Relevant technical skills are listed near the top.",
+            "",
+            "**Areas for Improvement:**",
+            "- Quantify achievements with numbers and outcomes.",
+            "- Tailor the summary to the target role.",
+            "",
+            "**Missing Skills/Keywords:**",
+            "- Testing",
+            "- Cloud deployment",
+        ])
+
+    @staticmethod
+    def _resume_json(prompt):
+        import json
+
+        def field(label):
+            match = re.search(rf"- {label}: (.*)", prompt)
+            return match.group(1).strip() if match else ""
+
+        return json.dumps({
+            "name": field("Name"),
+            "email": field("Email"),
+            "phone": field("Phone"),
+            "job_role": field("Target Job Role"),
+            "summary": f"Motivated {field('Target Job Role') or 'professional'} with hands-on project experience.",
+            "skills": {"Technical": [s.strip() for s in field("Provided Skills").split(",") if s.strip()],
+                       "Soft Skills": ["Communication"], "Tools": ["Git"]},
+            "experience": [],
+            "education": [],
+        })
+
+    def generate(self, prompt, timeout):
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+        text = self._reply(prompt)
+        return text, (len(prompt) // 4, len(text) // 4)
+
+    def stream(self, prompt, timeout):
+        text, _ = self.generate(prompt, timeout)
+        for line in text.splitlines(keepends=True):
+            yield line
+
+    async def agenerate(self, prompt, timeout):
+        import asyncio
+
+        if self.latency:
+            await asyncio.sleep(min(self.latency, timeout))
+        text = self._reply(prompt)
+        return text, (len(prompt) // 4, len(text) // 4)
+
+    async def astream(self, prompt, timeout):
+        text, _ = await self.agenerate(prompt, timeout)
+        for line in text.splitlines(keepends=True):
+            yield line
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `cooldown` seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        """True when a call may go ahead; "trial" when it is the half-open trial call."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return "trial"
+            return False
+
+    def end_trial(self):
+        """Frees the trial for the next call when it ended without a success or failure, e.g. cancelled."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class LLMClient:
+    """Concurrency-limited, deadline-bound, retrying front end to a backend."""
+
+    def __init__(self, backend, max_concurrency=4, timeout=60.0, retries=2, base_delay=1.0, breaker=None,
+                 async_max_concurrency=100):
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.async_max_concurrency = async_max_concurrency
+        # Created on first async call, inside the event loop that uses it
+        self._async_slots = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "failures": 0, "retries": 0, "rejected": 0,
+            "latency_total": 0.0, "latency_max": 0.0,
+            "prompt_tokens": 0, "response_tokens": 0,
+        }
+
+    @property
+    def available(self):
+        """True when a call could be attempted right now."""
+        return self.backend.configured and self.breaker.state != "open"
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+        for direction in ("prompt", "response"):
+            if deltas.get(f"{direction}_tokens"):
+                metrics.llm_tokens.inc(deltas[f"{direction}_tokens"], direction=direction)
+
+    def _record_latency(self, elapsed):
+        with self._lock:
+            self._stats["latency_total"] += elapsed
+            self._stats["latency_max"] = max(self._stats["latency_max"], elapsed)
+
+    def _check(self):
+        """Raises LLMUnavailable when the backend is not configured or the breaker is open."""
+        if not self.backend.configured:
+            raise LLMUnavailable("AI model is not initialized. Please check your API key.")
+        if self.breaker.state == "open":
+            self._count(rejected=1)
+            raise LLMUnavailable("AI service is temporarily unavailable.")
+
+    def _allow(self, slots):
+        """Asks the breaker once a slot is held, so a half-open trial never waits for one. Returns allow()."""
+        allowed = self.breaker.allow()
+        if not allowed:
+            slots.release()
+            self._count(rejected=1)
+            raise LLMUnavailable("AI service is temporarily unavailable.")
+        return allowed
+
+    def _admit(self, deadline):
+        """Waits for a concurrency slot before the deadline, then checks the breaker. Returns allow()."""
+        self._check()
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._count(rejected=1)
+            raise LLMUnavailable("AI service is busy. Please try again shortly.")
+        return self._allow(self._slots)
+
+    async def _admit_async(self, deadline):
+        import asyncio
+
+        self._check()
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.async_max_concurrency)
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._count(rejected=1)
+            raise LLMUnavailable("AI service is busy. Please try again shortly.")
+        return self._allow(self._async_slots)
+
+    def _failed(self, error, attempt, started, deadline):
+        """Records a failed attempt. Returns the backoff before the next one, or raises LLMError."""
+        self._record_latency(time.monotonic() - started)
+        metrics.llm_duration.observe(time.monotonic() - started, backend=self.backend.name, outcome="error")
+        self._count(failures=1)
+        self.breaker.record_failure()
+        delay = self.base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if attempt == self.retries or time.monotonic() + delay >= deadline or self.breaker.state != "closed":
+            raise LLMError(str(error)) from error
+        self._count(retries=1)
+        return delay
+
+    def _succeeded(self, prompt, text, usage, started):
+        prompt_tokens, response_tokens = usage
+        self._record_latency(time.monotonic() - started)
+        metrics.llm_duration.observe(time.monotonic() - started, backend=self.backend.name, outcome="ok")
+        self._count(prompt_tokens=prompt_tokens or len(prompt) // 4,
+                    response_tokens=response_tokens or len(text) // 4)
+        self.breaker.record_success()
+        return text
+
+    def _stream_ended(self, prompt, chunks, started, outcome):
+        if outcome != "error":
+            self.breaker.record_success()
+            self._count(prompt_tokens=len(prompt) // 4, response_tokens=len("".join(chunks)) // 4)
+        self._record_latency(time.monotonic() - started)
+        metrics.llm_duration.observe(time.monotonic() - started, backend=self.backend.name, outcome=outcome)
+
+    def generate(self, prompt, timeout=None):
+        """Returns the generated text, retrying transient errors until the deadline."""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        allowed = self._admit(deadline)
+        try:
+            for attempt in range(self.retries + 1):
+                started = time.monotonic()
+                self._count(calls=1)
+                try:
+                    with metrics.span("llm"):
+                        text, usage = self.backend.generate(prompt, max(1.0, deadline - started))
+                except Exception as e:
+                    time.sleep(self._failed(e, attempt, started, deadline))
+                    continue
+                return self._succeeded(prompt, text, usage, started)
+        finally:
+            if allowed == "trial":
+                self.breaker.end_trial()
+            self._slots.release()
+
+    async def agenerate(self, prompt, timeout=None):
+        """generate() for the event loop: waits on the backend without holding a thread."""
+        import asyncio
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        allowed = await self._admit_async(deadline)
+        try:
+            for attempt in range(self.retries + 1):
+                started = time.monotonic()
+                self._count(calls=1)
+                try:
+                    with metrics.span("llm"):
+                        text, usage = await self.backend.agenerate(prompt, max(1.0, deadline - started))
+                except Exception as e:
+                    await asyncio.sleep(self._failed(e, attempt, started, deadline))
+                    continue
+                return self._succeeded(prompt, text, usage, started)
+        finally:
+            # CancelledError skips _failed(), so a cancelled trial is given back here
+            if allowed == "trial":
+                self.breaker.end_trial()
+            self._async_slots.release()
+
+    def stream(self, prompt, timeout=None):
+        """
+        Yields text chunks. A stream that fails before its first chunk is
+        retried like generate(); once output has started it is not.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        allowed = self._admit(deadline)
+        chunks = []
+        outcome = "ok"
+        try:
+            for attempt in range(self.retries + 1):
+                started = time.monotonic()
+                self._count(calls=1)
+                try:
+                    for chunk in self.backend.stream(prompt, max(1.0, deadline - started)):
+                        chunks.append(chunk)
+                        yield chunk
+                    return
+                except Exception as e:
+                    if chunks:
+                        outcome = "error"
+                        self._count(failures=1)
+                        self.breaker.record_failure()
+                        raise LLMError(str(e)) from e
+                    # _failed() records this attempt, so the finally block must not
+                    outcome = None
+                    time.sleep(self._failed(e, attempt, started, deadline))
+                    outcome = "ok"
+        finally:
+            # Also reached when the caller stops reading early, e.g. once a JSON object was complete
+            if outcome is not None:
+                self._stream_ended(prompt, chunks, started, outcome)
+            if allowed == "trial":
+                self.breaker.end_trial()
+            self._slots.release()
+
+    async def astream(self, prompt, timeout=None):
+        """stream() for the event loop."""
+        import asyncio
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        allowed = await self._admit_async(deadline)
+        chunks = []
+        outcome = "ok"
+        try:
+            for attempt in range(self.retries + 1):
+                started = time.monotonic()
+                self._count(calls=1)
+                try:
+                    async for chunk in self.backend.astream(prompt, max(1.0, deadline - started)):
+                        chunks.append(chunk)
+                        yield chunk
+                    return
+                except Exception as e:
+                    if chunks:
+                        outcome = "error"
+                        self._count(failures=1)
+                        self.breaker.record_failure()
+                        raise LLMError(str(e)) from e
+                    outcome = None
+                    await asyncio.sleep(self._failed(e, attempt, started, deadline))
+                    outcome = "ok"
+        finally:
+            if outcome is not None:
+                self._stream_ended(prompt, chunks, started, outcome)
+            if allowed == "trial":
+                self.breaker.end_trial()
+            self._async_slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["latency_avg"] = round(stats["latency_total"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["latency_total"] = round(stats["latency_total"], 4)
+        stats["latency_max"] = round(stats["latency_max"], 4)
+        stats["backend"] = self.backend.name
+        stats["circuit"] = self.breaker.state
+        return stats
+
+
+def build_client():
+    """Builds the shared client from LLM_* environment variables."""
+    if os.getenv("LLM_BACKEND", "gemini").lower() == "fake":
+        backend = FakeBackend(latency=float(os.getenv("LLM_FAKE_LATENCY_MS", 0)) / 1000)
+    else:
+        backend = GeminiBackend(os.getenv("LLM_MODEL", "gemini-1.5-flash"), os.getenv("GOOGLE_API_KEY"))
+        if not backend.configured:
+            print("GOOGLE_API_KEY environment variable is not set.")
+    return LLMClient(
+        backend,
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 4)),
+        timeout=float(os.getenv("LLM_TIMEOUT", 60)),
+        retries=int(os.getenv("LLM_RETRIES", 2)),
+        async_max_concurrency=int(os.getenv("LLM_ASYNC_MAX_CONCURRENCY", 100)),
+        breaker=CircuitBreaker(
+            threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", 5)),
+            cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+        )
+    )
+
+
+client = build_client()
@@ -0,0 +1,286 @@
+"""
+Outbox-based email delivery.
+
+Requests only insert an EmailOutbox row. A background sender claims pending
+rows in batches and delivers them over a pooled, already-authenticated SMTP
+connection, retrying failures with exponential backoff and recording the
+delivery status that the dashboard shows.
+
+The SMTP server is configurable so delivery can be tested against a local
+debugging server, e.g. SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SECURITY=none.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+
+import metrics
+from models import db, EmailOutbox
+
+load_dotenv()
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 20))
+RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+# Serverless deployments cannot keep the sender thread alive, so they deliver
+# the outbox inline right after queueing
+OUTBOX_INLINE = os.getenv("OUTBOX_INLINE", "1" if os.getenv("VERCEL") else "0") == "1"
+
+
+def smtp_settings():
+    return {
+        "host": os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", 465)),
+        "security": os.getenv("SMTP_SECURITY", "ssl").lower(),
+        "sender_email": os.getenv("SENDER_EMAIL"),
+        "sender_password": os.getenv("SENDER_PASSWORD"),
+        "timeout": float(os.getenv("SMTP_TIMEOUT", 30)),
+    }
+
+
+def open_smtp_connection(settings=None):
+    """Opens and authenticates an SMTP connection using SMTP_* settings."""
+    import smtplib
+
+    settings = settings or smtp_settings()
+    if settings["security"] != "none" and not (settings["sender_email"] and settings["sender_password"]):
+        raise RuntimeError("SENDER_EMAIL and SENDER_PASSWORD environment variables are required.")
+    if settings["security"] == "ssl":
+        smtp = smtplib.SMTP_SSL(settings["host"], settings["port"], timeout=settings["timeout"])
+    else:
+        smtp = smtplib.SMTP(settings["host"], settings["port"], timeout=settings["timeout"])
+        if settings["security"] == "starttls":
+            smtp.starttls()
+    if settings["security"] != "none":
+        smtp.login(settings["sender_email"], settings["sender_password"])
+    return smtp
+
+
+def build_message(receiver_email, subject, body, attachment=None, attachment_name="Resume_Report.pdf"):
+    """Builds the EmailMessage sent for reports. attachment is raw PDF bytes."""
+    sender_email = os.getenv("SENDER_EMAIL") or "no-reply@localhost"
+    msg = EmailMessage()
+    msg['From'] = formataddr(("Resume Analyzer", sender_email))
+    msg['To'] = receiver_email
+    msg['Subject'] = subject
+    msg.set_content(body)
+    if attachment:
+        msg.add_attachment(attachment, maintype='application', subtype='pdf', filename=attachment_name)
+    return msg
+
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP connections open between messages, so only
+    the first message pays for the TLS handshake and login.
+    """
+
+    def __init__(self, size=2, max_idle=60):
+        self.size = size
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                smtp, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.max_idle and self._alive(smtp):
+                return smtp
+            self.discard(smtp)
+        return open_smtp_connection()
+
+    def release(self, smtp):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((smtp, time.monotonic()))
+                return
+        self.discard(smtp)
+
+    @staticmethod
+    def discard(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _alive(smtp):
+        try:
+            return smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def close_idle(self, older_than=None):
+        """Closes connections that have been idle too long."""
+        older_than = self.max_idle if older_than is None else older_than
+        with self._lock:
+            now = time.monotonic()
+            stale = [smtp for smtp, last_used in self._idle if now - last_used >= older_than]
+            self._idle = [(smtp, last_used) for smtp, last_used in self._idle if now - last_used < older_than]
+        for smtp in stale:
+            self.discard(smtp)
+
+
+pool = SMTPConnectionPool()
+
+
+def send_message(msg):
+    """Sends one message over a pooled connection; raises on failure."""
+    started = time.perf_counter()
+    smtp = None
+    try:
+        smtp = pool.acquire()
+        smtp.send_message(msg)
+    except Exception:
+        if smtp is not None:
+            pool.discard(smtp)
+        metrics.smtp_duration.observe(time.perf_counter() - started, outcome="error")
+        raise
+    metrics.smtp_duration.observe(time.perf_counter() - started, outcome="ok")
+    pool.release(smtp)
+
+
+def enqueue_email(recipient, subject, body, attachment=None, user_id=None, analysis_id=None):
+    """Queues an email for background delivery and returns the outbox row."""
+    message = EmailOutbox(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        attachment=attachment.getvalue() if attachment is not None else None,
+        attachment_name="Resume_Report.pdf" if attachment is not None else None,
+        user_id=user_id,
+        analysis_id=analysis_id,
+    )
+    db.session.add(message)
+    db.session.commit()
+    sender.notify()
+    return message
+
+
+def claim_batch(limit=BATCH_SIZE):
+    """Marks up to `limit` due messages as sending and returns them."""
+    now = datetime.utcnow()
+    candidates = (EmailOutbox.query
+                  .filter(EmailOutbox.status == PENDING, EmailOutbox.next_attempt_at <= now)
+                  .order_by(EmailOutbox.next_attempt_at)
+                  .limit(limit)
+                  .with_entities(EmailOutbox.id)
+                  .all())
+    claimed = []
+    for (message_id,) in candidates:
+        # Conditional update, so two senders never claim the same row
+        updated = (EmailOutbox.query
+                   .filter(EmailOutbox.id == message_id, EmailOutbox.status == PENDING)
+                   .update({EmailOutbox.status: SENDING, EmailOutbox.claimed_at: now}, synchronize_session=False))
+        if updated:
+            claimed.append(message_id)
+    db.session.commit()
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).all() if claimed else []
+
+
+def deliver_pending(limit=BATCH_SIZE):
+    """Delivers one batch of due messages. Returns how many were attempted."""
+    batch = claim_batch(limit)
+    for message in batch:
+        message.attempts += 1
+        try:
+            send_message(build_message(message.recipient, message.subject, message.body,
+                                       attachment=message.attachment,
+                                       attachment_name=message.attachment_name or "Resume_Report.pdf"))
+            message.status = SENT
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+        except Exception as e:
+            print(f"Error sending email {message.id}: {e}")
+            message.last_error = str(e)
+            if message.attempts >= MAX_ATTEMPTS:
+                message.status = FAILED
+            else:
+                delay = RETRY_BASE_SECONDS * (2 ** (message.attempts - 1)) * random.uniform(0.8, 1.2)
+                message.status = PENDING
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+    return len(batch)
+
+
+def requeue_stuck(older_than=600):
+    """Returns rows a crashed process claimed more than `older_than` seconds ago to the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    # Rows claimed before claimed_at existed only have the time they became due
+    claimed_before_cutoff = or_(EmailOutbox.claimed_at < cutoff,
+                                and_(EmailOutbox.claimed_at.is_(None), EmailOutbox.next_attempt_at < cutoff))
+    (EmailOutbox.query
+     .filter(EmailOutbox.status == SENDING, claimed_before_cutoff)
+     .update({EmailOutbox.status: PENDING}, synchronize_session=False))
+    db.session.commit()
+
+
+class OutboxSender:
+    """Background thread that drains the outbox inside an app context."""
+
+    def __init__(self, poll_interval=5.0, inline=OUTBOX_INLINE):
+        self.app = None
+        self.poll_interval = poll_interval
+        self.inline = inline
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def start(self):
+        with self._lock:
+            if self.app is None:
+                return
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        if self.inline:
+            deliver_pending()
+            return
+        self.start()
+        self._wakeup.set()
+
+    def _run(self):
+        with self.app.app_context():
+            try:
+                requeue_stuck()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error requeueing stuck emails: {e}")
+        while True:
+            attempted = 0
+            with self.app.app_context():
+                try:
+                    attempted = deliver_pending()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error delivering outbox: {e}")
+            if attempted:
+                continue
+            pool.close_idle()
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+sender = OutboxSender(poll_interval=float(os.getenv("OUTBOX_POLL_SECONDS", 5)))
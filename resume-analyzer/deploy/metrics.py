@@ -0,0 +1,326 @@
+"""
+In-process counters, histograms and gauges with a Prometheus text exposition.
+
+span(stage) times a block of work into the stage_duration_seconds histogram
+and, while a request or background job is being traced in the current
+context, into its per-stage breakdown, which is logged when the request or
+job is slower than SLOW_REQUEST_MS. Recording a value is one lock and a
+dict lookup, so instrumentation stays on in production.
+
+Gunicorn runs several worker processes and a scrape only reaches one of them.
+When METRICS_DIR is set, every process writes a snapshot of its metrics
+there every few seconds and render() adds all snapshots together.
+"""
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 2000))
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+
+# Seconds; wide enough for a sub-millisecond cache hit and a minute-long LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label combination."""
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def render(self, series):
+        for key, value in sorted(series.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+
+
+class Gauge:
+    """
+    Current value read from `function` at scrape time, e.g. a queue depth
+    that lives in a shared database. It is never written to snapshot files,
+    because every process would report the same value.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.function = None
+
+    def set_function(self, function):
+        """`function` returns {label values tuple: value}."""
+        self.function = function
+
+    def snapshot(self):
+        return {}
+
+    def collect(self):
+        if self.function is None:
+            return {}
+        try:
+            return {tuple(str(v) for v in key): value for key, value in self.function().items()}
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return {}
+
+    render = Counter.render
+
+
+class Histogram:
+    """Fixed-bucket histogram; each series is [per-bucket counts..., +Inf count, sum]."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._values.items()}
+
+    @staticmethod
+    def merge(total, series):
+        if total is None:
+            return list(series)
+        return [a + b for a, b in zip(total, series)]
+
+    def render(self, series):
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = 'le="' + _format_number(float(bound)) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_number(float(values[-1]))}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    """Holds the metrics and renders them, merging other processes' snapshots from `directory`."""
+
+    def __init__(self, directory=None, flush_interval=FLUSH_SECONDS):
+        self.metrics = {}
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def configure(self, directory):
+        """Enables cross-process aggregation through snapshot files in `directory`."""
+        self.directory = directory or None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._start_flusher()
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def _start_flusher(self):
+        # Started again after a fork, since the parent's thread does not survive it
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while self._flusher_pid == os.getpid():
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Writes this process's snapshot for the other workers to read."""
+        if not self.directory:
+            return
+        data = {name: [[list(key), value] for key, value in metric.snapshot().items()]
+                for name, metric in self.metrics.items()}
+        path = self._snapshot_path(os.getpid())
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(data, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error writing metrics snapshot: {e}")
+
+    def collect(self):
+        """Returns {name: {labels: value}} for this process plus any other processes' snapshots."""
+        merged = {name: metric.collect() if isinstance(metric, Gauge) else metric.snapshot()
+                  for name, metric in self.metrics.items()}
+        if not self.directory:
+            return merged
+        self._start_flusher()
+        own = os.path.basename(self._snapshot_path(os.getpid()))
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json") or entry.name == own:
+                continue
+            try:
+                with open(entry.path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, series in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None or isinstance(metric, Gauge):
+                    continue
+                for key, value in series:
+                    key = tuple(key)
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, series in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(series))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter("http_requests_total", "HTTP requests by endpoint and status.", ("method", "endpoint", "status"))
+http_duration = registry.histogram("http_request_duration_seconds", "Time spent handling a request.", ("endpoint",))
+stage_duration = registry.histogram("stage_duration_seconds", "Time spent in each processing stage.", ("stage",))
+job_duration = registry.histogram("job_duration_seconds", "Background job run time.", ("kind", "status"))
+llm_duration = registry.histogram("llm_request_duration_seconds", "Latency of one LLM backend call.", ("backend", "outcome"))
+llm_tokens = registry.counter("llm_tokens_total", "Prompt and response tokens.", ("direction",))
+smtp_duration = registry.histogram("smtp_send_duration_seconds", "Time to hand one email to the SMTP server.", ("outcome",))
+upload_bytes = registry.histogram("upload_size_bytes", "Size of uploaded resumes and archives.", ("endpoint",), buckets=BYTE_BUCKETS)
+cache_requests = registry.counter("cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"))
+job_queue_depth = registry.gauge("job_queue_jobs", "Background jobs by status.", ("status",))
+admission_requests = registry.counter("admission_requests_total", "LLM admission decisions by route and outcome.", ("route", "outcome"))
+admission_wait = registry.histogram("admission_wait_seconds", "Time spent queued for an LLM slot.", ("route",))
+revision_analyses = registry.counter("revision_analyses_total", "Analyses by how they compared with the user's previous upload.", ("outcome",))
+revision_chars = registry.counter("revision_text_chars_total", "Resume text reused from the previous analysis or sent to the model.", ("kind",))
+admission_depth = registry.gauge("admission_requests", "LLM requests holding or waiting for a slot, across workers.", ("route", "state"))
+
+atexit.register(registry.flush)
+
+
+# Trace of the request or job being handled: {"started", "stages": [[stage, seconds]] in start order, "shared"}.
+# A context variable rather than a thread-local, so asyncio tasks each get their own
+# and threads started with asyncio.to_thread see the task's trace.
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def start_trace(shared=False):
+    """
+    Starts tracing the current request or job. A shared trace (started by
+    asgi.py for a whole request) is kept when the threads that handle parts
+    of that request start their own.
+    """
+    if registry.directory:
+        registry._start_flusher()
+    trace = _trace.get()
+    if trace is not None and trace["shared"]:
+        return
+    _trace.set({"started": time.perf_counter(), "stages": [], "shared": shared})
+
+
+def finish_trace():
+    """Ends the current trace and returns (elapsed seconds, stages)."""
+    trace = _trace.get()
+    _trace.set(None)
+    if trace is None:
+        return 0.0, []
+    return time.perf_counter() - trace["started"], trace["stages"]
+
+
+@contextmanager
+def span(stage):
+    """Times the block into stage_duration_seconds and the current trace."""
+    trace = _trace.get()
+    entry = None
+    if trace is not None:
+        entry = [stage, None]
+        trace["stages"].append(entry)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_duration.observe(elapsed, stage=stage)
+        if entry is not None:
+            entry[1] = elapsed
+
+
+def format_stages(stages):
+    return " ".join(f"{stage}={elapsed * 1000:.0f}ms" for stage, elapsed in stages if elapsed is not None) or "-"
+
+
+def log_if_slow(label, elapsed, stages):
+    """Prints a per-stage breakdown when `elapsed` is over SLOW_REQUEST_MS."""
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        print(f"Slow {label}: {elapsed * 1000:.0f}ms [{format_stages(stages)}]")
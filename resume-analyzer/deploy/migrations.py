@@ -0,0 +1,67 @@
+"""
+Brings an existing database up to date with models.py and backfills derived data.
+
+db.create_all() only creates missing tables, so columns and indexes added to
+existing models are applied here. Run it after deploying a new version:
+    python migrations.py
+"""
+from sqlalchemy import inspect, text
+
+import history_search
+from models import db, ResumeAnalysis
+from utils import analysis_fields
+
+
+def upgrade_schema():
+    """
+    Creates missing tables, then adds missing columns and indexes to existing
+    ones, and the full-text index used by /search.
+    """
+    db.create_all()
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+                print(f"Created index {index.name}")
+
+    history_search.install(db.engine)
+
+
+def backfill_analysis_fields(batch_size=500):
+    """Parses stored results of rows saved before the structured columns existed."""
+    total = 0
+    while True:
+        rows = ResumeAnalysis.query.filter(ResumeAnalysis.result_html.is_(None)).limit(batch_size).all()
+        if not rows:
+            break
+        for analysis in rows:
+            for name, value in analysis_fields(analysis.result).items():
+                setattr(analysis, name, value)
+        db.session.commit()
+        total += len(rows)
+    if total:
+        print(f"Backfilled {total} analyses")
+    return total
+
+
+def migrate():
+    upgrade_schema()
+    backfill_analysis_fields()
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        migrate()
+    print("Database is up to date.")
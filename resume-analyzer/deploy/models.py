@@ -28,13 +28,115 @@ class ResumeAnalysis(db.Model):
     Har analysis ek user se juda hota hai.
     """
     __tablename__ = 'analysis_history'
+    __table_args__ = (
+        # Dashboard ki keyset pagination (user_id, created_at, id) par chalti hai
+        db.Index('ix_analysis_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_analysis_user_score', 'user_id', 'score', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     job_role = db.Column(db.String(100), nullable=False)
     result = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Result text se ek baar parse kiye gaye fields (write time par bharte hain)
+    score = db.Column(db.Integer)
+    strengths = db.Column(db.JSON)
+    improvements = db.Column(db.JSON)
+    missing_skills = db.Column(db.JSON)
+    category_scores = db.Column(db.JSON)
+    result_html = db.Column(db.Text)
+
+    # Har section ka fingerprint, taaki agla revision sirf badle sections bheje
+    section_hashes = db.Column(db.JSON(none_as_null=True))
+    revision_of_id = db.Column(db.Integer, db.ForeignKey('analysis_history.id'))
     
     # User model se link karne ke liye Foreign key
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    @property
+    def html(self):
+        """Pre-rendered result HTML, rendered on the fly for rows not yet backfilled."""
+        if self.result_html is None:
+            from utils import format_for_web
+            return format_for_web(self.result)
+        return self.result_html
+
+    def __repr__(self):
+        return f"<ResumeAnalysis {self.id} for job {self.job_role}>"
+
+class AnalysisCacheEntry(db.Model):
+    """
+    Cached LLM analysis, keyed on resume text hash + job role + prompt version.
+    """
+    __tablename__ = 'analysis_cache'
+    key = db.Column(db.String(64), primary_key=True)
+    job_role = db.Column(db.String(100))
+    prompt_version = db.Column(db.String(20))
+    result = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, index=True)
+
+    def __repr__(self):
+        return f"<AnalysisCacheEntry {self.key[:12]} for job {self.job_role}>"
+
+
+class EmailOutbox(db.Model):
+    """
+    Bhejne ke liye queue kiya gaya email. Background sender isse uthata hai
+    aur delivery status yahin update karta hai.
+    """
+    __tablename__ = 'email_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(150), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    attachment = db.Column(db.LargeBinary)
+    attachment_name = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis_history.id'), index=True)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} to {self.recipient} ({self.status})>"
+
+
+class ServerSession(db.Model):
+    """
+    Server-side Flask session. Cookie me sirf id jaati hai, data yahan rehta hai.
+    """
+    __tablename__ = 'server_sessions'
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ServerSession {self.id[:8]} v{self.version}>"
+
+
+class GeneratedResume(db.Model):
+    """
+    Resume builder ya AI builder se bana resume, taaki PDF download isse
+    row se padh sake.
+    """
+    __tablename__ = 'generated_resumes'
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.JSON, nullable=False)
+    ai_generated = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+
     def __repr__(self):
-        return f"<ResumeAnalysis {self.id} for job {self.job_role}>"
\ No newline at end of file
+        return f"<GeneratedResume {self.id} for user {self.user_id}>"
@@ -0,0 +1,106 @@
+"""
+Disk cache for rendered analysis report PDFs.
+
+Files are keyed by analysis_key() and REPORT_TEMPLATE_VERSION, so repeat
+downloads and emails of the same analysis skip the template render and
+ReportLab layout. The id alone is not enough: SQLite can hand a deleted
+analysis's id to a new row, and the directory outlives a DATABASE_URL
+change, so the key also hashes the owner, creation time and report
+content. The directory is size-bounded: once it grows past max_bytes the
+least recently used files are evicted.
+"""
+import hashlib
+import io
+import os
+import threading
+
+import metrics
+
+# Bump whenever report.html or utils.generate_pdf output changes
+REPORT_TEMPLATE_VERSION = "1"
+
+
+def analysis_key(analysis_id, created_at, *content):
+    """Cache key for one analysis: its id plus a hash of when it was created and what the report shows."""
+    digest = hashlib.sha256()
+    for part in (created_at.isoformat() if created_at else "", *content):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return f"{analysis_id}-{digest.hexdigest()[:16]}"
+
+
+class PDFCache:
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024, version=REPORT_TEMPLATE_VERSION):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"analysis-{key}-v{self.version}.pdf")
+
+    def get(self, key):
+        """Returns the cached PDF as a BytesIO, or None."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            metrics.cache_requests.inc(cache="pdf", result="miss")
+            return None
+        # mtime doubles as the last-used time for eviction
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        metrics.cache_requests.inc(cache="pdf", result="hit")
+        return io.BytesIO(data)
+
+    def put(self, key, pdf):
+        """Stores a rendered PDF (BytesIO) and evicts old files if needed."""
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf.getvalue())
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_or_render(self, key, render):
+        """Returns the cached PDF, calling render() and caching its result on a miss."""
+        pdf = self.get(key)
+        if pdf is not None:
+            return pdf
+        pdf = render()
+        if pdf is not None:
+            try:
+                self.put(key, pdf)
+            except OSError as e:
+                print(f"Error caching PDF: {e}")
+            pdf.seek(0)
+        return pdf
+
+    def evict(self):
+        """Deletes least recently used PDFs until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0}
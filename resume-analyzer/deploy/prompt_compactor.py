@@ -0,0 +1,235 @@
+"""
+Shrinks extracted resume text before it is pasted into an LLM prompt.
+
+PDF extraction repeats page headers, footers and page numbers on every page
+and leaves long whitespace runs. resume_parser.extract_text separates pages
+with a form feed, so compact_resume can look at the top and bottom of each
+page and remove that furniture without touching lines that just happen to
+repeat in the body (a job title held at three employers). It then
+normalizes whitespace, splits the text into sections (experience, skills,
+education, ...) and, if it is still over the token budget, keeps whole
+sections in priority order and truncates the most important one left over.
+Tokens are estimated at ~4 characters each, which is close enough for
+budgeting and needs no tokenizer.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 3000))
+
+# Canonical section -> heading phrases that start it
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me", "about"],
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "internships", "internship"],
+    "skills": ["skills", "technical skills", "key skills", "core skills", "core competencies",
+               "competencies", "technologies", "tech stack", "tools"],
+    "projects": ["projects", "personal projects", "academic projects", "key projects"],
+    "education": ["education", "academic background", "academics", "qualifications", "academic qualifications"],
+    "certifications": ["certifications", "certificates", "licenses", "licenses and certifications", "courses"],
+    "achievements": ["achievements", "awards", "honors", "honours", "accomplishments", "awards and achievements"],
+    "publications": ["publications", "research", "papers"],
+    "volunteer": ["volunteer", "volunteering", "volunteer experience", "extracurricular activities", "activities"],
+    "languages": ["languages"],
+    "interests": ["interests", "hobbies", "hobbies and interests"],
+    "references": ["references"],
+}
+
+# Kept first when the budget is tight; "header" is the contact block before any heading
+DEFAULT_PRIORITY = ["header", "summary", "experience", "skills", "projects", "education", "certifications",
+                    "achievements", "publications", "volunteer", "languages", "interests", "references"]
+PRIORITY = [name.strip() for name in os.getenv("PROMPT_SECTION_PRIORITY", ",".join(DEFAULT_PRIORITY)).split(",") if name.strip()]
+
+_HEADING_LOOKUP = {phrase: section for section, phrases in SECTION_HEADINGS.items() for phrase in phrases}
+_HEADING_RE = re.compile(r"^[\W_]*([A-Za-z][A-Za-z &/]{1,40}?)[\s:\-–—]*$")
+_PAGE_NUMBER_RE = re.compile(r"^(?:page\s*)?[-–—(]?\s*\d{1,3}\s*(?:(?:of|/)\s*\d{1,3})?\s*[-–—)]?$", re.IGNORECASE)
+_BOILERPLATE_RE = re.compile(r"^references?\s+(?:are\s+)?(?:available\s+)?(?:up)?on\s+request\.?$", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^[•●▪■◦‣∙·*]\s*")
+_SPACES_RE = re.compile(r"[ \t\u00a0\u2000-\u200b]+")
+
+PAGE_BREAK = "\f"
+# A short line this close to the top or bottom of this many pages is a running header/footer
+FURNITURE_EDGE_LINES = 2
+FURNITURE_MIN_PAGES = 2
+FURNITURE_MAX_CHARS = 80
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+
+def normalize_lines(text):
+    """Normalizes whitespace and bullet glyphs; returns the non-empty lines."""
+    lines = []
+    for line in (text or "").splitlines():
+        line = _SPACES_RE.sub(" ", line).strip()
+        if line:
+            lines.append(_BULLET_RE.sub("- ", line))
+    return lines
+
+
+def normalize_pages(text):
+    """
+    Returns the normalized lines of each page. `text` is extracted text with
+    pages separated by PAGE_BREAK, or a list of page texts.
+    """
+    pages = text.split(PAGE_BREAK) if isinstance(text, str) else text
+    return [normalize_lines(page) for page in pages or [""]]
+
+
+def _edge(lines, index):
+    """"top" or "bottom" when the line is close to that edge of its page, else None."""
+    if index < FURNITURE_EDGE_LINES:
+        return "top"
+    if index >= len(lines) - FURNITURE_EDGE_LINES:
+        return "bottom"
+    return None
+
+
+def remove_furniture(pages):
+    """
+    Drops page numbers at the top or bottom of a page and boilerplate, keeps
+    only the first copy of short lines that sit at the top (or bottom) of
+    several pages (running headers/footers), and removes consecutive
+    duplicate lines. `pages` is a list of each page's lines; returns the
+    remaining lines of all pages.
+    """
+    counts = Counter()
+    for lines in pages:
+        counts.update({(_edge(lines, i), line.casefold()) for i, line in enumerate(lines)
+                       if _edge(lines, i) and len(line) <= FURNITURE_MAX_CHARS})
+    seen = set()
+    kept = []
+    for lines in pages:
+        for i, line in enumerate(lines):
+            key = line.casefold()
+            edge = _edge(lines, i)
+            if (edge and _PAGE_NUMBER_RE.match(line)) or _BOILERPLATE_RE.match(line):
+                continue
+            if edge and counts[edge, key] >= FURNITURE_MIN_PAGES and section_for_heading(line) is None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            if kept and kept[-1].casefold() == key:
+                continue
+            kept.append(line)
+    return kept
+
+
+def section_for_heading(line):
+    """Returns the canonical section a heading line starts, or None."""
+    match = _HEADING_RE.match(line)
+    if not match:
+        return None
+    return _HEADING_LOOKUP.get(re.sub(r"\s+", " ", match.group(1)).strip().casefold())
+
+
+def split_sections(lines):
+    """
+    Returns [(section, lines)] in document order. Repeated sections are
+    merged into the first, and headings left with no content are dropped.
+    """
+    sections = {"header": []}
+    order = ["header"]
+    current = "header"
+    for line in lines:
+        section = section_for_heading(line)
+        if section:
+            current = section
+            if section not in sections:
+                sections[section] = []
+                order.append(section)
+            sections[section].append(line)
+            continue
+        sections[current].append(line)
+    return [(name, sections[name]) for name in order if len(sections[name]) > (name != "header")]
+
+
+def fit_to_budget(sections, budget, priority=None):
+    """
+    Keeps whole sections in priority order while they fit, then spends what
+    is left on the highest-priority section that did not fit, truncated at a
+    line boundary. Returns (kept sections in document order, truncated
+    section, dropped sections).
+    """
+    priority = priority or PRIORITY
+    rank = {name: i for i, name in enumerate(priority)}
+    by_priority = sorted(range(len(sections)), key=lambda i: (rank.get(sections[i][0], len(priority)), i))
+
+    remaining = budget
+    kept, skipped = {}, []
+    for i in by_priority:
+        tokens = estimate_tokens("\n".join(sections[i][1])) + 1
+        if tokens <= remaining:
+            kept[i] = sections[i][1]
+            remaining -= tokens
+        else:
+            skipped.append(i)
+
+    truncated = None
+    if skipped:
+        partial = []
+        for line in sections[skipped[0]][1]:
+            cost = estimate_tokens(line) + 1
+            if cost > remaining - 2:
+                break
+            partial.append(line)
+            remaining -= cost
+        # A lone heading line is not worth keeping
+        if len(partial) > 1:
+            truncated = sections[skipped[0]][0]
+            kept[skipped.pop(0)] = partial + ["[...]"]
+    dropped = [sections[i][0] for i in skipped]
+    return [(sections[i][0], kept[i]) for i in sorted(kept)], truncated, dropped
+
+
+def compact_resume(text, budget=None):
+    """
+    Compacts resume text (pages separated by PAGE_BREAK, or a list of page
+    texts) for a prompt. Returns a dict with the compacted
+    text, token estimates before and after, the reduction ratio, and which
+    sections were truncated or dropped to meet the budget.
+    """
+    budget = budget or TOKEN_BUDGET
+    original_tokens = estimate_tokens(text if isinstance(text, str) else PAGE_BREAK.join(text or []))
+    sections = split_sections(remove_furniture(normalize_pages(text)))
+    kept, truncated, dropped = fit_to_budget(sections, budget)
+    compacted = "\n\n".join("\n".join(lines) for _, lines in kept)
+    compacted_tokens = estimate_tokens(compacted)
+    return {
+        "text": compacted,
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "reduction": round(1 - compacted_tokens / original_tokens, 4) if original_tokens else 0.0,
+        "sections": [name for name, _ in kept],
+        "truncated": truncated,
+        "dropped": dropped,
+    }
+
+
+_totals = {"requests": 0, "original_tokens": 0, "compacted_tokens": 0, "truncated": 0}
+_totals_lock = threading.Lock()
+
+
+def record(result):
+    """Adds one compaction to the running totals and logs its reduction."""
+    with _totals_lock:
+        _totals["requests"] += 1
+        _totals["original_tokens"] += result["original_tokens"]
+        _totals["compacted_tokens"] += result["compacted_tokens"]
+        _totals["truncated"] += bool(result["truncated"] or result["dropped"])
+    print(f"Prompt compaction: {result['original_tokens']} -> {result['compacted_tokens']} tokens "
+          f"({result['reduction']:.0%} smaller)")
+
+
+def stats():
+    with _totals_lock:
+        totals = dict(_totals)
+    original = totals["original_tokens"]
+    totals["reduction"] = round(1 - totals["compacted_tokens"] / original, 4) if original else 0.0
+    totals["budget"] = TOKEN_BUDGET
+    return totals
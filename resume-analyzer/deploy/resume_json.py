@@ -0,0 +1,278 @@
+"""
+Tolerant JSON parsing and schema validation for AI-generated resumes.
+
+JSONRepairParser is fed the model output chunk by chunk as it streams in. It
+skips prose and ```json fences around the object, stops at the end of the
+first top-level object, and fixes the defects LLMs commonly produce:
+trailing commas, missing commas, raw newlines inside strings, Python
+literals, and output cut off mid-object. validate_resume then checks the
+result against RESUME_SCHEMA, coerces near-misses into shape, and reports
+the fields that are still missing. Those, plus the field that was being
+written when the output was cut off, are all that need to be asked for again.
+"""
+import json
+
+# Top-level resume fields and the shape each must have
+RESUME_SCHEMA = {
+    "name": str,
+    "email": str,
+    "phone": str,
+    "job_role": str,
+    "summary": str,
+    "skills": {str: [str]},
+    "experience": [{"title": str, "company": str, "dates": str, "achievements": [str]}],
+    "education": [{"degree": str, "institution": str, "year": str}],
+}
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+class JSONRepairParser:
+    """Single-pass, incremental JSON repairer. Call feed() per chunk, then close()."""
+
+    def __init__(self):
+        self.out = []
+        self.stack = []
+        self.started = False
+        self.done = False
+        self.in_string = False
+        self.string_is_key = False
+        self.expect_key = False
+        self.escape = False
+        self.after_value = False
+        self.pending_comma = False
+        self.word = ""
+        self.repairs = []
+        # Top-level key being written when the output was cut off
+        self.truncated_field = None
+        self._key = None
+        self._key_start = 0
+        # (output length, open brackets) after each complete value, for truncated input
+        self._safe = None
+
+    def _note(self, repair):
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def _mark_safe(self):
+        if self.stack:
+            self._safe = (len(self.out), tuple(self.stack))
+
+    def _flush_word(self):
+        if not self.word:
+            return
+        word = self.word
+        self.word = ""
+        if word in _LITERALS:
+            self._note("python_literal")
+            word = _LITERALS[word]
+        self.out.append(word)
+        self._end_value()
+
+    def _end_value(self):
+        self.after_value = True
+        if len(self.stack) == 1:
+            self._key = None
+        self._mark_safe()
+
+    def _emit_comma(self):
+        if self.pending_comma:
+            self.out.append(",")
+            self.pending_comma = False
+
+    def _start_value(self):
+        """Called before any value or key begins."""
+        if self.after_value:
+            self._note("missing_comma")
+            self.out.append(",")
+            self.after_value = False
+            self.expect_key = self.stack[-1] == "}"
+        self._emit_comma()
+
+    def feed(self, chunk):
+        """Consumes a chunk of model output. Returns True once the object is complete."""
+        for char in chunk:
+            if self.done:
+                break
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self.stack.append("}")
+                    self.out.append("{")
+                    self.expect_key = True
+                    self._mark_safe()
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                    self.out.append(char)
+                elif char == "\\":
+                    self.escape = True
+                    self.out.append(char)
+                elif char == '"':
+                    self.in_string = False
+                    self.out.append(char)
+                    if not self.string_is_key:
+                        self._end_value()
+                    elif len(self.stack) == 1:
+                        self._key = json.loads("".join(self.out[self._key_start:]))
+                elif char in "\n\r\t":
+                    self._note("raw_control_char")
+                    self.out.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char])
+                else:
+                    self.out.append(char)
+                continue
+
+            if char.isalnum() or char in "+-.":
+                if not self.word:
+                    self._start_value()
+                self.word += char
+                continue
+            self._flush_word()
+
+            if char.isspace():
+                continue
+            if char == '"':
+                self._start_value()
+                self.in_string = True
+                self.string_is_key = self.expect_key
+                self._key_start = len(self.out)
+                self.out.append(char)
+            elif char in "{[":
+                self._start_value()
+                self.stack.append("}" if char == "{" else "]")
+                self.expect_key = char == "{"
+                self.out.append(char)
+                self._mark_safe()
+            elif char in "}]":
+                if self.pending_comma:
+                    self._note("trailing_comma")
+                    self.pending_comma = False
+                if not self.stack:
+                    continue
+                self.out.append(self.stack.pop())
+                self._end_value()
+                if not self.stack:
+                    self.done = True
+            elif char == ",":
+                if self.pending_comma:
+                    self._note("trailing_comma")
+                self.pending_comma = self.after_value
+                self.after_value = False
+                self.expect_key = bool(self.stack) and self.stack[-1] == "}"
+            elif char == ":":
+                self.after_value = False
+                self.expect_key = False
+                self.out.append(char)
+            else:
+                self._note("stray_character")
+        return self.done
+
+    def close(self):
+        """
+        Finishes parsing and returns the repaired object, or None when no
+        object could be recovered.
+        """
+        if not self.started:
+            return None
+        if self.done:
+            return self._loads("".join(self.out))
+
+        self._note("truncated")
+        self.truncated_field = self._key
+        if not self.in_string:
+            self._flush_word()
+        # First try closing everything where the output stopped
+        tail = '"' if self.in_string else ""
+        attempt = "".join(self.out) + tail + "".join(reversed(self.stack))
+        data = self._loads(attempt)
+        if data is not None or self._safe is None:
+            return data
+        # Otherwise drop the incomplete key or value after the last complete one
+        length, stack = self._safe
+        return self._loads("".join(self.out[:length]) + "".join(reversed(stack)))
+
+    @staticmethod
+    def _loads(text):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_text(item) for item in value)
+    return str(value).strip()
+
+
+def _text_list(value):
+    if isinstance(value, str):
+        value = [line.strip(" -•*\t") for line in value.replace(";", "\n").splitlines()]
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [_text(item) for item in value if _text(item)]
+
+
+def _records(value, fields):
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    records = []
+    for item in value:
+        if not isinstance(item, dict):
+            continue
+        record = {}
+        for field, kind in fields.items():
+            record[field] = _text_list(item.get(field)) if isinstance(kind, list) else _text(item.get(field))
+        if any(record.values()):
+            records.append(record)
+    return records
+
+
+def validate_resume(data):
+    """
+    Coerces parsed output into RESUME_SCHEMA. Returns (resume, coerced, missing):
+    the cleaned dict, the fields that had to be reshaped, and the generated
+    fields that are absent or unusable.
+    """
+    data = data if isinstance(data, dict) else {}
+    resume, coerced, missing = {}, [], []
+
+    for field in ("name", "email", "phone", "job_role", "summary"):
+        value = data.get(field)
+        resume[field] = _text(value)
+        if value is not None and not isinstance(value, str):
+            coerced.append(field)
+    if not resume["summary"]:
+        missing.append("summary")
+
+    skills = data.get("skills")
+    if isinstance(skills, dict):
+        resume["skills"] = {str(category): _text_list(items) for category, items in skills.items() if _text_list(items)}
+        if any(not isinstance(items, list) for items in skills.values()):
+            coerced.append("skills")
+    elif isinstance(skills, (list, str)):
+        resume["skills"] = {"Technical": _text_list(skills.split(",") if isinstance(skills, str) else skills)}
+        coerced.append("skills")
+    else:
+        resume["skills"] = {}
+    if not resume["skills"]:
+        missing.append("skills")
+
+    for field in ("experience", "education"):
+        value = data.get(field)
+        records = _records(value, RESUME_SCHEMA[field][0])
+        if records is None or (not records and value):
+            missing.append(field)
+            records = []
+        elif not isinstance(value, list) or len(records) != len(value):
+            coerced.append(field)
+        resume[field] = records
+
+    return resume, coerced, missing
@@ -1,27 +1,257 @@
-import PyPDF2
-import docx
 import io
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.parsers import expat
 
-def extract_text(file):
+# Uploads bigger than this are spooled to a temp file instead of kept in memory
+SPOOL_MEMORY_BYTES = 1024 * 1024
+COPY_CHUNK_BYTES = 64 * 1024
+
+# Limits that bound extraction latency on huge or malicious uploads
+MAX_RESUME_BYTES = int(os.getenv("MAX_RESUME_BYTES", 10 * 1024 * 1024))
+MAX_RESUME_PAGES = int(os.getenv("MAX_RESUME_PAGES", 50))
+
+# PDFs with at least this many pages are split across the worker pool
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGES", 8))
+PDF_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Uncompressed XML read from one DOCX, so a zip bomb cannot run away
+MAX_DOCX_XML_BYTES = int(os.getenv("MAX_DOCX_XML_BYTES", 50 * 1024 * 1024))
+DOCX_READ_BYTES = 64 * 1024
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main "
+MC_FALLBACK = "http://schemas.openxmlformats.org/markup-compatibility/2006 Fallback"
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds MAX_RESUME_BYTES."""
+
+
+def process_context():
     """
-    Extracts text from a file (PDF or DOCX).
+    Start method for extraction pools. The server is multithreaded, and a
+    forked child inherits any lock another thread held at that moment
+    (SQLAlchemy's pool, the metrics flusher, logging), so pool workers come
+    from a forkserver, or are spawned where that is unavailable.
     """
-    filename = file.filename
+    import multiprocessing
+
+    return multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+def _get_pool():
+    """Returns the per-process page extraction pool, creating it after a fork."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=process_context())
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def spool_upload(file, max_bytes=None):
+    """
+    Copies an upload into a SpooledTemporaryFile in fixed-size chunks, so
+    large files go to disk instead of a full in-memory copy.
+    """
+    max_bytes = max_bytes or MAX_RESUME_BYTES
+    stream = getattr(file, "stream", file)
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    copied = 0
+    while True:
+        chunk = stream.read(COPY_CHUNK_BYTES)
+        if not chunk:
+            break
+        copied += len(chunk)
+        if copied > max_bytes:
+            spooled.close()
+            raise UploadTooLarge(f"File is larger than {max_bytes // (1024 * 1024)} MB.")
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def _extract_page_range(path, start, stop):
+    """Pool entry point: extracts pages [start, stop) from the PDF at path."""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def extract_pdf_pages(stream, max_pages=None, workers=None):
+    """
+    Returns the text of each PDF page as a list. Long documents are split
+    into page ranges that are extracted in parallel.
+    """
+    import PyPDF2
+
+    max_pages = max_pages or MAX_RESUME_PAGES
+    workers = workers or PDF_WORKERS
+    reader = PyPDF2.PdfReader(stream)
+    page_count = min(len(reader.pages), max_pages)
+    if workers <= 1 or page_count < PARALLEL_PAGE_THRESHOLD:
+        return [reader.pages[i].extract_text() or "" for i in range(page_count)]
+
+    # Pool workers open the PDF themselves, so it needs a real path on disk
+    stream.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf_file:
+        shutil.copyfileobj(stream, pdf_file)
     try:
-        if filename.endswith(".pdf"):
-            # For PDF files, we read the content into a BytesIO object
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
-        elif filename.endswith(".docx"):
-            # For DOCX files, we can directly read the file
-            doc = docx.Document(file)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            return text
+        step = -(-page_count // workers)
+        starts = range(0, page_count, step)
+        stops = [min(start + step, page_count) for start in starts]
+        chunks = _get_pool().map(_extract_page_range, [pdf_file.name] * len(starts), starts, stops)
+        return [text for chunk in chunks for text in chunk]
+    finally:
+        os.remove(pdf_file.name)
+
+
+class _DocxTextParser:
+    """
+    Streams one WordprocessingML part through expat and collects paragraph
+    texts in document order. Nothing but the open paragraphs is kept, so
+    memory does not grow with the document. Table cells and text boxes are
+    ordinary paragraphs here; a text box's paragraphs come out before the
+    paragraph that anchors it.
+    """
+
+    def __init__(self):
+        self.paragraphs = []
+        self._open = []  # text pieces of each open paragraph, innermost last
+        self._in_text = False
+        self._skip_depth = 0  # > 0 inside mc:Fallback, which repeats the text box content
+        self._parser = expat.ParserCreate(namespace_separator=" ")
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._text
+        self._parser.StartDoctypeDeclHandler = self._doctype
+
+    def _doctype(self, *args):
+        raise ValueError("DOCX parts must not declare a DTD.")
+
+    def _start(self, name, attrs):
+        if self._skip_depth:
+            self._skip_depth += 1
+        elif name == MC_FALLBACK:
+            self._skip_depth = 1
+        elif not name.startswith(W_NS):
+            return
         else:
-            return "Error: Unsupported file type. Please upload a PDF or DOCX file."
+            tag = name[len(W_NS):]
+            if tag == "p":
+                self._open.append([])
+            elif not self._open:
+                return
+            elif tag == "t":
+                self._in_text = True
+            elif tag in ("tab", "ptab"):
+                self._open[-1].append("\t")
+            elif tag in ("br", "cr"):
+                self._open[-1].append("\n")
+            elif tag == "noBreakHyphen":
+                self._open[-1].append("-")
+
+    def _end(self, name):
+        if self._skip_depth:
+            self._skip_depth -= 1
+        elif name == W_NS + "t":
+            self._in_text = False
+        elif name == W_NS + "p" and self._open:
+            self.paragraphs.append("".join(self._open.pop()))
+
+    def _text(self, data):
+        if self._in_text and not self._skip_depth and self._open:
+            self._open[-1].append(data)
+
+    def feed(self, stream):
+        read = 0
+        while True:
+            chunk = stream.read(DOCX_READ_BYTES)
+            read += len(chunk)
+            if read > MAX_DOCX_XML_BYTES:
+                raise UploadTooLarge("Document is too large to process.")
+            self._parser.Parse(chunk, not chunk)
+            if not chunk:
+                return self.paragraphs
+
+
+def _docx_part_text(archive, name):
+    with archive.open(name) as stream:
+        return "\n".join(_DocxTextParser().feed(stream))
+
+
+def _part_number(name):
+    digits = "".join(ch for ch in os.path.basename(name) if ch.isdigit())
+    return int(digits or 0)
+
+
+def extract_docx_text(stream):
+    """
+    Returns the text of a DOCX file: headers, then the body (paragraphs,
+    tables and text boxes in document order), then footers. The XML parts
+    are parsed straight from the zip, without building python-docx's
+    object model. Headers and footers that repeat across sections are
+    included once.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        names = archive.namelist()
+        if "word/document.xml" not in names:
+            raise ValueError("Not a Word document.")
+        headers = sorted((n for n in names if n.startswith("word/header") and n.endswith(".xml")), key=_part_number)
+        footers = sorted((n for n in names if n.startswith("word/footer") and n.endswith(".xml")), key=_part_number)
+        parts = []
+        for name in headers + ["word/document.xml"] + footers:
+            text = _docx_part_text(archive, name)
+            if name == "word/document.xml" or (text.strip() and text not in parts):
+                parts.append(text)
+        return "\n".join(parts)
+
+
+def extract_pages(file, workers=None):
+    """
+    Extracts a list of page texts from a PDF or DOCX upload (DOCX files are
+    returned as a single page). Raises on unsupported or unreadable files.
+    """
+    filename = file.filename
+    if filename.endswith(".pdf"):
+        with spool_upload(file) as stream:
+            return extract_pdf_pages(stream, workers=workers)
+    elif filename.endswith(".docx"):
+        with spool_upload(file) as stream:
+            return [extract_docx_text(stream)]
+    raise ValueError("Unsupported file type. Please upload a PDF or DOCX file.")
+
+
+def extract_file_bytes(item):
+    """Process-pool entry point: extracts text from one (filename, bytes) pair, its pages serially."""
+    from werkzeug.datastructures import FileStorage
+
+    filename, data = item
+    return filename, extract_text(FileStorage(stream=io.BytesIO(data), filename=filename), workers=1)
+
+
+def extract_text(file, workers=None):
+    """
+    Extracts text from a file (PDF or DOCX). PDF pages are separated by a
+    form feed, which prompt_compactor uses to find page headers and footers.
+    """
+    filename = file.filename
+    if not filename.endswith((".pdf", ".docx")):
+        return "Error: Unsupported file type. Please upload a PDF or DOCX file."
+    try:
+        return "\f".join(extract_pages(file, workers=workers))
+    except UploadTooLarge as e:
+        return f"Error: {e}"
     except Exception as e:
         print(f"Error extracting text from {filename}: {e}")
-        return f"Error processing file: {e}"
\ No newline at end of file
+        return f"Error processing file: {e}"
@@ -0,0 +1,170 @@
+"""
+Renders a builder resume (the dict stored in GeneratedResume.data) straight
+to PDF with ReportLab flowables.
+
+Both the manual builder and the AI builder are handled: skills as a list, a
+comma-separated string or {category: [skills]}, and experience/education as
+free text or lists of records.
+
+Resume text is escaped and laid out with Paragraph, so long unbroken
+tokens such as URLs wrap at the margin. The ParagraphStyles are built once
+at import and use the standard PDF fonts, so no font files are loaded or
+embedded. ReportLab is imported with this module, so app.py imports it
+inside the download route.
+"""
+import io
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+from reportlab.platypus.flowables import HRFlowable
+
+ACCENT = "#2c3e50"
+MUTED = "#5d6d7e"
+
+_base = ParagraphStyle("ResumeBody", fontName="Helvetica", fontSize=10, leading=13.5)
+STYLES = {
+    "name": ParagraphStyle("ResumeName", _base, fontName="Helvetica-Bold", fontSize=22, leading=26,
+                           alignment=TA_CENTER, textColor=colors.HexColor(ACCENT)),
+    "role": ParagraphStyle("ResumeRole", _base, fontSize=12, leading=16, alignment=TA_CENTER,
+                           textColor=colors.HexColor(MUTED)),
+    "contact": ParagraphStyle("ResumeContact", _base, alignment=TA_CENTER, spaceAfter=6),
+    "heading": ParagraphStyle("ResumeHeading", _base, fontName="Helvetica-Bold", fontSize=12, leading=15,
+                              textColor=colors.HexColor(ACCENT), spaceBefore=12, spaceAfter=2, keepWithNext=1),
+    "entry": ParagraphStyle("ResumeEntry", _base, fontName="Helvetica-Bold", spaceBefore=6, keepWithNext=1),
+    "meta": ParagraphStyle("ResumeMeta", _base, fontName="Helvetica-Oblique", textColor=colors.HexColor(MUTED),
+                           keepWithNext=1),
+    "body": ParagraphStyle("ResumeText", _base, spaceAfter=3),
+    "bullet": ParagraphStyle("ResumeBullet", _base, leftIndent=14, bulletIndent=4, spaceAfter=1),
+}
+
+
+def text_block(text, style, lead=None, bullet=None):
+    """A Paragraph of plain text. `lead` is drawn in bold before it (e.g. a skill category)."""
+    markup = escape(text)
+    if lead:
+        markup = f"<b>{escape(lead)}</b> {markup}"
+    return Paragraph(markup, style, bulletText=bullet)
+
+
+def bullet_list(items, style):
+    return [text_block(item, style, bullet="•") for item in items]
+
+
+def _text(value):
+    return str(value).strip() if value else ""
+
+
+def _lines(value):
+    """Splits free text into its non-empty lines, without leading bullet marks."""
+    return [line.strip(" -•*\t") for line in str(value).splitlines() if line.strip(" -•*\t")]
+
+
+def _join(*parts, sep=" | "):
+    return sep.join(_text(part) for part in parts if part and str(part).strip())
+
+
+def _skills(skills):
+    """Returns [(category or None, [skills])] for any of the stored shapes."""
+    if isinstance(skills, dict):
+        return [(category, items if isinstance(items, list) else [items]) for category, items in skills.items() if items]
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    return [(None, [skill for skill in skills or [] if skill and str(skill).strip()])]
+
+
+def build_story(resume):
+    """Returns the list of flowables for a resume dict."""
+    story = [text_block(_text(resume.get("name")) or "Resume", STYLES["name"])]
+    if resume.get("job_role"):
+        story.append(text_block(_text(resume["job_role"]), STYLES["role"]))
+    contact = _join(resume.get("email"), resume.get("phone"))
+    if contact:
+        story.append(text_block(contact, STYLES["contact"]))
+    story.append(HRFlowable(width="100%", thickness=1.2, color=colors.HexColor(ACCENT), spaceAfter=4))
+
+    def heading(title):
+        story.append(text_block(title, STYLES["heading"]))
+        story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor(MUTED), spaceAfter=4))
+
+    def free_text(value):
+        for line in _lines(value):
+            story.append(text_block(line, STYLES["body"]))
+
+    if resume.get("summary"):
+        heading("Professional Summary")
+        free_text(resume["summary"])
+
+    skill_groups = [(category, items) for category, items in _skills(resume.get("skills")) if items]
+    if skill_groups:
+        heading("Skills")
+        for category, items in skill_groups:
+            story.append(text_block(", ".join(_text(item) for item in items), STYLES["body"],
+                                   lead=f"{_text(category)}:" if category else None))
+
+    experience = resume.get("experience")
+    if experience:
+        heading("Work Experience")
+        if isinstance(experience, str):
+            free_text(experience)
+        else:
+            for job in experience:
+                if not isinstance(job, dict):
+                    free_text(job)
+                    continue
+                title = " at ".join(_text(part) for part in (job.get("title"), job.get("company")) if part)
+                if title:
+                    story.append(text_block(title, STYLES["entry"]))
+                meta = _join(job.get("dates"), job.get("location"))
+                if meta:
+                    story.append(text_block(meta, STYLES["meta"]))
+                achievements = job.get("achievements") or []
+                if isinstance(achievements, str):
+                    achievements = _lines(achievements)
+                achievements = [_text(achievement) for achievement in achievements if _text(achievement)]
+                if achievements:
+                    story.extend(bullet_list(achievements, STYLES["bullet"]))
+
+    education = resume.get("education")
+    if education:
+        heading("Education")
+        if isinstance(education, str):
+            free_text(education)
+        else:
+            for edu in education:
+                if not isinstance(edu, dict):
+                    free_text(edu)
+                    continue
+                if edu.get("degree"):
+                    story.append(text_block(_text(edu["degree"]), STYLES["entry"]))
+                meta = _join(edu.get("institution"), edu.get("year"))
+                if meta:
+                    story.append(text_block(meta, STYLES["meta"]))
+
+    for field, title in (("certifications", "Certifications"), ("achievements", "Achievements")):
+        value = resume.get(field)
+        if not value:
+            continue
+        heading(title)
+        items = value if isinstance(value, list) else _lines(value)
+        story.extend(bullet_list([_text(item) for item in items if _text(item)], STYLES["bullet"]))
+    return story
+
+
+def generate_resume_pdf(resume):
+    """Returns the resume as a PDF in a BytesIO, or None if rendering fails."""
+    try:
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, title=f"{resume.get('name') or 'Resume'} - Resume",
+                                leftMargin=0.75 * inch, rightMargin=0.75 * inch,
+                                topMargin=0.6 * inch, bottomMargin=0.6 * inch)
+        doc.build(build_story(resume))
+        buffer.seek(0)
+        return buffer
+    except Exception as e:
+        print(f"Error generating resume PDF: {e}")
+        return None
@@ -0,0 +1,137 @@
+"""
+Incremental re-analysis of resume revisions.
+
+Every analysis the model writes is saved with a fingerprint of each resume
+section, using the same section split as prompt_compactor. When the user
+uploads a resume for a role they already had analyzed, the new sections are
+compared with the latest fingerprinted analysis for that role. If enough of
+the text is unchanged (INCREMENTAL_MIN_REUSE, by characters), the model gets
+its previous analysis plus only the changed sections and returns an updated
+analysis in the usual format. A resume with no changed sections reuses the
+previous result without a model call.
+"""
+import hashlib
+import os
+import threading
+
+import metrics
+from models import ResumeAnalysis
+from prompt_compactor import normalize_pages, remove_furniture, split_sections, fit_to_budget, TOKEN_BUDGET
+
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "1") == "1"
+# Share of the new resume's text that must match the previous upload
+MIN_REUSE = float(os.getenv("INCREMENTAL_MIN_REUSE", 0.5))
+
+
+def fingerprint(text):
+    """Hash of a section's text, ignoring case and whitespace."""
+    return hashlib.sha256(" ".join(text.split()).casefold().encode("utf-8")).hexdigest()[:16]
+
+
+def resume_sections(resume_text):
+    """Returns [(section, lines)] in document order, as prompt_compactor splits them."""
+    return split_sections(remove_furniture(normalize_pages(resume_text)))
+
+
+class Revision:
+    """
+    How an upload compares with the user's previous analysis for the role.
+    `previous` is that ResumeAnalysis or None; `changed` holds the new or
+    edited sections as [(section, lines)] and `removed` the names of
+    sections that are gone.
+    """
+
+    def __init__(self, resume_text, previous=None):
+        self.sections = resume_sections(resume_text)
+        self.fingerprints = {name: fingerprint("\n".join(lines)) for name, lines in self.sections}
+        self.previous = previous
+        old = (previous.section_hashes or {}) if previous is not None else {}
+        self.changed = [(name, lines) for name, lines in self.sections if old.get(name) != self.fingerprints[name]]
+        self.removed = [name for name in old if name not in self.fingerprints]
+        self.total_chars = sum(len("\n".join(lines)) for _, lines in self.sections)
+        self.sent_chars = sum(len("\n".join(lines)) for _, lines in self.changed)
+
+    @property
+    def reused_chars(self):
+        return self.total_chars - self.sent_chars
+
+    @property
+    def outcome(self):
+        """"unchanged", "delta", or "full" when it is not a revision of the previous upload."""
+        if self.previous is None or not self.total_chars or self.reused_chars / self.total_chars < MIN_REUSE:
+            return "full"
+        return "delta" if self.changed or self.removed else "unchanged"
+
+    @property
+    def base_id(self):
+        """Id of the analysis this one revises, or None for a full analysis."""
+        return self.previous.id if self.outcome != "full" else None
+
+    def build_prompt(self, job_role):
+        """The update prompt: the previous analysis and the changed sections only."""
+        kept, truncated, dropped = fit_to_budget(self.changed, TOKEN_BUDGET)
+        changed = "\n\n".join("\n".join(lines) for _, lines in kept) or "(none)"
+        changed_names = {name for name, _ in self.changed}
+        unchanged = ", ".join(name for name, _ in self.sections if name not in changed_names) or "none"
+        removed = ", ".join(self.removed) or "none"
+        return f"""
+    As a senior HR reviewer and career coach at a top technology firm, you previously analyzed this candidate's resume for the job role of "{job_role}". The candidate has since revised it.
+
+    **Your Previous Analysis:**
+    {self.previous.result}
+
+    **Revised Sections (full new text):**
+    {changed}
+
+    **Removed Sections:** {removed}
+
+    **Unchanged Sections:** {unchanged}. These are already reflected in your previous analysis.
+
+    Update your analysis for the revised resume. Reply with the complete updated analysis using the same headings: **Resume Score:** (out of 100), **Strengths:**, **Areas for Improvement:** and **Missing Skills/Keywords:**. Change the score and points only where the revised or removed sections call for it, keep points about unchanged sections as they were, and drop suggestions the revision has already addressed.
+    """
+
+
+def previous_analysis(user_id, job_role):
+    """The user's latest fingerprinted analysis for the role, or None."""
+    if not INCREMENTAL_ANALYSIS or user_id is None:
+        return None
+    return (ResumeAnalysis.query
+            .filter(ResumeAnalysis.user_id == user_id, ResumeAnalysis.job_role == job_role,
+                    ResumeAnalysis.section_hashes.isnot(None))
+            .order_by(ResumeAnalysis.created_at.desc(), ResumeAnalysis.id.desc())
+            .first())
+
+
+def compare(resume_text, user_id, job_role):
+    """Returns the Revision of resume_text against the user's previous analysis for the role."""
+    return Revision(resume_text, previous_analysis(user_id, job_role))
+
+
+_totals = {"full": 0, "delta": 0, "unchanged": 0, "reused_chars": 0, "sent_chars": 0}
+_totals_lock = threading.Lock()
+
+
+def record(revision):
+    """Counts one analysis that reached the model stage, and how much of its text was reused."""
+    outcome = revision.outcome
+    reused = revision.reused_chars if outcome != "full" else 0
+    sent = revision.total_chars - reused
+    metrics.revision_analyses.inc(outcome=outcome)
+    metrics.revision_chars.inc(reused, kind="reused")
+    metrics.revision_chars.inc(sent, kind="sent")
+    with _totals_lock:
+        _totals[outcome] += 1
+        _totals["reused_chars"] += reused
+        _totals["sent_chars"] += sent
+    if outcome != "full":
+        print(f"Incremental analysis ({outcome}): reused {reused} of {revision.total_chars} chars, "
+              f"{len(revision.changed)} changed and {len(revision.removed)} removed sections")
+
+
+def stats():
+    with _totals_lock:
+        totals = dict(_totals)
+    text = totals["reused_chars"] + totals["sent_chars"]
+    totals["reuse"] = round(totals["reused_chars"] / text, 4) if text else 0.0
+    totals["enabled"] = INCREMENTAL_ANALYSIS
+    return totals
@@ -0,0 +1,126 @@
+"""
+Vectorized matching of many resumes against every role in job_roles_skills.json.
+
+Each resume is tokenized once into a row of skill counts. The N x V term matrix is
+then compared against the R x V role matrix in one pass, giving N x R coverage
+and TF-IDF cosine similarity without any LLM calls.
+
+Usage:
+    python role_matcher.py resumes.zip --top-k 3 --out matches.csv
+"""
+import argparse
+import csv
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from resume_parser import extract_file_bytes, process_context
+from skill_matcher import matcher as skill_matcher
+
+
+class RoleMatrix:
+    """Role x skill matrix plus the vectorized scoring built on it."""
+
+    def __init__(self, matcher=skill_matcher):
+        self.matcher = matcher
+        self.roles = list(matcher.role_skills)
+        self.vocabulary = sorted({skill for skills in matcher.role_skills.values() for skill in skills})
+        self.index = {skill: i for i, skill in enumerate(self.vocabulary)}
+
+        self.role_terms = np.zeros((len(self.roles), len(self.vocabulary)), dtype=np.float32)
+        for r, role in enumerate(self.roles):
+            for skill in matcher.role_skills[role]:
+                self.role_terms[r, self.index[skill]] = 1.0
+        self.role_sizes = self.role_terms.sum(axis=1)
+
+    def term_matrix(self, texts):
+        """Tokenizes each text once into an N x V matrix of skill mention counts."""
+        counts = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for skill, count in self.matcher.count_skills(text).items():
+                column = self.index.get(skill)
+                if column is not None:
+                    counts[row, column] = count
+        return counts
+
+    def coverage(self, counts):
+        """N x R fraction of each role's skills that each resume mentions."""
+        return ((counts > 0).astype(np.float32) @ self.role_terms.T) / self.role_sizes
+
+    def tfidf_similarity(self, counts):
+        """N x R cosine similarity between TF-IDF weighted resumes and roles."""
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log((1 + len(counts)) / (1 + document_frequency)) + 1
+        resumes = np.log1p(counts) * idf
+        roles = self.role_terms * idf
+        resumes /= np.maximum(np.linalg.norm(resumes, axis=1, keepdims=True), 1e-9)
+        roles /= np.maximum(np.linalg.norm(roles, axis=1, keepdims=True), 1e-9)
+        return resumes @ roles.T
+
+    def top_k(self, texts, k=3):
+        """
+        Returns, per text, the k best roles as dicts with coverage and
+        similarity, ranked by coverage with TF-IDF similarity as tie-breaker.
+        """
+        counts = self.term_matrix(texts)
+        coverage = self.coverage(counts)
+        similarity = self.tfidf_similarity(counts)
+        order = np.argsort(-(coverage + similarity * 1e-3), axis=1)[:, :k]
+        return [
+            [{
+                "role": self.roles[r],
+                "coverage": round(float(coverage[n, r]), 4),
+                "similarity": round(float(similarity[n, r]), 4),
+                "score": round(float(coverage[n, r]) * 100),
+            } for r in order[n]]
+            for n in range(len(texts))
+        ]
+
+
+role_matrix = RoleMatrix()
+
+
+def main(argv=None):
+    from bulk_screen import ArchiveRejected, MAX_RESUME_BYTES, collect_resumes
+
+    parser = argparse.ArgumentParser(description="Rank every job role for a ZIP or directory of resumes.")
+    parser.add_argument("source", help="Directory or .zip file of PDF/DOCX resumes")
+    parser.add_argument("--top-k", type=int, default=3, help="Roles to report per resume")
+    parser.add_argument("--out", help="Optional CSV report path")
+    parser.add_argument("--extract-workers", type=int, default=None, help="Text extraction processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    try:
+        resumes = collect_resumes(args.source)
+    except (ArchiveRejected, zipfile.BadZipFile) as e:
+        print(f"Cannot match {args.source}: {e}")
+        return 1
+    if not resumes:
+        print("No PDF or DOCX resumes found.")
+        return 1
+    for filename, _ in (item for item in resumes if item[1] is None):
+        print(f"Skipping {filename}: larger than {MAX_RESUME_BYTES // (1024 * 1024)} MB.")
+    readable = [item for item in resumes if item[1] is not None]
+    with ProcessPoolExecutor(max_workers=args.extract_workers, mp_context=process_context()) as pool:
+        extracted = [item for item in pool.map(extract_file_bytes, readable) if not item[1].startswith("Error")]
+
+    matches = role_matrix.top_k([text for _, text in extracted], k=args.top_k)
+    rows = []
+    for (filename, _), top in zip(extracted, matches):
+        print(f"{filename}: " + ", ".join(f"{m['role']} ({m['score']})" for m in top))
+        for rank, match in enumerate(top, start=1):
+            rows.append({"filename": filename, "rank": rank, **match})
+
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["filename", "rank", "role", "score", "coverage", "similarity"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
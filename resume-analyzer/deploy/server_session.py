@@ -0,0 +1,208 @@
+"""
+Server-side Flask sessions.
+
+The cookie carries only an opaque "<session id>.<version>" token; the session
+data lives in the server_sessions table, fronted by a small in-process LRU.
+The version is bumped on every write, so an LRU entry is only trusted while
+it matches the version in the cookie; otherwise the SQL row is authoritative.
+That keeps several gunicorn workers consistent without a shared cache.
+
+A session lives for `ttl` seconds after it was last used: requests that
+only read it push the expiry forward too, at most once per REFRESH_AFTER.
+Call rotate_session() when the user logs in or out, so a session id
+planted before login never becomes an authenticated one.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+# Expired rows are purged once every this many session writes
+PURGE_EVERY = 200
+# Reads extend a session's expiry at most this often
+REFRESH_AFTER = 3600
+
+
+class ServerSideSession(SecureCookieSession):
+    """Session dict that remembers which stored row it was loaded from."""
+
+    def __init__(self, initial=None, sid=None, version=0):
+        super().__init__(initial)
+        self.sid = sid
+        self.version = version
+        self.rotate = False
+
+
+def rotate_session(session):
+    """Saves the session under a new id and deletes the old row; a no-op for cookie sessions."""
+    if isinstance(session, ServerSideSession):
+        session.rotate = True
+        session.modified = True
+
+
+class SessionStore:
+    """In-process LRU tier in front of the server_sessions table."""
+
+    def __init__(self, max_entries=1024, ttl=7 * 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.serializer = TaggedJSONSerializer()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _remember(self, sid, version, payload, ttl=None):
+        with self._lock:
+            self._entries[sid] = (version, payload, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _forget(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def load(self, sid, version):
+        """Returns (data, version) for a session id, or (None, 0) if it is unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry and entry[0] == version and entry[2] > time.monotonic():
+                self._entries.move_to_end(sid)
+                return self.serializer.loads(entry[1]), version
+
+        from models import db, ServerSession
+        try:
+            row = db.session.get(ServerSession, sid)
+            if row is None or row.expires_at < datetime.utcnow():
+                self._forget(sid)
+                return None, 0
+            self._remember(sid, row.version, row.data, ttl=(row.expires_at - datetime.utcnow()).total_seconds())
+            return self.serializer.loads(row.data), row.version
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error loading session: {e}")
+            return None, 0
+
+    def save(self, sid, version, data):
+        payload = self.serializer.dumps(data)
+        self._remember(sid, version, payload)
+
+        from models import db, ServerSession
+        try:
+            db.session.merge(ServerSession(
+                id=sid,
+                data=payload,
+                version=version,
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl)
+            ))
+            db.session.commit()
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self.purge_expired()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving session: {e}")
+
+    def touch(self, sid):
+        """
+        Moves the expiry of a session that was used but not changed to `ttl`
+        from now, unless that was done less than REFRESH_AFTER ago. Returns
+        True when it was refreshed.
+        """
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None or entry[2] - time.monotonic() > self.ttl - REFRESH_AFTER:
+                return False
+            self._entries[sid] = (entry[0], entry[1], time.monotonic() + self.ttl)
+
+        from models import db, ServerSession
+        try:
+            (ServerSession.query.filter_by(id=sid)
+             .update({ServerSession.expires_at: datetime.utcnow() + timedelta(seconds=self.ttl)}))
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error refreshing session: {e}")
+            return False
+
+    def delete(self, sid):
+        self._forget(sid)
+
+        from models import db, ServerSession
+        try:
+            ServerSession.query.filter_by(id=sid).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error deleting session: {e}")
+
+    def purge_expired(self):
+        from models import db, ServerSession
+        ServerSession.query.filter(ServerSession.expires_at < datetime.utcnow()).delete()
+        db.session.commit()
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by SessionStore."""
+
+    session_class = ServerSideSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        token = request.cookies.get(self.get_cookie_name(app), "")
+        sid, _, version = token.rpartition(".")
+        if not sid or not version.isdigit():
+            return self.session_class()
+        data, version = self.store.load(sid, int(version))
+        if data is None:
+            return self.session_class()
+        return self.session_class(data, sid=sid, version=version)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if session.rotate and session.sid:
+            self.store.delete(session.sid)
+            session.sid, session.version = None, 0
+
+        if not session:
+            if session.modified:
+                if session.sid:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            # Only read: keep it alive, and a permanent cookie with it
+            if session.sid and self.store.touch(session.sid) and session.permanent:
+                self._set_cookie(app, response, session)
+            return
+
+        session.sid = session.sid or secrets.token_urlsafe(32)
+        session.version += 1
+        self.store.save(session.sid, session.version, dict(session))
+        self._set_cookie(app, response, session)
+
+    def _set_cookie(self, app, response, session):
+        response.set_cookie(
+            self.get_cookie_name(app),
+            f"{session.sid}.{session.version}",
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -0,0 +1,243 @@
+"""
+Local, deterministic keyword scoring against job_roles_skills.json.
+
+The role -> skills map is loaded once at import and compiled into a single
+regex, with aliases such as "k8s" mapped to their canonical skill. Scoring a
+resume is one regex pass, with no network call, so it can serve as an
+instant preview, as the fallback when the Gemini model is unavailable, and
+as a gate in front of the paid LLM call.
+"""
+import json
+import os
+import re
+
+SKILLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_roles_skills.json")
+
+# Alternative spellings that should count as the canonical skill
+ALIASES = {
+    "Kubernetes": ["k8s", "kube"],
+    "JavaScript": ["JS", "ECMAScript", "ES6"],
+    "TypeScript": ["TS"],
+    "Node.js": ["nodejs", "node js"],
+    "Vue.js": ["vue", "vuejs"],
+    "Next.js": ["nextjs"],
+    "Three.js": ["threejs"],
+    "Web3.js": ["web3"],
+    "PostgreSQL": ["postgres", "psql"],
+    "MongoDB": ["mongo"],
+    "Machine Learning": ["ML"],
+    "Natural Language Processing": ["NLP"],
+    "NLP": ["natural language processing"],
+    "LLMs": ["LLM", "large language model", "large language models"],
+    "Generative AI": ["GenAI", "gen ai"],
+    "Scikit-learn": ["sklearn", "scikit learn"],
+    "CI/CD": ["CICD", "CI-CD", "continuous integration", "continuous delivery", "continuous deployment"],
+    "AWS": ["amazon web services"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Azure": ["microsoft azure"],
+    "REST API": ["REST APIs", "RESTful API", "RESTful APIs", "RESTful"],
+    "REST APIs": ["REST API", "RESTful API", "RESTful APIs", "RESTful"],
+    "RESTful APIs": ["REST API", "REST APIs", "RESTful API", "RESTful"],
+    "Infrastructure as Code": ["IaC"],
+    "Shell Scripting": ["bash", "shell scripts", "shell script"],
+    "ELK Stack": ["ELK", "Elasticsearch", "Kibana", "Logstash"],
+    "Unit Testing": ["unit tests", "pytest", "JUnit"],
+    "A/B Testing": ["AB testing", "A/B tests", "split testing"],
+    "C/C++": ["C++"],
+    "C++": ["C/C++", "cpp"],
+    "SEO": ["search engine optimization"],
+    "SEM": ["search engine marketing"],
+    "PPC": ["pay per click", "pay-per-click"],
+    "UI/UX": ["UX", "user experience"],
+    "Data Visualization": ["data viz", "Tableau", "Power BI"],
+    "Big Data": ["Hadoop", "Spark"],
+    "GitHub Actions": ["GH Actions"],
+    "GitLab CI": ["GitLab CI/CD"],
+    "Raspberry Pi": ["RPi"],
+    "IAM": ["identity and access management"],
+    "SIEM": ["Splunk"],
+}
+
+# Other titles people type for a role, matched by find_role like the role names
+ROLE_ALIASES = {
+    "AI Engineer": ["ML Engineer", "Machine Learning Engineer", "MLOps Engineer"],
+    "Backend Developer": ["Back End Developer", "Java Developer", "Python Developer", "Node.js Developer"],
+    "Frontend Developer": ["Front End Developer", "React Developer", "Angular Developer"],
+    "Full Stack Developer": ["Fullstack Developer", "MERN Stack Developer"],
+    "Software Engineer": ["Software Developer", "SDE"],
+    "DevOps Engineer": ["Site Reliability Engineer", "SRE", "Platform Engineer"],
+    "UI/UX Designer": ["UX Designer", "UI Designer"],
+    "Security Engineer": ["Cybersecurity Engineer", "Security Analyst"],
+    "IoT Engineer": ["Embedded Systems Engineer"],
+}
+
+# Terms this short are matched case-sensitively ("R", "Go", "ML", "TS")
+CASE_SENSITIVE_MAX_LEN = 2
+
+
+def load_role_skills(path=SKILLS_PATH):
+    """Loads the role -> skills map from job_roles_skills.json."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _trie_pattern(terms):
+    """
+    Compiles terms into a prefix-trie regex, e.g. "java|javascript" becomes
+    "java(?:script)?". Shared prefixes are tested once, which is what keeps a
+    few hundred skills down to a single fast pass over the text. Spaces match
+    any run of whitespace or hyphens.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = []
+        for char in sorted(key for key in node if key):
+            head = r"[\s\-]+" if char == " " else re.escape(char)
+            branches.append(head + build(node[char]))
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional group: the longer term wins, the shorter one is the fallback
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+class SkillMatcher:
+    """Compiled matcher for every skill (and alias) in the role map."""
+
+    def __init__(self, role_skills, aliases=ALIASES, role_aliases=ROLE_ALIASES):
+        self.role_skills = role_skills
+        self.roles = {role.casefold(): role for role in role_skills}
+
+        # Word sets of every role name and alias; a word used by one role only
+        # ("backend", "ml") identifies it, one shared by several ("developer") does not
+        self.role_titles = [(self._words(title), role) for role in role_skills
+                            for title in [role] + role_aliases.get(role, [])]
+        roles_per_word = {}
+        for words, role in self.role_titles:
+            for word in words:
+                roles_per_word.setdefault(word, set()).add(role)
+        self.distinctive_words = {word for word, roles in roles_per_word.items() if len(roles) == 1}
+
+        # Every surface form points at the canonical skills it stands for
+        self.terms = {}
+        for skills in role_skills.values():
+            for skill in skills:
+                for term in [skill] + aliases.get(skill, []):
+                    self.terms.setdefault(self._key(term), set()).add(skill)
+
+        # Long terms are matched against lowercased text, short ones as written
+        insensitive = {key for key in self.terms if len(key) > CASE_SENSITIVE_MAX_LEN}
+        sensitive = {re.sub(r"[\s\-]+", " ", term) for skills in role_skills.values() for skill in skills
+                     for term in [skill] + aliases.get(skill, []) if len(term) <= CASE_SENSITIVE_MAX_LEN}
+        boundary = r"(?<![\w+#])(?:{})(?![\w+#])"
+        self.pattern = re.compile(boundary.format(_trie_pattern(insensitive)))
+        self.short_pattern = re.compile(boundary.format(_trie_pattern(sensitive)))
+
+    @staticmethod
+    def _key(term):
+        return re.sub(r"[\s\-]+", " ", term).casefold()
+
+    @staticmethod
+    def _words(title):
+        return frozenset(re.findall(r"[\w+#]+", title.casefold().replace(".js", "js")))
+
+    def find_role(self, job_role):
+        """
+        Maps free-text job role input onto a known role, or None. Matches are
+        on whole words: a title whose words all appear in the input wins
+        ("Senior Backend Developer"), otherwise the role sharing the most
+        distinctive words ("Backend Engineer"). Inputs with no distinctive
+        word ("Developer") or that tie between roles return None.
+        """
+        wanted = (job_role or "").strip().casefold()
+        if not wanted:
+            return None
+        if wanted in self.roles:
+            return self.roles[wanted]
+        words = self._words(wanted)
+        scores = {}
+        for title, role in self.role_titles:
+            shared = len(title & words & self.distinctive_words)
+            if not shared:
+                continue
+            score = (title <= words, shared)
+            scores[role] = max(scores.get(role, score), score)
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+    def count_skills(self, text):
+        """Returns {canonical skill: number of mentions} for text."""
+        text = text or ""
+        counts = {}
+        for pattern, haystack in ((self.pattern, text.lower()), (self.short_pattern, text)):
+            for match in pattern.finditer(haystack):
+                for skill in self.terms.get(self._key(match.group(0)), ()):
+                    counts[skill] = counts.get(skill, 0) + 1
+        return counts
+
+    def match_skills(self, text):
+        """Returns the set of canonical skills mentioned in text."""
+        return set(self.count_skills(text))
+
+    def score(self, text, job_role, found=None):
+        """
+        Scores text against a role. Returns None when the role is unknown,
+        otherwise a dict with score, coverage, matched and missing skills.
+        """
+        role = self.find_role(job_role)
+        if role is None:
+            return None
+        found = self.match_skills(text) if found is None else found
+        skills = self.role_skills[role]
+        matched = [skill for skill in skills if skill in found]
+        missing = [skill for skill in skills if skill not in found]
+        coverage = len(matched) / len(skills) if skills else 0.0
+        return {
+            "role": role,
+            "score": round(coverage * 100),
+            "coverage": round(coverage, 4),
+            "matched": matched,
+            "missing": missing,
+        }
+
+
+matcher = SkillMatcher(load_role_skills())
+
+
+def score_resume(resume_text, job_role):
+    """Scores a resume with the shared matcher. See SkillMatcher.score."""
+    return matcher.score(resume_text, job_role)
+
+
+def format_local_analysis(local, note=None):
+    """
+    Renders a local score in the same **Section:** layout the LLM uses, so
+    format_for_web and extract_analysis_data handle it unchanged.
+    """
+    matched = "\n".join(f"- {skill}" for skill in local["matched"]) or "- No role keywords were found."
+    missing = "\n".join(f"- {skill}" for skill in local["missing"]) or "- None. All key skills are covered."
+    lines = [
+        f"**Resume Score:** {local['score']}/100",
+        "",
+        "**Strengths:**",
+        f"Your resume mentions {len(local['matched'])} of {len(local['matched']) + len(local['missing'])} key skills for {local['role']}:",
+        matched,
+        "",
+        "**Missing Skills/Keywords:**",
+        missing,
+    ]
+    if note:
+        lines += ["", "**Note:**", note]
+    return "\n".join(lines)
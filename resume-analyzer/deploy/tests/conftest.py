@@ -0,0 +1,66 @@
+"""
+Test setup: the app is imported against a throwaway SQLite database and job
+directory with the fake LLM backend, so the suite never reads the DATABASE_URL
+or API key in .env (load_dotenv does not override variables set here).
+"""
+import io
+import os
+import sys
+import tempfile
+
+DEPLOY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DEPLOY_DIR)
+
+_workdir = tempfile.mkdtemp(prefix="resume-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_workdir, 'app.db')}",
+    "JOB_DATA_DIR": _workdir,
+    "PDF_CACHE_DIR": os.path.join(_workdir, "pdf_cache"),
+    "METRICS_DIR": "",
+    "LLM_BACKEND": "fake",
+    "GOOGLE_API_KEY": "",
+    "SENDER_EMAIL": "",
+    "SENDER_PASSWORD": "",
+    "ASYNC_ANALYZE": "0",
+    "ADMISSION_USER_RATE_PER_MIN": "0",
+})
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app, db
+
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        db.create_all()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as test@example.com."""
+    from werkzeug.security import generate_password_hash
+    from models import db, User
+
+    with app.app_context():
+        if not User.query.filter_by(email="test@example.com").first():
+            db.session.add(User(name="Test", email="test@example.com", password=generate_password_hash("secret")))
+            db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"email": "test@example.com", "password": "secret"})
+    return client
+
+
+def docx_upload(text):
+    """A DOCX file with one paragraph per line of `text`, as an upload tuple for the test client."""
+    import docx
+
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer, "resume.docx"
@@ -0,0 +1,45 @@
+"""AI resume repair counters: every generation is counted once, however it ends."""
+import asyncio
+
+import pytest
+
+import ai_resume_generator as generator
+
+USER = {"name": "Asha", "email": "asha@example.com", "phone": "1", "job_role": "Backend Developer", "skills": "Python"}
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    monkeypatch.setattr(generator, "_metrics", {key: {} if key == "repairs" else 0 for key in generator._metrics})
+    return generator.repair_stats
+
+
+def test_clean_generation_counts_once(counters):
+    resume = generator.generate_ai_resume(USER)
+    assert resume["summary"]
+    stats = counters()
+    assert stats["generations"] == 1
+    assert stats["clean"] + stats["fallbacks"] <= 1
+
+
+@pytest.mark.parametrize("fail_on", [0, 1])
+def test_fallback_counts_as_a_generation(counters, monkeypatch, fail_on):
+    calls = []
+
+    def request_json(prompt):
+        calls.append(prompt)
+        if len(calls) > fail_on:
+            raise ValueError("broken response")
+        return {"summary": "ok"}, [], None  # skills etc. are missing, so a field request follows
+
+    monkeypatch.setattr(generator, "request_json", request_json)
+    resume = generator.generate_ai_resume(USER)
+    assert resume["skills"] == {"Error": ["Could not generate skills."]}
+    stats = counters()
+    assert (stats["generations"], stats["fallbacks"], stats["clean"]) == (1, 1, 0)
+    assert stats["repair_rate"] == 0.0
+
+
+def test_async_generation_counts_once(counters):
+    asyncio.run(generator.generate_ai_resume_async(USER))
+    assert counters()["generations"] == 1
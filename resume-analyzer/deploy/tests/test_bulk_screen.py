@@ -0,0 +1,41 @@
+"""Bulk screening with the sql analysis cache, and the CLI's user lookup."""
+import uuid
+
+import pytest
+
+import analysis
+import bulk_screen
+from analysis_cache import SQLCacheBackend
+from conftest import docx_upload
+
+ROLE = "Backend Developer"
+
+
+def resumes(count=2):
+    return [(f"resume-{i}.docx", docx_upload(f"Candidate {uuid.uuid4().hex}\nPython Django SQL Docker REST")[0].getvalue())
+            for i in range(count)]
+
+
+@pytest.fixture
+def sql_cache(app, monkeypatch):
+    monkeypatch.setattr(analysis.cache, "backend", SQLCacheBackend())
+
+
+def test_screen_resumes_with_sql_cache_runs_analyses_in_app_context(app, sql_cache):
+    rows = []
+    bulk_screen.screen_resumes(resumes(), ROLE, on_result=rows.append, extract_workers=1, llm_workers=2,
+                               rate_per_minute=6000, context=app.app_context)
+    assert [row["status"] for row in rows] == ["ok", "ok"]
+    assert all(row["score"] for row in rows)
+
+
+def test_cli_unknown_user_writes_no_report(app, tmp_path, capsys):
+    source = tmp_path / "resumes"
+    source.mkdir()
+    for name, data in resumes(1):
+        (source / name).write_bytes(data)
+    out = tmp_path / "report.csv"
+
+    assert bulk_screen.main([str(source), "--role", ROLE, "--out", str(out), "--user-email", "nobody@example.com"]) == 1
+    assert "No user with email nobody@example.com" in capsys.readouterr().out
+    assert not out.exists()
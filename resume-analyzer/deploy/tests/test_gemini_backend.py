@@ -0,0 +1,77 @@
+"""GeminiBackend builds real google-generativeai requests; only the transport is replaced."""
+import asyncio
+import warnings
+
+import pytest
+
+from llm_client import GeminiBackend
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", FutureWarning)
+    genai = pytest.importorskip("google.generativeai")
+protos = pytest.importorskip("google.generativeai.protos")
+
+
+def reply(text):
+    return protos.GenerateContentResponse(candidates=[{"content": {"parts": [{"text": text}], "role": "model"}}])
+
+
+class RecordingClient:
+    """Stands in for the gRPC client: records each request and its per-call options."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, request, **options):
+        self.calls.append((request, options))
+        return reply("hello")
+
+    def stream_generate_content(self, request, **options):
+        self.calls.append((request, options))
+        return iter([reply("hel"), reply("lo")])
+
+
+class AsyncRecordingClient(RecordingClient):
+    async def generate_content(self, request, **options):
+        return super().generate_content(request, **options)
+
+    async def stream_generate_content(self, request, **options):
+        self.calls.append((request, options))
+
+        async def chunks():
+            for chunk in (reply("hel"), reply("lo")):
+                yield chunk
+        return chunks()
+
+
+@pytest.fixture
+def backend():
+    backend = GeminiBackend(api_key="test-key")
+    model = backend._get_model()
+    model._client = RecordingClient()
+    model._async_client = AsyncRecordingClient()
+    return backend
+
+
+def test_generate_passes_the_deadline_to_the_transport(backend):
+    text, _ = backend.generate("Rate this resume", timeout=12)
+    assert text == "hello"
+    (request, options), = backend._model._client.calls
+    assert request.contents[0].parts[0].text == "Rate this resume"
+    assert request.model == "models/gemini-1.5-flash"
+    assert options == {"timeout": 12}
+
+
+def test_stream_passes_the_deadline_to_the_transport(backend):
+    assert "".join(backend.stream("Rate this resume", timeout=7)) == "hello"
+    assert backend._model._client.calls[0][1] == {"timeout": 7}
+
+
+def test_async_calls_pass_the_deadline_to_the_transport(backend):
+    async def run():
+        text, _ = await backend.agenerate("Rate this resume", timeout=5)
+        chunks = [chunk async for chunk in backend.astream("Rate this resume", timeout=6)]
+        return text, "".join(chunks)
+
+    assert asyncio.run(run()) == ("hello", "hello")
+    assert [options for _, options in backend._model._async_client.calls] == [{"timeout": 5}, {"timeout": 6}]
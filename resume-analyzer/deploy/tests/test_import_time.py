@@ -0,0 +1,18 @@
+"""Cold-start budget for `import app`, as checked by benchmarks/check_import_time.py."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from check_import_time import DEFERRED_MODULES, fastest_import
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 800))
+
+
+@pytest.mark.parametrize("vercel", [False, True], ids=["local", "vercel"])
+def test_cold_import_of_app_stays_within_budget(vercel):
+    total_ms, _, loaded = fastest_import(runs=3, vercel=vercel)
+    assert not [module for module in DEFERRED_MODULES if module in loaded]
+    assert total_ms <= BUDGET_MS, f"import app took {total_ms:.0f} ms, budget is {BUDGET_MS:.0f} ms"
@@ -0,0 +1,78 @@
+"""Job queue recovery and the /jobs/<id>/stream progress stream."""
+import time
+from contextlib import closing
+
+import pytest
+
+from job_queue import FAILED, QUEUED, RUNNING, SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.db"))
+
+
+def age(queue, job_id, seconds):
+    """Moves a job's timestamps into the past."""
+    with closing(queue._connect()) as conn:
+        conn.execute("UPDATE jobs SET updated_at = updated_at - ?, heartbeat_at = heartbeat_at - ? WHERE id = ?",
+                     (seconds, seconds, job_id))
+
+
+def test_heartbeated_job_is_not_requeued(queue):
+    job_id = queue.enqueue("analyze", {})
+    queue.claim()
+    age(queue, job_id, 3600)  # e.g. waiting a long time for an admission slot
+    queue.heartbeat([job_id])
+    assert queue.requeue_stale(older_than=120) == 0
+    assert queue.get(job_id)["status"] == RUNNING
+
+
+def test_job_without_heartbeat_is_requeued_then_failed(queue):
+    job_id = queue.enqueue("analyze", {})
+    for attempt in range(1, 4):
+        assert queue.claim()["attempts"] == attempt
+        age(queue, job_id, 3600)
+        queue.requeue_stale(older_than=120, max_attempts=3)
+        expected = QUEUED if attempt < 3 else FAILED
+        assert queue.get(job_id)["status"] == expected
+    assert "interrupted" in queue.get(job_id)["error"]
+    assert queue.claim() is None
+
+
+def stream_events(client, job_id, last_event_id=None):
+    headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+    body = client.get(f"/jobs/{job_id}/stream", headers=headers).get_data(as_text=True)
+    return [dict(line.split(": ", 1) for line in message.splitlines())
+            for message in body.strip().split("\n\n") if message.startswith("id:")]
+
+
+def test_job_stream_ends_after_a_bounded_wait_and_resumes_from_last_event_id(client, monkeypatch):
+    import app as app_module
+    from models import User
+
+    monkeypatch.setattr(app_module, "JOB_STREAM_SECONDS", 0.2)
+    with client.application.app_context():
+        user_id = User.query.filter_by(email="test@example.com").first().id
+    # Not a registered job kind, and the workers are not told about it
+    job_id = app_module.job_queue.enqueue("never_runs", {}, user_id=user_id)
+    with closing(app_module.job_queue._connect()) as conn:
+        conn.execute("UPDATE jobs SET status = ? WHERE id = ?", (RUNNING, job_id))
+
+    started = time.monotonic()
+    events = stream_events(client, job_id)
+    assert time.monotonic() - started < 5
+    assert [event["event"] for event in events] == ["status"]
+
+    # Reconnecting with the last id does not repeat an unchanged status
+    assert stream_events(client, job_id, events[0]["id"]) == []
+    app_module.job_queue.update(job_id, stage="analyzing")
+    assert [event["event"] for event in stream_events(client, job_id, events[0]["id"])] == ["status"]
+
+
+def test_first_request_starts_the_workers(client):
+    import threading
+
+    client.get("/login")
+    names = {thread.name for thread in threading.enumerate() if thread.is_alive()}
+    assert {"job-heartbeat", "job-worker-0"} <= names
@@ -0,0 +1,71 @@
+"""LLMClient streams: the opening request is retried, a stream that has started is not."""
+import asyncio
+
+import pytest
+
+from llm_client import LLMClient, LLMError
+
+
+class FlakyBackend:
+    """Each call fails after `failures[n]` chunks (None streams them all)."""
+    name = "flaky"
+    configured = True
+
+    def __init__(self, chunks, *failures):
+        self.chunks = chunks
+        self.failures = list(failures)
+        self.calls = 0
+
+    def _fail_after(self):
+        self.calls += 1
+        return self.failures.pop(0) if self.failures else None
+
+    def stream(self, prompt, timeout):
+        fail_after = self._fail_after()
+        for i, chunk in enumerate(self.chunks):
+            if i == fail_after:
+                raise RuntimeError("connection reset")
+            yield chunk
+
+    async def astream(self, prompt, timeout):
+        for chunk in self.stream(prompt, timeout):
+            yield chunk
+
+
+def client(backend, retries=2):
+    return LLMClient(backend, retries=retries, base_delay=0.01, timeout=5)
+
+
+def test_stream_retries_until_the_first_chunk():
+    backend = FlakyBackend(["a", "b", "c"], 0, 0)
+    llm = client(backend)
+    assert list(llm.stream("prompt")) == ["a", "b", "c"]
+    assert backend.calls == 3
+    assert llm.breaker.state == "closed"
+
+
+def test_stream_gives_up_after_the_last_retry():
+    backend = FlakyBackend(["a"], 0, 0)
+    with pytest.raises(LLMError):
+        list(client(backend, retries=1).stream("prompt"))
+    assert backend.calls == 2
+
+
+def test_stream_is_not_retried_once_output_has_started():
+    backend = FlakyBackend(["a", "b", "c"], 2)
+    received = []
+    with pytest.raises(LLMError):
+        for chunk in client(backend).stream("prompt"):
+            received.append(chunk)
+    assert received == ["a", "b"]
+    assert backend.calls == 1
+
+
+def test_astream_retries_until_the_first_chunk():
+    backend = FlakyBackend(["a", "b"], 0)
+
+    async def run():
+        return [chunk async for chunk in client(backend).astream("prompt")]
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert backend.calls == 2
@@ -0,0 +1,38 @@
+"""Outbox recovery: requeue_stuck only returns rows whose claim is stale."""
+from datetime import datetime, timedelta
+
+import mailer
+from models import db, EmailOutbox
+
+
+def outbox_row(**fields):
+    message = EmailOutbox(recipient="test@example.com", subject="Report", body="Hi", **fields)
+    db.session.add(message)
+    db.session.commit()
+    return message.id
+
+
+def status(message_id):
+    return db.session.get(EmailOutbox, message_id, populate_existing=True).status
+
+
+def test_requeue_skips_backlogged_message_claimed_just_now(app):
+    with app.app_context():
+        # Due an hour ago, but a sender only picked it up now
+        message_id = outbox_row(next_attempt_at=datetime.utcnow() - timedelta(hours=1))
+        assert [m.id for m in mailer.claim_batch()] == [message_id]
+        mailer.requeue_stuck(older_than=600)
+        assert status(message_id) == mailer.SENDING
+
+
+def test_requeue_returns_stale_claims(app):
+    with app.app_context():
+        long_ago = datetime.utcnow() - timedelta(hours=1)
+        stale = outbox_row(status=mailer.SENDING, claimed_at=long_ago, next_attempt_at=long_ago)
+        # Claimed before claimed_at existed: falls back to when it became due
+        legacy = outbox_row(status=mailer.SENDING, next_attempt_at=long_ago)
+        mailer.requeue_stuck(older_than=600)
+        assert status(stale) == mailer.PENDING
+        assert status(legacy) == mailer.PENDING
+        EmailOutbox.query.filter(EmailOutbox.id.in_([stale, legacy])).delete(synchronize_session=False)
+        db.session.commit()
@@ -0,0 +1,39 @@
+"""Operator endpoints are only served with the OPS_TOKEN bearer token."""
+import pytest
+
+import app as app_module
+
+TOKEN = "ops-test-token"
+
+
+@pytest.fixture
+def ops_token(monkeypatch):
+    monkeypatch.setattr(app_module, "OPS_TOKEN", TOKEN)
+
+
+def test_init_db_needs_post_and_the_token(app, ops_token):
+    client = app.test_client()
+    assert client.get("/init-db").status_code == 405
+    assert client.post("/init-db").status_code == 404
+    assert client.post("/init-db", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    assert client.post("/init-db", headers={"Authorization": f"Bearer {TOKEN}"}).status_code == 200
+
+
+def test_init_db_is_off_without_a_token(app):
+    assert app.test_client().post("/init-db", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+def test_cache_stats_needs_the_token(app, ops_token):
+    client = app.test_client()
+    assert client.get("/cache-stats").status_code == 404
+    response = client.get("/cache-stats", headers={"Authorization": f"Bearer {TOKEN}"})
+    assert response.status_code == 200
+    assert "llm" in response.get_json()
+
+
+def test_metrics_needs_the_token(app, ops_token):
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 404
+    response = client.get("/metrics", headers={"Authorization": f"Bearer {TOKEN}"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
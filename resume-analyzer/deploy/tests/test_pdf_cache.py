@@ -0,0 +1,25 @@
+"""PDF cache keys: a reused analysis id must not serve the old analysis's PDF."""
+import io
+from datetime import datetime
+
+from pdf_cache import PDFCache, analysis_key
+
+
+def test_reused_analysis_id_misses_the_cache(tmp_path):
+    cache = PDFCache(str(tmp_path))
+    old = analysis_key(7, datetime(2026, 1, 1, 9, 0), "1", "Backend Developer", "old result")
+    new = analysis_key(7, datetime(2026, 1, 2, 9, 0), "2", "Backend Developer", "new result")
+    assert old != new
+
+    cache.put(old, io.BytesIO(b"old pdf"))
+    rendered = cache.get_or_render(new, lambda: io.BytesIO(b"new pdf"))
+    assert rendered.read() == b"new pdf"
+    assert cache.get(old).read() == b"old pdf"
+
+
+def test_same_analysis_hits_the_cache(tmp_path):
+    cache = PDFCache(str(tmp_path))
+    key = analysis_key(7, datetime(2026, 1, 1, 9, 0), "1", "Backend Developer", "result")
+    cache.get_or_render(key, lambda: io.BytesIO(b"pdf"))
+    assert cache.get_or_render(key, lambda: None).read() == b"pdf"
+    assert analysis_key(7, datetime(2026, 1, 1, 9, 0), "1", "Backend Developer", "result") == key
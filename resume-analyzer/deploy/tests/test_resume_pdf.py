@@ -0,0 +1,41 @@
+"""Builder resume PDFs: plain text is escaped and long tokens wrap inside the margin."""
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph
+
+from resume_pdf import STYLES, build_story, generate_resume_pdf
+
+FRAME_WIDTH = letter[0] - 1.5 * inch
+URL = "https://github.com/asha-verma/" + "very-long-repository-name-" * 6 + "readme"
+RESUME = {
+    "name": "Asha <Verma>", "email": "asha.verma.with.a.really.long.address@" + "example" * 10 + ".com",
+    "job_role": "Backend & Data", "summary": f"Portfolio: {URL}",
+    "skills": {"Technical": ["Python", "SQL"]},
+    "experience": [{"title": "Engineer", "company": "Acme", "achievements": [f"Wrote {URL}", "Cut latency"]}],
+    "achievements": "Speaker at PyCon",
+}
+
+
+def test_long_tokens_wrap_inside_the_frame():
+    for flowable in build_story(RESUME):
+        if not isinstance(flowable, Paragraph):
+            continue
+        flowable.wrap(FRAME_WIDTH, 1000)
+        for line in flowable.blPara.lines:
+            # Space left on the line; negative means it overflows the margin
+            extra_space = line.extraSpace if hasattr(line, "extraSpace") else line[0]
+            assert extra_space >= -0.01
+
+
+def test_markup_characters_are_text():
+    story = build_story(RESUME)
+    assert story[0].getPlainText() == "Asha <Verma>"
+    assert story[1].getPlainText() == "Backend & Data"
+    skills = next(p for p in story if isinstance(p, Paragraph) and "Python" in p.getPlainText())
+    assert skills.getPlainText() == "Technical: Python, SQL"
+    assert STYLES["body"] is skills.style
+
+
+def test_generate_resume_pdf():
+    pdf = generate_resume_pdf(RESUME)
+    assert pdf.getvalue().startswith(b"%PDF")
@@ -0,0 +1,26 @@
+"""role_matcher CLI smoke test on a small directory of resumes."""
+import csv
+
+import bulk_screen
+import role_matcher
+from conftest import docx_upload
+
+
+def test_main_ranks_roles_and_skips_oversized_files(tmp_path, monkeypatch, capsys):
+    resumes = tmp_path / "resumes"
+    resumes.mkdir()
+    for name, text in (("backend.docx", "Python Django Flask SQL PostgreSQL REST APIs Docker Git"),
+                       ("frontend.docx", "JavaScript React HTML CSS TypeScript Redux")):
+        (resumes / name).write_bytes(docx_upload(text)[0].getvalue())
+    limit = max(path.stat().st_size for path in resumes.iterdir())
+    (resumes / "huge.pdf").write_bytes(b"%PDF" + b"0" * limit)
+    monkeypatch.setattr(bulk_screen, "MAX_RESUME_BYTES", limit)
+
+    out = tmp_path / "matches.csv"
+    assert role_matcher.main([str(resumes), "--top-k", "2", "--out", str(out), "--extract-workers", "1"]) == 0
+
+    assert "Skipping huge.pdf" in capsys.readouterr().out
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted({row["filename"] for row in rows}) == ["backend.docx", "frontend.docx"]
+    assert len(rows) == 4
@@ -0,0 +1,63 @@
+"""Server-side sessions: new ids on login and logout, and expiry that follows use."""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import server_session
+from models import db, ServerSession
+
+
+@pytest.fixture
+def store(app):
+    if not isinstance(app.session_interface, server_session.ServerSideSessionInterface):
+        pytest.skip("cookie sessions")
+    return app.session_interface.store
+
+
+def session_id(client):
+    cookie = client.get_cookie("session")
+    return cookie.value.rpartition(".")[0] if cookie else None
+
+
+def row(app, sid):
+    with app.app_context():
+        return db.session.get(ServerSession, sid, populate_existing=True)
+
+
+def login(client):
+    return client.post("/login", data={"email": "test@example.com", "password": "secret"})
+
+
+def test_login_and_logout_issue_a_new_session_id(app, client, store):
+    client.post("/login", data={"email": "test@example.com", "password": "wrong"})  # flash creates a session
+    planted = session_id(client)
+    assert planted and row(app, planted)
+
+    login(client)
+    logged_in = session_id(client)
+    assert logged_in != planted
+    assert row(app, planted) is None
+
+    client.get("/logout")
+    assert session_id(client) != logged_in
+    assert row(app, logged_in) is None
+
+
+def test_reads_extend_the_expiry_at_most_once_per_refresh_interval(app, client, store):
+    login(client)
+    client.get("/analyze_page")  # shows, and so writes away, the login flash
+    sid = session_id(client)
+    # Pretend the session was last refreshed two hours ago
+    with app.app_context():
+        db.session.get(ServerSession, sid).expires_at = datetime.utcnow() + timedelta(seconds=store.ttl - 7200)
+        db.session.commit()
+    version, payload, _ = store._entries[sid]
+    store._entries[sid] = (version, payload, time.monotonic() + store.ttl - 7200)
+
+    assert client.get("/analyze_page").status_code == 200
+    refreshed = row(app, sid).expires_at
+    assert refreshed > datetime.utcnow() + timedelta(seconds=store.ttl - 60)
+
+    client.get("/analyze_page")
+    assert row(app, sid).expires_at == refreshed
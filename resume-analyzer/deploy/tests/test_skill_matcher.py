@@ -0,0 +1,30 @@
+"""SkillMatcher.find_role: free-text job roles map onto known roles by whole words."""
+import pytest
+
+from skill_matcher import matcher
+
+
+@pytest.mark.parametrize("job_role, role", [
+    ("Backend Developer", "Backend Developer"),
+    ("senior backend developer", "Backend Developer"),
+    ("Backend Engineer", "Backend Developer"),
+    ("Java Developer", "Backend Developer"),
+    ("Node.js Developer", "Backend Developer"),
+    ("Front-end Developer", "Frontend Developer"),
+    ("Sr. Full-Stack Developer", "Full Stack Developer"),
+    ("ML Engineer", "AI Engineer"),
+    ("AI", "AI Engineer"),
+    ("UI/UX designer", "UI/UX Designer"),
+])
+def test_find_role_matches_whole_words(job_role, role):
+    assert matcher.find_role(job_role) == role
+
+
+@pytest.mark.parametrize("job_role", ["", "a", "Developer", "Senior Engineer", "Cloud Security Engineer"])
+def test_find_role_rejects_generic_or_ambiguous_input(job_role):
+    assert matcher.find_role(job_role) is None
+
+
+def test_score_uses_the_matched_role():
+    assert matcher.score("Python Django SQL", "Java Developer")["role"] == "Backend Developer"
+    assert matcher.score("Python Django SQL", "Developer") is None
@@ -0,0 +1,214 @@
+"""Streaming analysis: stream_analyze_resume, SectionStreamer and /analyze/stream, on a fake streaming model."""
+import json
+import uuid
+
+import pytest
+
+import analysis
+from conftest import docx_upload
+from llm_client import LLMClient
+from utils import SectionStreamer, format_for_web
+
+ROLE = "Backend Developer"
+ANALYSIS = [
+    "**Resume Score:** 78/100\n\n**Stre", "ngths:**\n- Solid Python APIs\n",
+    "- Clear project write-ups\n\n**Areas for Improvement:**\n- Add metrics\n",
+    "\n**Missing Skills/Keywords:**\n- Kubernetes\n",
+]
+
+
+class StreamingBackend:
+    """Streams a fixed list of chunks, optionally failing after `fail_after` of them."""
+    name = "scripted"
+    configured = True
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.prompts = []
+
+    def stream(self, prompt, timeout):
+        self.prompts.append(prompt)
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("connection reset")
+            yield chunk
+
+
+def streaming_llm(chunks=ANALYSIS, fail_after=None):
+    return LLMClient(StreamingBackend(chunks, fail_after), retries=0, timeout=5)
+
+
+def resume_text():
+    # Unique per test so the analysis cache never answers for the model
+    return f"Candidate {uuid.uuid4().hex}\nExperience\nBuilt Python and Django APIs with SQL, Docker and REST"
+
+
+def parse_sse(body):
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_yields_model_chunks_then_serves_cache():
+    llm = streaming_llm()
+    text = resume_text()
+    assert list(analysis.stream_analyze_resume(text, ROLE, llm=llm)) == ANALYSIS
+    assert len(llm.backend.prompts) == 1
+
+    # The finished stream was cached, so a repeat is one chunk without a model call
+    assert list(analysis.stream_analyze_resume(text, ROLE, llm=llm)) == ["".join(ANALYSIS)]
+    assert len(llm.backend.prompts) == 1
+
+
+def test_stream_failure_after_partial_output_keeps_chunks_and_appends_error():
+    llm = streaming_llm(fail_after=2)
+    text = resume_text()
+    chunks = list(analysis.stream_analyze_resume(text, ROLE, llm=llm))
+    assert chunks[:2] == ANALYSIS[:2]
+    assert chunks[2].startswith("\nAn error occurred during AI analysis")
+    assert len(chunks) == 3
+    # A broken stream is not cached
+    assert analysis.cache.get(text, ROLE, analysis.PROMPT_VERSION) is None
+
+
+def test_stream_falls_back_to_keyword_analysis_when_model_unavailable():
+    llm = LLMClient(StreamingBackend(ANALYSIS), max_concurrency=1, timeout=0.01)
+    llm._slots.acquire()  # the only slot is busy, so the stream is rejected before it starts
+    try:
+        chunks = list(analysis.stream_analyze_resume(resume_text(), ROLE, llm=llm))
+    finally:
+        llm._slots.release()
+    assert len(chunks) == 1
+    assert analysis.UNAVAILABLE_NOTE in chunks[0]
+    assert llm.backend.prompts == []
+
+
+def test_section_streamer_waits_for_complete_heading_lines():
+    streamer = SectionStreamer()
+    assert streamer.feed(ANALYSIS[0]) == []  # "**Stre" could still be the start of a heading
+    first = streamer.feed(ANALYSIS[1])
+    assert first == [format_for_web("**Resume Score:** 78/100\n\n")]
+    second = streamer.feed(ANALYSIS[2])
+    assert second == [format_for_web("**Strengths:**\n- Solid Python APIs\n- Clear project write-ups\n\n")]
+    third = streamer.feed(ANALYSIS[3])
+    assert third == [format_for_web("**Areas for Improvement:**\n- Add metrics\n\n")]
+    assert streamer.finish() == [format_for_web("**Missing Skills/Keywords:**\n- Kubernetes\n")]
+    assert streamer.finish() == []
+
+
+def test_section_streamer_flushes_partial_section_on_finish():
+    streamer = SectionStreamer()
+    assert streamer.feed("**Resume Score:** 60/100\n**Strengths:**\n- Half a bul") == [
+        format_for_web("**Resume Score:** 60/100\n")]
+    assert streamer.finish() == [format_for_web("**Strengths:**\n- Half a bul")]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Replaces the shared client that /analyze/stream streams from."""
+    def install(**kwargs):
+        llm = streaming_llm(**kwargs)
+        monkeypatch.setattr(analysis, "client", llm)
+        return llm
+    return install
+
+
+def post_stream(client, text):
+    response = client.post("/analyze/stream", data={"job_role": ROLE, "resume": docx_upload(text)},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    return parse_sse(response.get_data(as_text=True))
+
+
+def test_analyze_stream_event_order(client, model):
+    llm = model()
+    events = post_stream(client, resume_text())
+    names = [name for name, _ in events]
+
+    assert [data["text"] for name, data in events if name == "chunk"] == ANALYSIS
+    assert names[-1] == "done"
+    assert names.count("section") == 4
+    # Each section is sent right after the chunk that completed it, and the last after the stream ends
+    assert names[:-1] == ["chunk", "chunk", "section", "chunk", "section", "chunk", "section", "section"]
+    assert len(llm.backend.prompts) == 1
+
+    from models import db, ResumeAnalysis
+    with client.application.app_context():
+        saved = db.session.get(ResumeAnalysis, events[-1][1]["analysis_id"])
+        assert saved.result == "".join(ANALYSIS)
+        assert saved.score == 78
+
+
+def test_analyze_stream_partial_failure_sends_sections_so_far_and_error(client, model):
+    from models import db, ResumeAnalysis
+
+    model(fail_after=2)
+    with client.application.app_context():
+        saved_before = db.session.query(ResumeAnalysis).count()
+    events = post_stream(client, resume_text())
+    chunks = [data["text"] for name, data in events if name == "chunk"]
+    sections = [data["html"] for name, data in events if name == "section"]
+
+    assert chunks[:2] == ANALYSIS[:2]
+    assert "An error occurred during AI analysis" in chunks[-1]
+    assert sections[0] == format_for_web("**Resume Score:** 78/100\n\n")
+    assert "An error occurred during AI analysis" in sections[-1]
+    # The broken analysis is reported, not saved to the history with a score
+    assert events[-1][0] == "error"
+    assert "not saved" in events[-1][1]["error"]
+    assert "done" not in [name for name, _ in events]
+    with client.application.app_context():
+        assert db.session.query(ResumeAnalysis).count() == saved_before
+
+
+def test_analyze_stream_requires_login(app):
+    response = app.test_client().post("/analyze/stream", data={"job_role": ROLE})
+    assert response.status_code == 401
+
+
+def running_leases(app):
+    from app import admission
+    return sum(n for (route, state), n in admission.depth().items() if route == "analyze_stream" and state == "running")
+
+
+def test_analyze_stream_takes_no_slot_until_read(client, model):
+    # The test client always reads the first event, so call the view directly
+    from flask import session
+    from app import analyze_stream
+    from models import User
+
+    model()
+    app = client.application
+    with app.test_request_context("/analyze/stream", method="POST", content_type="multipart/form-data",
+                                  data={"job_role": ROLE, "resume": docx_upload(resume_text())}):
+        session["user_id"] = User.query.filter_by(email="test@example.com").first().id
+        response = analyze_stream()
+        assert running_leases(app) == 0
+        response.close()  # the client went away before the first event
+    assert running_leases(app) == 0
+
+    events = iter(client.post("/analyze/stream", data={"job_role": ROLE, "resume": docx_upload(resume_text())},
+                              content_type="multipart/form-data", buffered=False).response)
+    next(events)
+    assert running_leases(app) == 1
+    events.close()
+    assert running_leases(app) == 0
+
+
+def test_analyze_stream_busy_is_an_error_event(client, model, monkeypatch):
+    from app import admission
+    model()
+    monkeypatch.setattr(admission, "max_inflight", 1)
+    monkeypatch.setattr(admission, "queue_timeout", 0.1)
+    held = admission.acquire(None, "analyze")
+    try:
+        events = post_stream(client, resume_text())
+    finally:
+        admission.release(held)
+    assert [name for name, _ in events] == ["error"]
+    assert events[0][1]["retry_after"] >= 1
+    assert running_leases(client.application) == 0
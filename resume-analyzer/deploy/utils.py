@@ -1,42 +1,21 @@
 import os
 import io
 import re
-import smtplib
-from email.message import EmailMessage
-from email.utils import formataddr
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.units import inch
 from dotenv import load_dotenv
-import re
 from html import unescape
 
 load_dotenv()
 
 def send_email(receiver_email, subject, body, attachment=None):
-    # (Is function me koi badlav nahi hai)
-    sender_email = os.getenv("SENDER_EMAIL")
-    sender_password = os.getenv("SENDER_PASSWORD")
-
-    if not sender_email or not sender_password:
-        print("SENDER_EMAIL and SENDER_PASSWORD environment variables are required.")
-        return False
-
-    msg = EmailMessage()
-    msg['From'] = formataddr(("Resume Analyzer", sender_email))
-    msg['To'] = receiver_email
-    msg['Subject'] = subject
-    msg.set_content(body)
-
-    if attachment:
-        msg.add_attachment(attachment.getvalue(), maintype='application', subtype='pdf', filename="Resume_Report.pdf")
+    """
+    Sends one email right away over the pooled SMTP connection. Web routes
+    queue mail with mailer.enqueue_email instead, so they never wait on SMTP.
+    """
+    from mailer import build_message, send_message
 
+    msg = build_message(receiver_email, subject, body, attachment=attachment.getvalue() if attachment else None)
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-            smtp.login(sender_email, sender_password)
-            smtp.send_message(msg)
+        send_message(msg)
         return True
     except Exception as e:
         print(f"Error sending email: {e}")
@@ -53,27 +32,47 @@ def clean_html_for_pdf(html_string):
     clean_text = re.sub(r' +', ' ', clean_text)
     return clean_text.strip()
 
+# Built once per process; getSampleStyleSheet() is costly to repeat per PDF
+_styles = None
+TAG_RE = re.compile('<.*?>')
+PDF_HEADINGS = ('Resume Analysis', 'Job Role', 'Score', 'Skills')
+
+def get_pdf_styles():
+    """Returns the shared ReportLab stylesheet."""
+    global _styles
+    if _styles is None:
+        from reportlab.lib.styles import getSampleStyleSheet
+        _styles = getSampleStyleSheet()
+    return _styles
+
 def generate_pdf(html_content):
     """Generates a PDF from HTML content using ReportLab."""
+    # ReportLab is imported on first use to keep serverless cold starts short
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
     try:
         pdf_buffer = io.BytesIO()
         doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
+        styles = get_pdf_styles()
+        heading_style, normal_style = styles['Heading2'], styles['Normal']
         story = []
 
         # Remove HTML tags and convert to plain text
-        clean_text = re.sub('<.*?>', '', html_content)
+        clean_text = TAG_RE.sub('', html_content)
         clean_text = clean_text.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>')
 
         # Split into paragraphs
         paragraphs = clean_text.split('\n')
 
         for para in paragraphs:
-            if para.strip():
-                if any(heading in para for heading in ['Resume Analysis', 'Job Role', 'Score', 'Skills']):
-                    story.append(Paragraph(para.strip(), styles['Heading2']))
+            para = para.strip()
+            if para:
+                if any(heading in para for heading in PDF_HEADINGS):
+                    story.append(Paragraph(para, heading_style))
                 else:
-                    story.append(Paragraph(para.strip(), styles['Normal']))
+                    story.append(Paragraph(para, normal_style))
                 story.append(Spacer(1, 0.2*inch))
 
         doc.build(story)
@@ -130,6 +129,21 @@ def extract_analysis_data(text):
     
     return data
 
+def analysis_fields(text):
+    """
+    Parses an analysis once into the structured ResumeAnalysis columns,
+    including the pre-rendered HTML.
+    """
+    data = extract_analysis_data(text)
+    return {
+        'score': data['score'],
+        'strengths': data['strengths'],
+        'improvements': data['improvements'],
+        'missing_skills': data['missing_skills'],
+        'category_scores': data['categories'],
+        'result_html': format_for_web(text),
+    }
+
 def format_for_web(text):
     # (Is function me koi badlav nahi hai)
     if not text:
@@ -168,4 +182,37 @@ def format_for_web(text):
             formatted_lines.append(f'<p>{line}</p>')
     if in_section:
         formatted_lines.append('</div>')
-    return '<div class="analysis-content">' + '\n'.join(formatted_lines) + '</div>'
\ No newline at end of file
+    return '<div class="analysis-content">' + '\n'.join(formatted_lines) + '</div>'
+
+class SectionStreamer:
+    """
+    Formats a streamed analysis section by section. Text is buffered until
+    the next **Heading** line starts, at which point the finished section is
+    run through format_for_web and returned.
+    """
+    HEADING_RE = re.compile(r'^[ \t]*\*\*', re.MULTILINE)
+
+    def __init__(self):
+        self.buffer = ''
+
+    def feed(self, chunk):
+        """Adds a chunk and returns HTML for every section it completed."""
+        self.buffer += chunk
+        # Only headings on fully received lines are trusted as boundaries
+        complete = self.buffer[:self.buffer.rfind('\n') + 1]
+        starts = [m.start() for m in self.HEADING_RE.finditer(complete) if m.start() > 0]
+        if not starts:
+            return []
+        sections = []
+        previous = 0
+        for start in starts:
+            if self.buffer[previous:start].strip():
+                sections.append(format_for_web(self.buffer[previous:start]))
+            previous = start
+        self.buffer = self.buffer[previous:]
+        return sections
+
+    def finish(self):
+        """Returns HTML for whatever is left once the stream has ended."""
+        remaining, self.buffer = self.buffer, ''
+        return [format_for_web(remaining)] if remaining.strip() else []